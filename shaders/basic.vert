@@ -5,9 +5,20 @@ in vec3 in_color;
 
 out vec3 v_color;
 
-uniform mat4 Mvp;
+// Datos compartidos por todo el frame (se escriben una vez por frame)
+layout(std140) uniform FrameData {
+    mat4 view;
+    mat4 projection;
+    vec4 cameraPosition;
+    vec4 time;
+};
+
+// Datos del objeto (sub-rango del UBO de objetos vinculado por draw)
+layout(std140) uniform ObjectData {
+    mat4 model;
+};
 
 void main() {
     v_color = in_color;
-    gl_Position = Mvp * vec4(in_pos, 1.0);
+    gl_Position = projection * view * model * vec4(in_pos, 1.0);
 }
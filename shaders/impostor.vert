@@ -0,0 +1,16 @@
+#version 330 core
+
+// Entrada: posición y coordenadas UV del Quad del impostor
+in vec3 in_pos;
+in vec2 in_uv;
+
+// Salida hacia el fragment shader (sprite.frag)
+out vec2 v_uv;
+
+// Billboard orientado hacia la cámara
+uniform mat4 Mvp;
+
+void main() {
+    gl_Position = Mvp * vec4(in_pos, 1.0);
+    v_uv = in_uv;
+}
@@ -0,0 +1,14 @@
+#version 330
+
+// Índice del objeto + 1 (0 = ningún objeto en el píxel)
+uniform int u_object_id;
+
+in float v_distance;
+
+layout(location = 0) out int f_object_id;
+layout(location = 1) out float f_distance;
+
+void main() {
+    f_object_id = u_object_id;
+    f_distance = v_distance;
+}
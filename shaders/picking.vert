@@ -0,0 +1,25 @@
+#version 330
+
+in vec3 in_pos;
+
+// Distancia desde la cámara (la misma profundidad que escribe el raytracer)
+out float v_distance;
+
+// Datos compartidos por todo el frame (se escriben una vez por frame)
+layout(std140) uniform FrameData {
+    mat4 view;
+    mat4 projection;
+    vec4 cameraPosition;
+    vec4 time;
+};
+
+// Datos del objeto (sub-rango del UBO de objetos vinculado por draw)
+layout(std140) uniform ObjectData {
+    mat4 model;
+};
+
+void main() {
+    vec4 world = model * vec4(in_pos, 1.0);
+    v_distance = length(world.xyz - cameraPosition.xyz);
+    gl_Position = projection * view * world;
+}
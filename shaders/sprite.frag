@@ -3,6 +3,9 @@
 // Textura a muestrear (la generada por el compute shader)
 uniform sampler2D u_texture;
 
+// Fraccion de la textura con contenido (resolucion dinamica del raytracer)
+uniform vec2 u_uv_scale = vec2(1.0);
+
 // Coordenadas UV recibidas desde el vertex shader
 in vec2 v_uv;
 
@@ -10,6 +13,11 @@ in vec2 v_uv;
 out vec4 f_color;
 
 void main() {
-    // Tomar el color desde la textura
-    f_color = texture(u_texture, v_uv);
+    // Tomar el color desde la region renderizada de la textura (filtrado bilineal),
+    // sin muestrear mas alla del ultimo texel escrito
+    vec2 limit = u_uv_scale - 0.5 / vec2(textureSize(u_texture, 0));
+    f_color = texture(u_texture, min(v_uv * u_uv_scale, limit));
+
+    // Descartar los píxeles transparentes (fondo de los impostores)
+    if (f_color.a < 0.01) discard;
 }
@@ -0,0 +1,231 @@
+# benchmark.py
+# Benchmarks del motor. Uso (desde la raíz del proyecto):
+#   python src/benchmark.py acceleration [--objects N] [--rays N] [--frames N]
+#   python src/benchmark.py startup [--repeat N] [--width W] [--height H]
+#   python src/benchmark.py workgroup [--output PATH] [--width W] [--height H]
+#
+# acceleration: compara BVH (recursivo y LBVH) contra la grilla uniforme (UniformGrid) en
+# una escena estática (se construye una vez) y en una dinámica (una fracción de los objetos
+# se mueve en cada frame: el BVH se reconstruye y la grilla se actualiza).
+# startup: tiempo de import de los módulos principales y tiempo hasta el primer frame de
+# cada tipo de escena (imports + contexto + escena + primer render) en un contexto sin
+# ventana. Cada medición corre en un proceso nuevo; se informa la mediana.
+# workgroup: mide los tamaños de grupo local del compute shader en la escena GPU y guarda
+# el más rápido para este dispositivo (ver WORKGROUP_TUNING_PATH en main.py).
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+import numpy as np
+from bvh import BVH, intersect_aabb, inverse_direction
+from spatial_grid import UniformGrid
+from lbvh import LBVH
+
+SOURCE_DIR = os.path.dirname(os.path.abspath(__file__))
+STARTUP_MODULES = ("scene", "raytracer", "graphics", "shader_program", "moderngl")
+
+
+def random_boxes(rng, count, extent=100.0):
+    centers = rng.uniform(-extent * 0.5, extent * 0.5, (count, 3))
+    half_sizes = rng.uniform(0.2, 2.0, (count, 3))
+    return np.hstack([centers - half_sizes, centers + half_sizes])
+
+
+def random_rays(rng, count, extent=100.0):
+    origins = rng.uniform(-extent * 0.75, extent * 0.75, (count, 3))
+    directions = rng.normal(size=(count, 3))
+    directions /= np.linalg.norm(directions, axis=1, keepdims=True)
+    return origins, directions
+
+
+def build_structure(kind, bounds, previous=None):
+    if kind == "grid":
+        if previous is not None:
+            previous.update_all(bounds)
+            return previous
+        return UniformGrid(bounds)
+    prims = [{"aabb_min": row[:3], "aabb_max": row[3:]} for row in bounds]
+    return LBVH(prims) if kind == "lbvh" else BVH(prims)
+
+
+def cast_rays(structure, bounds, origins, directions):
+    rows = bounds.tolist()
+    hits = 0
+    for origin, direction in zip(origins.tolist(), directions.tolist()):
+        inv_direction = inverse_direction(direction)
+
+        def hit_fn(index):
+            span = intersect_aabb(origin, inv_direction, rows[index][:3], rows[index][3:])
+            return None if span is None else span[0]
+
+        if structure.closest_hit(origin, direction, hit_fn) is not None:
+            hits += 1
+    return hits
+
+
+def run_workload(kind, bounds, rays, frames, moving_fraction, rng):
+    """Devuelve (ms de construcción/actualización por frame, ms de rayos por frame)."""
+    bounds = bounds.copy()
+    build_time = query_time = 0.0
+    structure = None
+
+    for frame in range(frames):
+        if frame > 0 and moving_fraction > 0:
+            moving = rng.choice(len(bounds), int(len(bounds) * moving_fraction), replace=False)
+            bounds[moving] += np.tile(rng.uniform(-0.5, 0.5, (len(moving), 3)), 2)
+
+        start = time.perf_counter()
+        if structure is None or moving_fraction > 0:
+            structure = build_structure(kind, bounds, structure if kind == "grid" else None)
+        build_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        cast_rays(structure, bounds, *rays)
+        query_time += time.perf_counter() - start
+
+    return build_time / frames * 1000.0, query_time / frames * 1000.0
+
+
+def benchmark_acceleration(objects, ray_count, frames, seed=0):
+    rng = np.random.default_rng(seed)
+    bounds = random_boxes(rng, objects)
+    rays = random_rays(rng, ray_count)
+
+    print(f"{objects} objetos, {ray_count} rayos/frame, {frames} frames")
+    print(f"{'escena':<22}{'estructura':<10}{'build ms':>10}{'rayos ms':>10}{'total ms':>10}")
+    for label, fraction in (("estática", 0.0), ("dinámica (10%)", 0.1), ("dinámica (100%)", 1.0)):
+        for kind in ("bvh", "lbvh", "grid"):
+            build_ms, query_ms = run_workload(kind, bounds, rays, frames, fraction,
+                                              np.random.default_rng(seed + 1))
+            print(f"{label:<22}{kind:<10}{build_ms:>10.2f}{query_ms:>10.2f}{build_ms + query_ms:>10.2f}")
+
+
+def standalone_context():
+    """Contexto de OpenGL sin ventana (EGL si no hay display)."""
+    import moderngl
+    try:
+        return moderngl.create_standalone_context(require=430)
+    except Exception:
+        return moderngl.create_standalone_context(require=430, backend="egl")
+
+
+def build_scene(kind, width, height):
+    """Arma la escena de main.py ("normal", "cpu" o "gpu") en un contexto sin ventana."""
+    from texture import Texture
+    from material import Material, StandardMaterial
+    from shader_program import ShaderProgram
+    from cube import Cube
+    from quad import Quad
+    from camera import Camera
+    from scene import Scene, RayScene, RaySceneGPU
+
+    ctx = standalone_context()
+    ctx.simple_framebuffer((width, height)).use()
+    shader = ShaderProgram(ctx, 'shaders/basic.vert', 'shaders/basic.frag')
+    materials = [StandardMaterial(shader, Texture("u_texture", 1, 1, 3, None, color), reflectivity)
+                 for color, reflectivity in (((200, 10, 190), 0.0), ((0, 0, 255), 0.2), ((120, 90, 90), 0.1))]
+    objects = [Cube((2, 0, 5), (0, 0, 0), (1, 1, 1), name="Cube1"),
+               Cube((-2, 0, 5), (0, 0, 0), (1, 1, 1), name="Cube2"),
+               Quad((0, -5, 0), (-90, 0, 0), (10, 15, 1), name="Floor", animated=False, hittable=False)]
+    camera = Camera((0, 0, 15), (0, 0, 0), (0, 1, 0), 45, width / height, 0.01, 100.0)
+
+    if kind == "normal":
+        scene = Scene(ctx, camera)
+        objects = objects[:2]
+    else:
+        channels = 4 if kind == "gpu" else 3
+        sprite_material = Material(ShaderProgram(ctx, 'shaders/sprite.vert', 'shaders/sprite.frag'),
+                                   textures_data=[Texture(width=1, height=1, channels_amount=channels,
+                                                          color=(0,) * channels)])
+        sprite = Quad((0, 0, 0), (0, 0, 0), (10, 15, 1), name="Sprite", animated=False, hittable=False)
+        if kind == "cpu":
+            scene = RayScene(ctx, camera, width, height)
+            scene.add_object(sprite, sprite_material)
+        else:
+            scene = RaySceneGPU(ctx, camera, width, height, sprite, sprite_material)
+    for obj, material in zip(objects, materials):
+        scene.add_object(obj, material)
+    return scene
+
+
+def first_frame(kind, width, height):
+    """Ms desde los imports hasta terminar el primer frame de la escena de main.py."""
+    start = time.perf_counter()
+    scene = build_scene(kind, width, height)
+    ctx = scene.ctx
+    scene.start()
+    scene.render()
+    ctx.finish()
+    return (time.perf_counter() - start) * 1000.0
+
+
+def run_fresh(arguments, repeat):
+    """Mediana de los ms que imprime un proceso nuevo de Python con esos argumentos."""
+    timings = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, *arguments], capture_output=True, text=True, check=True)
+        timings.append(float(output.stdout.strip().splitlines()[-1]))
+    timings.sort()
+    return timings[len(timings) // 2]
+
+
+def benchmark_startup(repeat, width, height):
+    print(f"{'import':<28}{'ms':>10}")
+    for module in STARTUP_MODULES:
+        code = (f"import sys, time; sys.path.insert(0, {SOURCE_DIR!r}); start = time.perf_counter(); "
+                f"import {module}; print((time.perf_counter() - start) * 1000.0)")
+        print(f"{module:<28}{run_fresh(['-c', code], repeat):>10.2f}")
+
+    print(f"{'primer frame':<28}{'ms':>10}")
+    for kind in ("normal", "cpu", "gpu"):
+        arguments = [os.path.abspath(__file__), "first-frame", "--scene", kind,
+                     "--width", str(width), "--height", str(height)]
+        print(f"{kind + f' ({width}x{height})':<28}{run_fresh(arguments, repeat):>10.2f}")
+
+
+def benchmark_workgroup(path, width, height):
+    from workgroup_tuning import WorkgroupTuner, device_key
+
+    scene = build_scene("gpu", width, height)
+    scene.start()
+    tuner = WorkgroupTuner(path)
+    best = tuner.tune(scene.raytracer)
+
+    entry = tuner.results.get(device_key(scene.ctx), {})
+    print(device_key(scene.ctx))
+    print(f"{'grupo local':<14}{'ms':>10}")
+    for name, timing in entry.get("timings_ms", {}).items():
+        print(f"{name:<14}{timing:>10.3f}")
+    for (x, y), error in tuner.rejected.items():
+        print(f"{f'{x}x{y}':<14}{'descartado':>10}  {error}")
+    print(f"mejor: {best[0]}x{best[1]} (guardado en {path})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks del motor")
+    parser.add_argument("suite", choices=["acceleration", "startup", "workgroup", "first-frame"])
+    parser.add_argument("--objects", type=int, default=2000)
+    parser.add_argument("--rays", type=int, default=500)
+    parser.add_argument("--frames", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--width", type=int, default=160)
+    parser.add_argument("--height", type=int, default=120)
+    # first-frame: una sola medición (la usa startup en un proceso nuevo)
+    parser.add_argument("--scene", choices=["normal", "cpu", "gpu"], default="gpu")
+    parser.add_argument("--output", default="workgroup_tuning.json")
+    args = parser.parse_args()
+
+    if args.suite == "acceleration":
+        benchmark_acceleration(args.objects, args.rays, args.frames)
+    elif args.suite == "startup":
+        benchmark_startup(args.repeat, args.width, args.height)
+    elif args.suite == "workgroup":
+        benchmark_workgroup(args.output, args.width, args.height)
+    else:
+        print(first_frame(args.scene, args.width, args.height))
+
+
+if __name__ == "__main__":
+    main()
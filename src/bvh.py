@@ -26,6 +26,7 @@ class BVH:
     def __init__(self, prims):
         self.prims = prims
         self.nodes = []
+        self.__rows = None  # Nodos empaquetados como listas, para el recorrido en CPU
         self.build()
 
     def build(self):
@@ -72,8 +73,202 @@ class BVH:
 
         recurse(indices)
 
+    def to_array(self):
+        """Devuelve los nodos empaquetados como array (n, 8) float32 (dos vec4 por nodo)."""
+        return np.array([node.pack() for node in self.nodes], dtype='f4').reshape(-1, 8)
+
     def pack_to_bytes(self):
-        floats = []
-        for node in self.nodes:
-            floats.extend(node.pack())
-        return np.array(floats, dtype='f4').tobytes()
+        return self.to_array().tobytes()
+
+    def closest_hit(self, origin, direction, hit_fn):
+        """Hit más cercano del rayo contra las primitivas del BVH (ver closest_hit)."""
+        if self.__rows is None:
+            self.__rows = self.to_array().tolist()
+        return closest_hit(self.__rows, origin, direction, hit_fn)
+
+
+# ------------------------------------------------------
+# Recorrido en CPU
+# ------------------------------------------------------
+def intersect_aabb(origin, inv_direction, aabb_min, aabb_max):
+    """Test de slabs. Devuelve (t_near, t_far) si el rayo toca la caja, o None."""
+    t_near, t_far = 0.0, float('inf')
+    for axis in range(3):
+        t1 = (aabb_min[axis] - origin[axis]) * inv_direction[axis]
+        t2 = (aabb_max[axis] - origin[axis]) * inv_direction[axis]
+        if t1 > t2:
+            t1, t2 = t2, t1
+        t_near = max(t_near, t1)
+        t_far = min(t_far, t2)
+        if t_near > t_far:
+            return None
+    return t_near, t_far
+
+
+def inverse_direction(direction):
+    # Evita divisiones por cero en los ejes donde la dirección es nula
+    return tuple(1.0 / d if d != 0.0 else float('inf') if d >= 0 else float('-inf')
+                 for d in (float(direction[0]), float(direction[1]), float(direction[2])))
+
+
+def closest_hit(nodes, origin, direction, hit_fn):
+    """
+    Recorre un BVH empaquetado (filas de 8 floats como las de BVH.to_array(), en el mismo
+    formato que lee raytracing.comp) y devuelve (distancia, primitiva) del hit más cercano,
+    o None. hit_fn(primitiva) devuelve la distancia del rayo a la primitiva o None.
+    """
+    if len(nodes) == 0:
+        return None
+
+    origin = (float(origin[0]), float(origin[1]), float(origin[2]))
+    inv_direction = inverse_direction(direction)
+    closest = None
+    closest_distance = float('inf')
+
+    stack = [0]
+    while stack:
+        node = nodes[stack.pop()]
+        span = intersect_aabb(origin, inv_direction, node[0:3], node[4:7])
+        if span is None or span[0] >= closest_distance:
+            continue
+
+        left, right_or_prim = int(node[3]), int(node[7])
+        if right_or_prim >= 0:
+            distance = hit_fn(right_or_prim)
+            if distance is not None and distance < closest_distance:
+                closest_distance = distance
+                closest = right_or_prim
+        else:
+            if left >= 0:
+                stack.append(left)
+            right = -right_or_prim - 2
+            if right >= 0:
+                stack.append(right)
+
+    return None if closest is None else (closest_distance, closest)
+
+
+def stack_depth(nodes):
+    """
+    Cantidad máxima de entradas de pila que usa el recorrido con pila de un BVH
+    empaquetado (array (m, 8) de BVH.to_array()): igual a la cantidad de niveles del árbol.
+    Se calcula por niveles, en forma vectorizada.
+    """
+    if len(nodes) == 0:
+        return 1
+
+    left = nodes[:, 3].astype(np.int64)
+    right_or_prim = nodes[:, 7].astype(np.int64)
+    interior = right_or_prim < 0
+    right = -right_or_prim - 2
+
+    levels = 0
+    frontier = np.array([0], dtype=np.int64)
+    while len(frontier) > 0:
+        levels += 1
+        frontier = frontier[interior[frontier]]
+        children = np.concatenate([left[frontier], right[frontier]])
+        frontier = children[children >= 0]
+    return levels
+
+
+# ------------------------------------------------------
+# Reordenamiento de nodos para localidad de caché
+# ------------------------------------------------------
+def reorder_bvh(nodes, layout="dfs"):
+    """
+    Reordena un BVH empaquetado (array (m, 8) de BVH.to_array()) para que los dos hijos
+    de cada nodo queden contiguos (una sola lectura trae a ambos hermanos):
+        "dfs": pares de hermanos en orden de profundidad.
+        "veb": pares de hermanos en orden van Emde Boas (independiente del tamaño de caché).
+    La raíz queda en el índice 0 seguida de un nodo de relleno (nunca se visita), de modo
+    que cada par de hermanos empieza en un índice par: con nodos de 32 bytes, el par ocupa
+    una sola línea de caché de 64 bytes. Las primitivas se renumeran en el orden de las hojas.
+    Devuelve (nodos reordenados, prim_order) con prim_order[nuevo] = primitiva original;
+    los arrays por primitiva (matrices, materiales) deben permutarse con prim_order.
+    """
+    nodes = np.asarray(nodes, dtype='f4').reshape(-1, 8)
+    count = len(nodes)
+    if count == 0:
+        return nodes.copy(), np.zeros(0, dtype=np.int64)
+
+    left = nodes[:, 3].astype(np.int64)
+    right_or_prim = nodes[:, 7].astype(np.int64)
+    interior = right_or_prim < 0
+    right = np.where(interior, -right_or_prim - 2, -1)
+
+    def children(node):
+        return [child for child in (left[node], right[node]) if child >= 0]
+
+    if layout == "dfs":
+        order = []
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            if interior[node]:
+                order.append(node)
+                stack.extend(child for child in reversed(children(node)) if interior[child])
+    elif layout == "veb":
+        order = _van_emde_boas(0, children, interior)
+    else:
+        raise ValueError(f"Layout de BVH desconocido: {layout}")
+
+    # Raíz en 0; cada nodo interior (en el orden elegido) ubica a sus hijos juntos a partir
+    # de un índice par (los huecos quedan como nodos de relleno)
+    new_index = np.full(count, -1, dtype=np.int64)
+    new_index[0] = 0
+    position = 1
+    for node in order:
+        position += position % 2
+        for child in children(node):
+            new_index[child] = position
+            position += 1
+
+    # Primitivas renumeradas en el orden en que quedan las hojas
+    leaves = np.nonzero(~interior)[0]
+    leaves = leaves[np.argsort(new_index[leaves], kind='stable')]
+    prim_order = right_or_prim[leaves]
+
+    # Relleno: caja vacía sin hijos (interior con left = -1 y right_or_prim = -1)
+    reordered = np.zeros((max(position, 1), 8), dtype='f4')
+    reordered[:, 3] = -1.0
+    reordered[:, 7] = -1.0
+    reordered[new_index] = nodes
+    targets = new_index[np.arange(count)]
+    reordered[targets, 3] = np.where(left >= 0, new_index[np.maximum(left, 0)], -1)
+    reordered[targets, 7] = np.where(interior,
+                                     np.where(right >= 0, -new_index[np.maximum(right, 0)] - 2, -1),
+                                     0)
+    reordered[new_index[leaves], 7] = np.arange(len(leaves))
+    return reordered, prim_order
+
+
+def _van_emde_boas(root, children, interior):
+    # Orden van Emde Boas de los nodos interiores: la mitad superior del árbol y luego
+    # cada subárbol inferior, recursivamente
+    heights = {}
+
+    def height(node):
+        if node not in heights:
+            inner = [child for child in children(node) if interior[child]]
+            heights[node] = 1 + max((height(child) for child in inner), default=0)
+        return heights[node]
+
+    def at_depth(node, depth):
+        level = [node]
+        for _ in range(depth):
+            level = [child for parent in level for child in children(parent) if interior[child]]
+        return level
+
+    def layout(node, levels):
+        if levels == 1:
+            return [node]
+        top = levels // 2
+        order = layout(node, top)
+        for subtree in at_depth(node, top):
+            order.extend(layout(subtree, levels - top))
+        return order
+
+    if not interior[root]:
+        return []
+    return layout(root, height(root))
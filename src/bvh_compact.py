@@ -0,0 +1,248 @@
+# bvh_compact.py
+# Codificación compacta (cuantizada) del BVH para reducir el ancho de banda del recorrido.
+# Cada nodo es un registro de enteros: sus límites cuantizados a 8 o 16 bits relativos a
+# los límites (ya decodificados) de su padre, más una palabra de índice entera:
+#   bit 31 = hoja; hoja -> bits 0-30 = índice de primitiva
+#   interior -> bits 29-30 = cantidad de hijos - 1, bits 0-28 = primer hijo (hermanos contiguos)
+# 16 bits: 4 uints por nodo (16 bytes); 8 bits: 3 uints por nodo (12 bytes), contra los
+# 32 bytes de BVHNode.pack. Opcionalmente el árbol binario se colapsa a 4 hijos por nodo.
+# El buffer empieza con una cabecera de 8 palabras con los límites de la raíz en float32.
+# Si los hermanos ya son contiguos en la entrada (reorder_bvh con "dfs" o "veb") y el árbol
+# es binario, el registro i es el nodo i: se conserva el orden (y la alineación de los pares)
+# elegido. Si no, los registros se ubican en anchura para que los hermanos queden juntos.
+# Lo decodifican CompactBVH.closest_hit (CPU) y raytracing.comp con BVH_COMPACT_BITS.
+
+import numpy as np
+from bvh import intersect_aabb, inverse_direction
+
+HEADER_WORDS = 8
+LEAF_FLAG = 0x80000000
+COUNT_SHIFT = 29
+INDEX_MASK = (1 << COUNT_SHIFT) - 1
+PRIM_MASK = 0x7FFFFFFF
+
+
+class CompactBVH:
+    """
+    nodes: BVH empaquetado (array (m, 8) de BVH.to_array()).
+    bits: 8 o 16 bits por coordenada de los límites.
+    width: hijos por nodo interior (2 = binario, hasta 4 colapsando niveles).
+    """
+    def __init__(self, nodes, bits=16, width=2):
+        if bits not in (8, 16):
+            raise ValueError("bits debe ser 8 o 16")
+        if not 2 <= width <= 4:
+            raise ValueError("width debe estar entre 2 y 4")
+        self.bits = bits
+        self.width = width
+        self.levels = (1 << bits) - 1
+        self.record_words = 3 if bits == 8 else 4
+        self.__rows = None
+        self.__encode(np.asarray(nodes, dtype='f4').reshape(-1, 8))
+
+    # ------------------------------------------------------
+    # Codificación
+    # ------------------------------------------------------
+    @staticmethod
+    def __children(nodes, index):
+        right_or_prim = int(nodes[index, 7])
+        if right_or_prim >= 0:
+            return []
+        left, right = int(nodes[index, 3]), -right_or_prim - 2
+        return [child for child in (left, right) if child >= 0]
+
+    def __collapse(self, nodes, index):
+        # Sube nietos al nivel de los hijos (empezando por el de mayor superficie)
+        # hasta tener width hijos por nodo
+        children = self.__children(nodes, index)
+        while len(children) < self.width:
+            interior = [child for child in children if self.__children(nodes, child)]
+            if not interior:
+                break
+            extent = nodes[interior, 4:7] - nodes[interior, 0:3]
+            area = extent[:, 0] * extent[:, 1] + extent[:, 1] * extent[:, 2] + extent[:, 2] * extent[:, 0]
+            chosen = interior[int(np.argmax(area))]
+            position = children.index(chosen)
+            children[position:position + 1] = self.__children(nodes, chosen)
+        return children
+
+    def __quantize(self, boxes, frame_min, frame_max):
+        """Cuantiza límites (k, 6) dentro del marco de forma conservadora; devuelve (q, decodificados)."""
+        scale = (frame_max - frame_min) / np.float32(self.levels)
+        safe = np.where(scale > 0, scale, np.float32(1.0))
+        q_min = np.clip(np.floor((boxes[:, 0:3] - frame_min) / safe), 0, self.levels)
+        q_max = np.clip(np.ceil((boxes[:, 3:6] - frame_min) / safe), 0, self.levels)
+        q_min = np.where(scale > 0, q_min, 0).astype(np.int64)
+        q_max = np.where(scale > 0, q_max, 0).astype(np.int64)
+
+        # Corregir redondeos en float32 para que la caja decodificada siempre contenga a la real
+        decoded_min = self.__dequantize(q_min, frame_min, scale)
+        q_min = np.where(decoded_min > boxes[:, 0:3], np.maximum(q_min - 1, 0), q_min)
+        decoded_max = self.__dequantize(q_max, frame_min, scale)
+        q_max = np.where(decoded_max < boxes[:, 3:6], np.minimum(q_max + 1, self.levels), q_max)
+
+        decoded = np.concatenate([self.__dequantize(q_min, frame_min, scale),
+                                  self.__dequantize(q_max, frame_min, scale)], axis=1)
+        return np.concatenate([q_min, q_max], axis=1), decoded
+
+    @staticmethod
+    def __dequantize(q, frame_min, scale):
+        return (frame_min + q.astype('f4') * scale).astype('f4')
+
+    def __pack_bounds(self, q):
+        # q: (k, 6) enteros -> palabras (k, record_words - 1)
+        q = q.astype(np.uint64)
+        if self.bits == 16:
+            return np.stack([q[:, 0] | (q[:, 1] << 16),
+                             q[:, 2] | (q[:, 3] << 16),
+                             q[:, 4] | (q[:, 5] << 16)], axis=1)
+        return np.stack([q[:, 0] | (q[:, 1] << 8) | (q[:, 2] << 16) | (q[:, 3] << 24),
+                         q[:, 4] | (q[:, 5] << 8)], axis=1)
+
+    def __encode(self, nodes):
+        self.root_min = np.zeros(3, dtype='f4')
+        self.root_max = np.zeros(3, dtype='f4')
+        self.records = np.zeros((0, self.record_words), dtype='u4')
+        self.stack_depth = 1
+        if len(nodes) == 0:
+            return
+
+        self.root_min, self.root_max = nodes[0, 0:3].copy(), nodes[0, 4:7].copy()
+        keep_order = self.width == 2 and self.__siblings_contiguous(nodes)
+        # Por registro: (palabras de límites, palabra de índice); con keep_order, uno por
+        # nodo de entrada (los de relleno quedan en cero y nunca se visitan)
+        empty = np.zeros(self.record_words - 1, dtype=np.uint64)
+        records = [[empty, 0] for _ in range(len(nodes))] if keep_order else [[empty, 0]]
+        q, decoded = self.__quantize(nodes[0:1, [0, 1, 2, 4, 5, 6]], self.root_min, self.root_max)
+        records[0] = [self.__pack_bounds(q)[0], 0]
+
+        # Recorrido en anchura: los hijos de cada nodo quedan en registros contiguos
+        queue = [(0, 0, decoded[0])]
+        children_of = {}
+        head = 0
+        while head < len(queue):
+            node, record, box = queue[head]
+            head += 1
+            right_or_prim = int(nodes[node, 7])
+            if right_or_prim >= 0:
+                records[record][1] = LEAF_FLAG | (right_or_prim & PRIM_MASK)
+                continue
+
+            children = self.__collapse(nodes, node)
+            first = children[0] if keep_order else len(records)
+            q, decoded = self.__quantize(nodes[children][:, [0, 1, 2, 4, 5, 6]], box[0:3], box[3:6])
+            for position, (child, bounds_words, child_box) in enumerate(zip(children, self.__pack_bounds(q),
+                                                                           decoded)):
+                if keep_order:
+                    records[child] = [bounds_words, 0]
+                else:
+                    records.append([bounds_words, 0])
+                queue.append((child, first + position, child_box))
+            records[record][1] = ((len(children) - 1) << COUNT_SHIFT) | first
+            children_of[record] = list(range(first, first + len(children)))
+
+        self.records = np.array([[*bounds, index] for bounds, index in records], dtype=np.uint64).astype('u4')
+        self.stack_depth = self.__stack_depth(children_of)
+
+    @staticmethod
+    def __siblings_contiguous(nodes):
+        # Cada nodo interior tiene sus dos hijos en índices consecutivos (left, left + 1)
+        right_or_prim = nodes[:, 7].astype(np.int64)
+        interior = right_or_prim < 0
+        left = nodes[interior, 3].astype(np.int64)
+        right = -right_or_prim[interior] - 2
+        reachable = (left >= 0) | (right >= 0)
+        return bool(np.all((left[reachable] >= 0) & (right[reachable] == left[reachable] + 1)))
+
+    @staticmethod
+    def __stack_depth(children_of):
+        # Máximo de entradas de pila del recorrido (se apilan todos los hijos de cada nodo
+        # y se sigue por el último apilado), calculado de las hojas hacia la raíz (postorden:
+        # con el orden de la entrada, un hijo no siempre tiene un índice mayor que su padre)
+        postorder = []
+        stack = [0]
+        while stack:
+            record = stack.pop()
+            if record in children_of:
+                postorder.append(record)
+                stack.extend(children_of[record])
+        need = {}
+        for record in reversed(postorder):
+            children = children_of[record]
+            count = len(children)
+            deepest = max(count - 1 - position + need.get(child, 0)
+                          for position, child in enumerate(reversed(children)))
+            need[record] = max(count, deepest)
+        return max(1, need.get(0, 1))
+
+    # ------------------------------------------------------
+    # Empaquetado
+    # ------------------------------------------------------
+    def to_array(self):
+        """Cabecera (límites de la raíz en float32) + registros, como array uint32."""
+        header = np.zeros(HEADER_WORDS, dtype='f4')
+        header[0:3] = self.root_min
+        header[4:7] = self.root_max
+        return np.concatenate([header.view('u4'), self.records.ravel()])
+
+    def pack_to_bytes(self):
+        return self.to_array().tobytes()
+
+    @property
+    def nbytes(self):
+        return HEADER_WORDS * 4 + self.records.nbytes
+
+    # ------------------------------------------------------
+    # Decodificación y recorrido en CPU
+    # ------------------------------------------------------
+    def decode_bounds(self, record, frame_min, frame_max):
+        """Límites (min, max) de un registro dentro del marco de su padre (listas de floats)."""
+        words = self.__rows[record] if self.__rows is not None else self.records[record].tolist()
+        if self.bits == 16:
+            q = (words[0] & 0xFFFF, words[0] >> 16, words[1] & 0xFFFF,
+                 words[1] >> 16, words[2] & 0xFFFF, words[2] >> 16)
+        else:
+            q = (words[0] & 0xFF, (words[0] >> 8) & 0xFF, (words[0] >> 16) & 0xFF,
+                 words[0] >> 24, words[1] & 0xFF, (words[1] >> 8) & 0xFF)
+        scale = [(frame_max[axis] - frame_min[axis]) / self.levels for axis in range(3)]
+        box_min = [frame_min[axis] + q[axis] * scale[axis] for axis in range(3)]
+        box_max = [frame_min[axis] + q[axis + 3] * scale[axis] for axis in range(3)]
+        return box_min, box_max
+
+    def closest_hit(self, origin, direction, hit_fn):
+        """
+        Mismo recorrido que raytracing.comp con BVH_COMPACT_BITS: devuelve (distancia,
+        primitiva) del hit más cercano o None. hit_fn(primitiva) da la distancia o None.
+        """
+        if len(self.records) == 0:
+            return None
+        if self.__rows is None:
+            self.__rows = self.records.tolist()
+
+        origin = (float(origin[0]), float(origin[1]), float(origin[2]))
+        inv_direction = inverse_direction(direction)
+        closest = None
+        closest_distance = float('inf')
+
+        root_min, root_max = self.root_min.tolist(), self.root_max.tolist()
+        stack = [(0, *self.decode_bounds(0, root_min, root_max))]
+        while stack:
+            record, box_min, box_max = stack.pop()
+            span = intersect_aabb(origin, inv_direction, box_min, box_max)
+            if span is None or span[0] >= closest_distance:
+                continue
+
+            index = self.__rows[record][-1]
+            if index & LEAF_FLAG:
+                primitive = index & PRIM_MASK
+                distance = hit_fn(primitive)
+                if distance is not None and distance < closest_distance:
+                    closest_distance = distance
+                    closest = primitive
+            else:
+                first = index & INDEX_MASK
+                count = (index >> COUNT_SHIFT) + 1
+                for child in range(first, first + count):
+                    stack.append((child, *self.decode_bounds(child, box_min, box_max)))
+
+        return None if closest is None else (closest_distance, closest)
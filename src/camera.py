@@ -1,9 +1,23 @@
 # camera.py
 # Cámara para ray tracing con soporte para degradado de cielo (skybox gradiente).
 # Incluye la obtención de la matriz de vista e inversa, necesaria para compute shaders.
+# Para el raytracer en CPU guarda la grilla de direcciones de los rayos primarios en
+# espacio de cámara (solo depende de los intrínsecos: tamaño, fov y aspecto), de modo que
+# cada frame las lleva al mundo con una sola multiplicación por la rotación de la vista.
+# El degradado de cielo se precalcula en una tabla (LUT) que se consulta vectorizada. La
+# tabla interpola linealmente point ** 1.5, así que no es idéntica a la fórmula con pow:
+# con 1024 entradas el error es de milésimas de nivel (muy por debajo de 1/255), pero al
+# truncar a uint8 unos pocos píxeles por frame pueden quedar un nivel por debajo o encima.
 
 from ray import Ray
 import glm
+import numpy as np
+
+# Entradas de la tabla del degradado de cielo (altura de -1 a 1)
+SKY_LUT_SIZE = 1024
+# Cota del error de interpolar point ** 1.5 en la tabla, relativa a |superior - inferior|:
+# el peor intervalo es el primero, con h ** 1.5 * (1/3 - (1/3) ** 1.5) < 0.15 * h ** 1.5
+SKY_LUT_ERROR = 0.15 * (1.0 / (SKY_LUT_SIZE - 1)) ** 1.5
 
 
 class Camera:
@@ -22,6 +36,13 @@ class Camera:
         # Colores del degradado de cielo (superior e inferior)
         self.__sky_color_top = None
         self.__sky_color_bottom = None
+        self.__sky_lut = None
+        self.__sky_lut_vectors = None
+
+        # Direcciones de los rayos primarios en espacio de cámara y los intrínsecos con
+        # los que se calcularon (se recalculan solo si cambian)
+        self.__directions = None
+        self.__directions_key = None
     
     # ------------------------------------------------------
     # Degradado de cielo
@@ -30,11 +51,31 @@ class Camera:
         """Configura los colores del degradado de cielo."""
         self.__sky_color_top = glm.vec3(*top)
         self.__sky_color_bottom = glm.vec3(*bottom)
+        # Tabla del degradado: el pow se evalúa una vez por entrada y no por píxel
+        point = np.linspace(0.0, 1.0, SKY_LUT_SIZE) ** 1.5
+        self.__sky_lut = ((1.0 - point)[:, None] * np.array(self.__sky_color_bottom)
+                          + point[:, None] * np.array(self.__sky_color_top))
+        self.__sky_lut_vectors = [glm.vec3(*color) for color in self.__sky_lut]
     
+    @property
+    def sky_colors(self):
+        """(superior, inferior) del degradado de cielo, o None si no se configuró."""
+        if self.__sky_color_top is None:
+            return None
+        return self.__sky_color_top, self.__sky_color_bottom
+
     def get_sky_gradient(self, height):
         """Devuelve el color interpolado según la altura (height entre -1 y 1)."""
-        point = pow(0.5 * (height + 1.0), 1.5)
-        return (1.0 - point) * self.__sky_color_bottom + point * self.__sky_color_top
+        position = min(max(0.5 * (height + 1.0), 0.0), 1.0) * (SKY_LUT_SIZE - 1)
+        index = min(int(position), SKY_LUT_SIZE - 2)
+        return glm.mix(self.__sky_lut_vectors[index], self.__sky_lut_vectors[index + 1], position - index)
+
+    def sky_gradients(self, heights):
+        """Colores del degradado (..., 3) para un array de alturas, interpolando la tabla."""
+        position = np.clip(0.5 * (np.asarray(heights, dtype='f8') + 1.0), 0.0, 1.0) * (SKY_LUT_SIZE - 1)
+        index = np.minimum(position.astype(np.int64), SKY_LUT_SIZE - 2)
+        weight = (position - index)[..., None]
+        return self.__sky_lut[index] * (1.0 - weight) + self.__sky_lut[index + 1] * weight
 
     # ------------------------------------------------------
     # Matrices de cámara
@@ -66,3 +107,30 @@ class Camera:
         ray_dir_world = glm.vec3(glm.inverse(view) * glm.vec4(ray_dir_camera, 0.0))
 
         return Ray(self.position, ray_dir_world)
+
+    def camera_directions(self, width, height):
+        """
+        Direcciones normalizadas (height, width, 3) de los rayos primarios en espacio de
+        cámara, con u = x / (width - 1) y v = y / (height - 1) como en raycast(). Se guardan
+        y solo se recalculan si cambian el tamaño, el fov o el aspecto.
+        """
+        key = (width, height, self.fov, self.aspect)
+        if key != self.__directions_key:
+            fov_adjustment = np.tan(np.radians(self.fov) / 2)
+            u = np.arange(width) / max(width - 1, 1)
+            v = np.arange(height) / max(height - 1, 1)
+            directions = np.empty((height, width, 3), dtype='f8')
+            directions[..., 0] = ((2 * u - 1) * self.aspect * fov_adjustment)[None, :]
+            directions[..., 1] = ((2 * v - 1) * fov_adjustment)[:, None]
+            directions[..., 2] = -1.0
+            directions /= np.linalg.norm(directions, axis=-1, keepdims=True)
+            self.__directions = directions
+            self.__directions_key = key
+        return self.__directions
+
+    def ray_directions(self, width, height):
+        """Direcciones (height, width, 3) de los rayos primarios en el mundo para este frame."""
+        # glm guarda por columnas: las filas de to_list() son las columnas de la rotación,
+        # así que d_mundo = d_cámara @ rotación
+        rotation = np.array(glm.mat3(self.get_inverse_view_matrix()).to_list(), dtype='f8')
+        return self.camera_directions(width, height) @ rotation
@@ -0,0 +1,294 @@
+# capture.py
+# Exportación de frames a secuencias de imágenes o a un encoder de video externo.
+# El hilo principal solo copia el frame (ImageData/array de NumPy, textura o framebuffer)
+# a un buffer de un pool y lo encola; hilos de escritura lo convierten a RGB de 8 bits, lo
+# codifican (PNG, PPM o crudo) y lo escriben, o lo mandan por stdin a un proceso encoder
+# (por ejemplo ffmpeg con -f rawvideo). La cola es acotada: si los escritores no dan abasto
+# el frame se descarta (y se cuenta) en vez de frenar el loop de render.
+# Los buffers se reciclan: después del primer frame no se reserva memoria por frame.
+# Los framebuffers se leen con un anillo de pixel-pack buffers (PBO): glReadPixels copia a
+# un PBO sin esperar a la GPU y ese PBO recién se mapea readback_latency frames después,
+# cuando la copia ya terminó, así que el hilo principal no se frena en cada frame.
+
+import os
+import queue
+import struct
+import subprocess
+import threading
+import zlib
+import numpy as np
+from texture import ImageData
+
+FORMATS = ("png", "ppm", "raw", "pipe")
+
+
+class BufferPool:
+    """
+    Buffers de NumPy reutilizables de una misma forma y tipo; capacity acota cuántos
+    existen a la vez (los que están en la cola más los que se están escribiendo).
+    """
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.__free = []
+        self.__allocated = 0
+        self.__lock = threading.Lock()
+
+    def acquire(self, shape, dtype):
+        """Un buffer libre de esa forma y tipo, uno nuevo si hay lugar, o None si no queda."""
+        shape, dtype = tuple(shape), np.dtype(dtype)
+        with self.__lock:
+            while self.__free:
+                buffer = self.__free.pop()
+                if buffer.shape == shape and buffer.dtype == dtype:
+                    return buffer
+                # Buffer de un tamaño anterior (la ventana cambió de tamaño): se descarta
+                self.__allocated -= 1
+            if self.__allocated >= self.capacity:
+                return None
+            self.__allocated += 1
+        return np.empty(shape, dtype=dtype)
+
+    def release(self, buffer):
+        with self.__lock:
+            self.__free.append(buffer)
+
+
+def to_rgb8(image, flip=True):
+    """
+    Frame (alto, ancho, canales) uint8 o float en [0, 1] a RGB uint8 contiguo. Con flip, las
+    filas se invierten (OpenGL guarda la primera fila abajo; las imágenes, arriba).
+    """
+    if image.dtype != np.uint8:
+        image = (np.clip(image, 0.0, 1.0) * 255.0 + 0.5).astype(np.uint8)
+    if image.ndim == 2:
+        image = image[..., None]
+    if image.shape[2] == 1:
+        image = np.repeat(image, 3, axis=2)
+    image = image[..., :3]
+    if flip:
+        image = image[::-1]
+    return np.ascontiguousarray(image)
+
+
+def encode_png(rgb, compress_level=6):
+    """PNG RGB de 8 bits sin dependencias (filtro 0 por fila + zlib)."""
+    height, width = rgb.shape[:2]
+    rows = np.empty((height, width * 3 + 1), dtype=np.uint8)
+    rows[:, 0] = 0
+    rows[:, 1:] = rgb.reshape(height, width * 3)
+
+    def chunk(kind, data):
+        return (struct.pack(">I", len(data)) + kind + data
+                + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF))
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header)
+            + chunk(b"IDAT", zlib.compress(rows.tobytes(), compress_level)) + chunk(b"IEND", b""))
+
+
+def encode_ppm(rgb):
+    """PPM binario (P6)."""
+    height, width = rgb.shape[:2]
+    return b"P6\n%d %d\n255\n" % (width, height) + rgb.tobytes()
+
+
+class FrameCapture:
+    """
+    directory: carpeta de salida de las imágenes (se crea si no existe).
+    format: "png", "ppm", "raw" (bytes RGB sin encabezado) o "pipe" (frames crudos RGB por
+    stdin a command; los argumentos pueden usar {width} y {height}, por ejemplo
+    ["ffmpeg", "-y", "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", "{width}x{height}",
+    "-r", "30", "-i", "-", "salida.mp4"]).
+    queue_size: frames en espera como máximo; si la cola está llena el frame se descarta.
+    writers: hilos de escritura (el pipe usa uno solo para conservar el orden).
+    flip: invertir las filas (frames leídos de OpenGL).
+    readback_latency: frames que espera la lectura de un framebuffer en su PBO antes de
+    mapearlo (submit_framebuffer); flush() o close() vacían las lecturas pendientes.
+    """
+    def __init__(self, directory="capture", format="png", command=None, queue_size=8, writers=2,
+                 flip=True, pattern="frame_{index:05d}", compress_level=6, readback_latency=2):
+        if format not in FORMATS:
+            raise ValueError(f"Formato de captura desconocido: {format}")
+        if format == "pipe" and not command:
+            raise ValueError("El formato 'pipe' requiere el comando del encoder")
+        self.directory = directory
+        self.format = format
+        self.command = command
+        self.flip = flip
+        self.pattern = pattern
+        self.compress_level = compress_level
+        if format != "pipe":
+            os.makedirs(directory, exist_ok=True)
+
+        writers = 1 if format == "pipe" else max(1, writers)
+        self.readback_latency = max(0, readback_latency)
+        self.__queue = queue.Queue(maxsize=queue_size)
+        self.__pool = BufferPool(queue_size + writers + self.readback_latency)
+        # Lecturas de framebuffer en vuelo: (PBO, buffer de destino), de la más vieja a la
+        # más nueva, y PBOs libres para reutilizar
+        self.__readbacks = []
+        self.__free_pbos = []
+        self.__process = None
+        self.__error = None
+        self.__index = 0
+        self.written = 0
+        self.dropped = 0
+        self.__lock = threading.Lock()
+        self.__threads = [threading.Thread(target=self.__write_loop, name=f"capture-{number}", daemon=True)
+                          for number in range(writers)]
+        for thread in self.__threads:
+            thread.start()
+
+    # -------------------------------
+    # Hilo principal: copiar y encolar
+    # -------------------------------
+    def submit(self, image):
+        """
+        Encola una copia del frame (ImageData, por ejemplo RayTracer.get_texture(), o un
+        array (alto, ancho, canales)). Devuelve False si se descartó.
+        """
+        data = image.data if isinstance(image, ImageData) else np.asarray(image)
+        self.flush()  # Los frames se encolan en el orden en que llegan
+        buffer = self.__acquire(data.shape, data.dtype)
+        if buffer is None:
+            return False
+        np.copyto(buffer, data)
+        return self.__enqueue(buffer)
+
+    def submit_texture(self, texture_ctx):
+        """Encola el contenido de una textura de moderngl (lectura directa al buffer del pool)."""
+        width, height = texture_ctx.size
+        dtype = 'u1' if texture_ctx.dtype == 'f1' else texture_ctx.dtype
+        self.flush()
+        buffer = self.__acquire((height, width, texture_ctx.components), dtype)
+        if buffer is None:
+            return False
+        texture_ctx.read_into(buffer)
+        return self.__enqueue(buffer)
+
+    def submit_framebuffer(self, fbo, viewport=None):
+        """
+        Encola el color de un framebuffer (por ejemplo ctx.screen) en RGB de 8 bits. La
+        lectura va a un PBO y el frame se encola readback_latency llamadas después.
+        """
+        x, y, width, height = viewport or fbo.viewport
+        buffer = self.__acquire((height, width, 3), 'u1')
+        if buffer is None:
+            return False
+        pbo = self.__pixel_buffer(fbo.ctx, buffer.nbytes)
+        fbo.read_into(pbo, viewport=(x, y, width, height), components=3)
+        self.__readbacks.append((pbo, buffer))
+        while len(self.__readbacks) > self.readback_latency:
+            self.__finish_readback()
+        return True
+
+    def flush(self):
+        """Encola las lecturas de framebuffer pendientes (espera a que terminen)."""
+        while self.__readbacks:
+            self.__finish_readback()
+
+    def __pixel_buffer(self, ctx, size):
+        # PBO libre del tamaño del frame (uno de otro tamaño se libera y se crea uno nuevo)
+        while self.__free_pbos:
+            pbo = self.__free_pbos.pop()
+            if pbo.size == size:
+                return pbo
+            pbo.release()
+        return ctx.buffer(reserve=size)
+
+    def __finish_readback(self):
+        # La lectura más vieja ya terminó en la GPU: mapear el PBO no espera
+        pbo, buffer = self.__readbacks.pop(0)
+        pbo.read_into(buffer)
+        self.__free_pbos.append(pbo)
+        self.__enqueue(buffer)
+
+    def __acquire(self, shape, dtype):
+        self.__raise_error()
+        buffer = self.__pool.acquire(shape, dtype)
+        if buffer is None:
+            self.dropped += 1
+        return buffer
+
+    def __enqueue(self, buffer):
+        try:
+            self.__queue.put_nowait((self.__index, buffer))
+        except queue.Full:
+            self.__pool.release(buffer)
+            self.dropped += 1
+            return False
+        self.__index += 1
+        return True
+
+    def close(self):
+        """Espera a que se escriban los frames encolados y termina los hilos y el encoder."""
+        self.flush()
+        for pbo in self.__free_pbos:
+            pbo.release()
+        self.__free_pbos = []
+        for _ in self.__threads:
+            self.__queue.put(None)
+        for thread in self.__threads:
+            thread.join()
+        self.__threads = []
+        if self.__process is not None:
+            self.__process.stdin.close()
+            self.__process.wait()
+            self.__process = None
+        self.__raise_error()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __raise_error(self):
+        # Los errores de los hilos de escritura se propagan en el hilo principal
+        if self.__error is not None:
+            error, self.__error = self.__error, None
+            raise error
+
+    # -------------------------------
+    # Hilos de escritura
+    # -------------------------------
+    def __write_loop(self):
+        while True:
+            item = self.__queue.get()
+            if item is None:
+                return
+            index, buffer = item
+            try:
+                if self.__error is None:
+                    self.__write(index, to_rgb8(buffer, self.flip))
+                    with self.__lock:
+                        self.written += 1
+            except Exception as error:
+                self.__error = error
+            finally:
+                self.__pool.release(buffer)
+
+    def __write(self, index, rgb):
+        if self.format == "pipe":
+            self.__pipe(rgb)
+            return
+        if self.format == "png":
+            data = encode_png(rgb, self.compress_level)
+        elif self.format == "ppm":
+            data = encode_ppm(rgb)
+        else:
+            data = rgb.tobytes()
+        path = os.path.join(self.directory, f"{self.pattern.format(index=index)}.{self.format}")
+        with open(path, "wb") as file:
+            file.write(data)
+
+    def __pipe(self, rgb):
+        # El encoder se lanza con el primer frame, cuando ya se conoce el tamaño
+        height, width = rgb.shape[:2]
+        if self.__process is None:
+            command = [argument.format(width=width, height=height) for argument in self.command]
+            self.__process = subprocess.Popen(command, stdin=subprocess.PIPE)
+            self.__size = (width, height)
+        if (width, height) != self.__size:
+            raise ValueError("El encoder por pipe requiere frames de tamaño fijo")
+        self.__process.stdin.write(rgb.data)
@@ -0,0 +1,46 @@
+# change_tracker.py
+# Detección de cambios entre frames para renderizar solo cuando hace falta (on-demand).
+# La firma de un frame junta en un array de floats la cámara, las transformaciones de los
+# objetos y sus materiales; si es igual a la del último frame renderizado, la escena no
+# cambió y alcanza con volver a presentar la última imagen.
+
+import numpy as np
+
+
+def camera_signature(camera):
+    """Valores de la cámara que cambian la imagen: posición, orientación, proyección y cielo."""
+    sky = getattr(camera, "sky_colors", None) or ((0, 0, 0), (0, 0, 0))
+    return [*camera.position, *camera.target, *camera.up,
+            camera.fov, camera.aspect, camera.near, camera.far, *sky[0], *sky[1]]
+
+
+def object_signature(obj, material):
+    """Transformación del objeto y datos de su material (color y reflectividad, si tiene)."""
+    color = getattr(material, "color_RGB", (0, 0, 0))
+    return [*obj.position, *obj.rotation, *obj.scale,
+            *(float(channel) for channel in color), getattr(material, "reflectivity", 0.0)]
+
+
+class ChangeTracker:
+    """Compara la firma de cada frame con la del último frame renderizado."""
+    def __init__(self):
+        self.__last = None
+
+    @staticmethod
+    def signature(camera, objects, materials):
+        values = camera_signature(camera)
+        for obj, material in zip(objects, materials):
+            values.extend(object_signature(obj, material))
+        return np.array(values, dtype='f8')
+
+    def changed(self, signature):
+        """Indica si la firma es distinta de la del último frame renderizado."""
+        return self.__last is None or not np.array_equal(signature, self.__last)
+
+    def commit(self, signature):
+        """Registra la firma del frame que se acaba de renderizar."""
+        self.__last = signature
+
+    def invalidate(self):
+        """Fuerza que el próximo frame se considere cambiado (por ejemplo, al recargar shaders)."""
+        self.__last = None
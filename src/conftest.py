@@ -0,0 +1,61 @@
+# conftest.py
+# Escena de prueba compartida por los tests de las estructuras de aceleración: AABBs y
+# rayos aleatorios (los mismos generadores que benchmark.py) y el hit más cercano por
+# fuerza bruta contra el que se comparan BVH, LBVH, BVH compacto y grilla.
+
+import numpy as np
+import pytest
+from benchmark import random_boxes, random_rays
+from bvh import intersect_aabb, inverse_direction
+
+
+class BoxScene:
+    def __init__(self, seed, count=300, ray_count=400, extent=40.0):
+        rng = np.random.default_rng(seed)
+        # Los límites ya redondeados a float32, como quedan en los nodos del BVH
+        self.bounds = random_boxes(rng, count, extent).astype('f4').astype('f8')
+        self.rows = self.bounds.tolist()
+        origins, directions = random_rays(rng, ray_count, extent)
+        self.rays = list(zip(origins.tolist(), directions.tolist()))
+
+    @property
+    def prims(self):
+        return [{"aabb_min": row[:3], "aabb_max": row[3:]} for row in self.rows]
+
+    def hit_fn(self, origin, direction, order=None):
+        """hit_fn(primitiva) de closest_hit; order traduce índices renumerados a originales."""
+        inv_direction = inverse_direction(direction)
+
+        def hit(index):
+            row = self.rows[index if order is None else order[index]]
+            span = intersect_aabb(origin, inv_direction, row[:3], row[3:])
+            return None if span is None else span[0]
+        return hit
+
+    def brute_force(self, origin, direction):
+        """(distancia, primitiva) del hit más cercano probando todas las cajas, o None."""
+        hit = self.hit_fn(origin, direction)
+        closest = None
+        for index in range(len(self.rows)):
+            distance = hit(index)
+            if distance is not None and (closest is None or distance < closest[0]):
+                closest = (distance, index)
+        return closest
+
+    def assert_matches(self, origin, direction, result, order=None):
+        """result (de closest_hit) coincide con la fuerza bruta para ese rayo."""
+        expected = self.brute_force(origin, direction)
+        if expected is None:
+            assert result is None
+            return
+        assert result is not None
+        distance, primitive = result
+        primitive = primitive if order is None else int(order[primitive])
+        assert distance == expected[0]
+        # Con distancias empatadas (rayo que nace dentro de dos cajas) vale cualquiera
+        assert self.hit_fn(origin, direction)(primitive) == distance
+
+
+@pytest.fixture(params=[0, 1])
+def box_scene(request):
+    return BoxScene(request.param)
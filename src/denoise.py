@@ -0,0 +1,198 @@
+# denoise.py
+# Denoiser en CPU (NumPy vectorizado) para imágenes de pocas muestras por píxel, y su
+# versión en GPU (DenoisePass).
+# Filtro à-trous (wavelet "con agujeros"): varias pasadas de un kernel B3-spline de 5x5
+# cuyo paso se duplica en cada pasada (1, 2, 4, ...), de modo que cubre radios grandes con
+# solo 25 muestras por píxel y pasada. Los pesos se cortan en los bordes usando las AOVs
+# del rayo primario (normal del mundo, profundidad lineal y albedo) y el propio color, así
+# que se suaviza dentro de cada superficie sin mezclar objetos distintos.
+# Con demodulate=True se filtra la iluminación (color / albedo) y se vuelve a multiplicar
+# por el albedo, para no borronear los detalles de los materiales. El albedo se limita a
+# ALBEDO_FLOOR: con albedos casi negros la división amplifica el ruido y el peso por color
+# deja de separar superficies.
+# DenoisePass aplica el mismo filtro en GPU (shaders/denoise.comp) sobre la textura de
+# salida de RayTracerGPU, sin leer la imagen a la CPU.
+
+import numpy as np
+from shader_program import ComputeShaderProgram
+from texture_pool import texture_pool
+
+# Kernel B3-spline 1D (el 2D es el producto de dos de estos)
+B3_SPLINE = (1.0 / 16.0, 1.0 / 4.0, 3.0 / 8.0, 1.0 / 4.0, 1.0 / 16.0)
+# Albedo mínimo al demodular
+ALBEDO_FLOOR = 0.05
+
+
+class AOVImages:
+    """
+    Salidas auxiliares del rayo primario, arrays (alto, ancho, ...) float32:
+        depth: profundidad lineal (0 = cielo); normal: normal del mundo (0 = cielo);
+        albedo: color del material (o del cielo) en [0, 1].
+    """
+    def __init__(self, depth, normal, albedo):
+        self.depth = np.asarray(depth, dtype='f4')
+        self.normal = np.asarray(normal, dtype='f4')
+        self.albedo = np.asarray(albedo, dtype='f4')
+
+    @classmethod
+    def empty(cls, width, height):
+        return cls(np.zeros((height, width), dtype='f4'), np.zeros((height, width, 3), dtype='f4'),
+                   np.zeros((height, width, 3), dtype='f4'))
+
+    def region(self, width, height):
+        """Las AOVs de la esquina width x height (la región renderizada)."""
+        return AOVImages(self.depth[:height, :width], self.normal[:height, :width],
+                         self.albedo[:height, :width])
+
+
+class Denoiser:
+    """
+    iterations: pasadas del filtro (radio efectivo 2 * (2^iterations - 1) píxeles).
+    sigma_color: tolerancia a diferencias de color (se reduce a la mitad en cada pasada).
+    sigma_normal: exponente del peso por normales (más alto = bordes más marcados).
+    sigma_depth: tolerancia a diferencias de profundidad relativa.
+    demodulate: filtrar la iluminación (color / albedo) en vez del color.
+    """
+    def __init__(self, iterations=4, sigma_color=0.5, sigma_normal=64.0, sigma_depth=0.1,
+                 demodulate=True):
+        self.iterations = iterations
+        self.sigma_color = sigma_color
+        self.sigma_normal = sigma_normal
+        self.sigma_depth = sigma_depth
+        self.demodulate = demodulate
+
+    def denoise(self, color, aovs):
+        """
+        Filtra color (alto, ancho, canales) en [0, 1] (uint8 se normaliza y se devuelve
+        como uint8). Los canales extra (alfa) se conservan sin filtrar.
+        """
+        is_byte = color.dtype == np.uint8
+        image = color.astype('f4') / 255.0 if is_byte else color.astype('f4', copy=True)
+        rgb = image[..., :3]
+
+        albedo = np.maximum(aovs.albedo, ALBEDO_FLOOR)
+        signal = rgb / albedo if self.demodulate else rgb
+        depth = aovs.depth
+        normal = aovs.normal
+        background = depth <= 0.0
+
+        for iteration in range(self.iterations):
+            signal = self.__atrous_pass(signal, normal, depth, background, 1 << iteration,
+                                        self.sigma_color / (1 << iteration))
+
+        image[..., :3] = np.clip(signal * albedo if self.demodulate else signal, 0.0, 1.0)
+        if is_byte:
+            return (image * 255.0 + 0.5).astype(np.uint8)
+        return image
+
+    def __atrous_pass(self, signal, normal, depth, background, step, sigma_color):
+        # Una pasada: 25 vecinos a distancia step, con pesos B3-spline y de borde
+        height, width = depth.shape
+        pad = 2 * step
+        padded_signal = np.pad(signal, ((pad, pad), (pad, pad), (0, 0)), mode='edge')
+        padded_normal = np.pad(normal, ((pad, pad), (pad, pad), (0, 0)), mode='edge')
+        padded_depth = np.pad(depth, pad, mode='edge')
+        padded_background = np.pad(background, pad, mode='edge')
+
+        # Escala de la profundidad: diferencias relativas a la del píxel central
+        depth_scale = self.sigma_depth * np.maximum(depth, 1e-3)
+        inv_color = 1.0 / max(sigma_color * sigma_color, 1e-8)
+
+        total = np.zeros_like(signal)
+        weights = np.zeros((height, width), dtype='f4')
+        for dy, kernel_y in zip(range(-2, 3), B3_SPLINE):
+            for dx, kernel_x in zip(range(-2, 3), B3_SPLINE):
+                rows = slice(pad + dy * step, pad + dy * step + height)
+                cols = slice(pad + dx * step, pad + dx * step + width)
+                sample = padded_signal[rows, cols]
+                sample_background = padded_background[rows, cols]
+
+                color_distance = np.sum((sample - signal) ** 2, axis=-1)
+                weight = np.exp(-color_distance * inv_color)
+                # El cielo solo se mezcla con cielo; las superficies, según normal y profundidad
+                alignment = np.maximum(np.sum(padded_normal[rows, cols] * normal, axis=-1), 0.0)
+                surface = (alignment ** self.sigma_normal
+                           * np.exp(-np.abs(padded_depth[rows, cols] - depth) / depth_scale))
+                weight *= np.where(background, sample_background,
+                                   np.where(sample_background, 0.0, surface))
+                weight *= kernel_x * kernel_y
+
+                total += sample * weight[..., None]
+                weights += weight
+
+        # El píxel central siempre tiene peso (kernel > 0), así que weights > 0
+        return total / weights[..., None]
+
+
+class DenoisePass:
+    """
+    El filtro de un Denoiser en GPU: una pasada de compute shader que copia la señal
+    (demodulada) a una textura auxiliar y una por iteración, alternando entre dos
+    texturas auxiliares rgba32f del pool; la última escribe la textura de salida.
+    """
+    SHADER_PATH = "shaders/denoise.comp"
+    LOCAL_SIZE = 16
+    # Unidades de textura de la entrada y las AOVs (la 7 es el atlas de materiales) y
+    # unidad de imagen de la salida (0-5 las usa raytracing.comp)
+    TEXTURE_UNITS = (8, 9, 10)
+    IMAGE_UNIT = 6
+
+    def __init__(self, ctx):
+        self.ctx = ctx
+        self.__program = None
+        self.__scratch = ()
+
+    @property
+    def program(self):
+        # Se compila en el primer uso
+        if self.__program is None:
+            self.__program = ComputeShaderProgram(self.ctx, self.SHADER_PATH,
+                                                  defines={"LOCAL_SIZE": self.LOCAL_SIZE})
+        return self.__program
+
+    def __reserve(self, size):
+        # Texturas auxiliares del tamaño de la salida (las anteriores vuelven al pool)
+        if self.__scratch and tuple(self.__scratch[0].size) == tuple(size):
+            return
+        for texture in self.__scratch:
+            texture_pool.release_texture(texture)
+        self.__scratch = tuple(texture_pool.acquire_texture(self.ctx, size, 4, 'f4') for _ in range(2))
+
+    def run(self, denoiser, color, normal_depth, albedo, render_size):
+        """
+        Filtra en el lugar la región render_size de color (textura rgba32f) con los
+        parámetros de denoiser y las AOVs normal_depth y albedo (texturas rgba32f).
+        """
+        if denoiser.iterations <= 0:
+            return
+        self.__reserve(color.size)
+        program = self.program
+        input_unit, normal_unit, albedo_unit = self.TEXTURE_UNITS
+        normal_depth.use(normal_unit)
+        albedo.use(albedo_unit)
+        program.set_uniform("inputColor", input_unit)
+        program.set_uniform("aovNormalDepth", normal_unit)
+        program.set_uniform("aovAlbedo", albedo_unit)
+        program.set_uniform("renderSize", tuple(render_size))
+        program.set_uniform("demodulate", denoiser.demodulate)
+        program.set_uniform("albedoFloor", ALBEDO_FLOOR)
+        program.set_uniform("sigmaNormal", denoiser.sigma_normal)
+        program.set_uniform("sigmaDepth", denoiser.sigma_depth)
+
+        width, height = render_size
+        groups = ((width + self.LOCAL_SIZE - 1) // self.LOCAL_SIZE,
+                  (height + self.LOCAL_SIZE - 1) // self.LOCAL_SIZE)
+        source = color
+        for iteration in range(-1, denoiser.iterations):
+            last = iteration == denoiser.iterations - 1
+            target = color if last else self.__scratch[0] if source is not self.__scratch[0] else self.__scratch[1]
+            program.set_uniform("stepSize", 0 if iteration < 0 else 1 << iteration)
+            program.set_uniform("sigmaColor", denoiser.sigma_color / (1 << max(iteration, 0)))
+            program.set_uniform("lastPass", last)
+            # Las escrituras de la pasada anterior deben verse al leer la textura
+            self.ctx.memory_barrier()
+            source.use(input_unit)
+            target.bind_to_image(self.IMAGE_UNIT, read=False, write=True)
+            program.run(*groups)
+            source = target
+        self.ctx.memory_barrier()
@@ -0,0 +1,82 @@
+# frame_pipeline.py
+# Pipeline asíncrono con doble buffer para preparar los datos de la escena GPU.
+# El hilo principal anima la escena y copia su estado (matrices de modelo, AABBs y tiempo)
+# a un juego de buffers de staging de NumPy; un hilo de trabajo prepara con esa copia las
+# inversas y el BVH mientras el hilo principal sube y despacha el frame anterior desde el
+# otro juego. El hilo de trabajo nunca lee los objetos de la escena, solo su copia, así
+# que el hilo principal puede seguir usándolos (picking, firma del frame) sin carreras.
+# Las llamadas a OpenGL quedan siempre en el hilo principal. El costo es un frame de
+# latencia entre la animación y la imagen.
+
+import numpy as np
+
+
+class FrameStaging:
+    """Buffers de staging en CPU con los datos de un frame."""
+    def __init__(self, count):
+        # Entradas (las escribe el hilo principal): matrices, AABBs (min | max) y tiempo
+        self.models = np.zeros((count, 16), dtype='f4')
+        self.bounds = np.zeros((count, 6), dtype='f4')
+        self.time = 0.0
+        # Salidas (las escribe el hilo de trabajo)
+        self.inverse = np.zeros((count, 16), dtype='f4')
+        self.primitives = []
+        # (nodos, prim_order) tal como los devuelve RayTracerGPU.prepare_bvh
+        self.bvh = (np.zeros((0, 8), dtype='f4'), None)
+
+
+class FramePipeline:
+    """
+    snapshot: función que copia el estado de la escena a las entradas de un FrameStaging
+    (se ejecuta en el hilo principal, antes de encolar el frame).
+    prepare: función que completa las salidas de un FrameStaging a partir de sus entradas
+    (se ejecuta en el hilo de trabajo).
+    count: cantidad de objetos de la escena.
+    """
+    def __init__(self, snapshot, prepare, count):
+        self.__snapshot = snapshot
+        self.__prepare = prepare
+        self.__staging = [FrameStaging(count), FrameStaging(count)]
+        # concurrent.futures se importa solo si se usa el pipeline
+        from concurrent.futures import ThreadPoolExecutor
+        self.__executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="frame-prep")
+        self.__pending = None
+        self.__next = 0
+
+    def start(self):
+        """Empieza a preparar el primer frame en segundo plano."""
+        if self.__pending is None:
+            self.__submit()
+
+    def __submit(self):
+        staging = self.__staging[self.__next]
+        self.__snapshot(staging)
+        self.__pending = self.__executor.submit(self.__prepare, staging)
+        self.__next = 1 - self.__next
+
+    def next_frame(self):
+        """
+        Espera a que el frame preparado esté listo, lanza la preparación del siguiente
+        en el otro buffer y devuelve el listo para subir a la GPU.
+        """
+        self.start()
+        ready = self.__staging[1 - self.__next]
+        self.__pending.result()  # Propaga excepciones del hilo de trabajo
+        self.__submit()
+        return ready
+
+    def discard(self):
+        """
+        Espera y descarta el frame en preparación (por ejemplo, si la escena dejó de
+        animarse): el próximo next_frame() prepara uno nuevo con el estado actual.
+        """
+        if self.__pending is not None:
+            self.__pending.result()
+            self.__pending = None
+
+    def stop(self):
+        """Espera el frame en curso y termina el hilo de trabajo."""
+        if self.__pending is not None:
+            self.__pending.result()
+            self.__pending = None
+        self.__executor.shutdown(wait=True)
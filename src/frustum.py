@@ -0,0 +1,97 @@
+# frustum.py
+# Culling por frustum de visión para la escena rasterizada.
+# Extrae los seis planos del frustum a partir de Projection × View y prueba todos los
+# AABB de la escena contra ellos en una sola pasada vectorizada con NumPy.
+# Para escenas grandes se puede recorrer el BVH por niveles y descartar subárboles enteros.
+
+import numpy as np
+
+
+def extract_frustum_planes(view_projection):
+    """
+    Devuelve los 6 planos (izquierdo, derecho, inferior, superior, cercano, lejano)
+    como array (6, 4) con (nx, ny, nz, d) normalizados. Un punto p está dentro del
+    plano si dot(n, p) + d >= 0.
+    """
+    # glm guarda por columnas: la traspuesta deja las filas de la matriz
+    m = np.frombuffer(view_projection.to_bytes(), dtype='f4').reshape(4, 4).T.astype('f8')
+    planes = np.array([
+        m[3] + m[0],
+        m[3] - m[0],
+        m[3] + m[1],
+        m[3] - m[1],
+        m[3] + m[2],
+        m[3] - m[2],
+    ])
+    planes /= np.linalg.norm(planes[:, :3], axis=1, keepdims=True)
+    return planes
+
+
+def classify_aabbs(planes, mins, maxs):
+    """
+    Clasifica n cajas (mins, maxs de forma (n, 3)) contra el frustum.
+    Devuelve (visible, inside): visible si la caja toca el frustum,
+    inside si está completamente dentro de los seis planos.
+    """
+    normals = planes[:, :3]
+    positive = normals >= 0
+
+    # Vértice "p" (más adentro en la dirección de la normal) y vértice "n" (más afuera)
+    p_vertex = np.where(positive[None, :, :], maxs[:, None, :], mins[:, None, :])
+    n_vertex = np.where(positive[None, :, :], mins[:, None, :], maxs[:, None, :])
+
+    p_distance = np.einsum('kpj,pj->kp', p_vertex, normals) + planes[:, 3]
+    n_distance = np.einsum('kpj,pj->kp', n_vertex, normals) + planes[:, 3]
+
+    visible = np.all(p_distance >= 0, axis=1)
+    inside = np.all(n_distance >= 0, axis=1)
+    return visible, inside
+
+
+def aabbs_in_frustum(planes, mins, maxs):
+    """Máscara booleana (n,) de las cajas visibles."""
+    return classify_aabbs(planes, mins, maxs)[0]
+
+
+def cull_bvh(planes, nodes):
+    """
+    Culling jerárquico sobre un BVH empaquetado (array (m, 8) de BVH.to_array()).
+    Recorre el árbol por niveles: cada nivel se prueba en una sola pasada vectorizada;
+    los subárboles fuera del frustum se descartan y los completamente dentro se aceptan
+    sin más pruebas. Devuelve los índices de las primitivas visibles.
+    """
+    if len(nodes) == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    left = nodes[:, 3].astype(np.int64)
+    right_or_prim = nodes[:, 7].astype(np.int64)
+    is_leaf = right_or_prim >= 0
+    right = -right_or_prim - 2
+
+    frontier = np.array([0], dtype=np.int64)
+    inside = np.array([False])
+    visible_prims = []
+
+    while len(frontier) > 0:
+        # Probar solo los nodos que no se sabe si están completamente dentro
+        test = ~inside
+        if np.any(test):
+            tested = frontier[test]
+            visible, fully_inside = classify_aabbs(planes, nodes[tested, 0:3], nodes[tested, 4:7])
+            keep = np.ones(len(frontier), dtype=bool)
+            keep[test] = visible
+            inside = inside.copy()
+            inside[test] = fully_inside
+            frontier, inside = frontier[keep], inside[keep]
+
+        leaves = is_leaf[frontier]
+        visible_prims.append(right_or_prim[frontier[leaves]])
+
+        interior = frontier[~leaves]
+        interior_inside = inside[~leaves]
+        children = np.concatenate([left[interior], right[interior]])
+        children_inside = np.concatenate([interior_inside, interior_inside])
+        valid = children >= 0
+        frontier, inside = children[valid], children_inside[valid]
+
+    return np.concatenate(visible_prims)
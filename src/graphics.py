@@ -5,6 +5,8 @@
 
 import numpy as np
 import glm  # asegúrate de tener glm para las transformaciones
+from model import pack_indices
+from texture_pool import texture_pool
 
 class Graphics:
     def __init__(self, ctx, model, material):
@@ -12,26 +14,73 @@ class Graphics:
         self.__model = model
         self.__material = material
         
-        # Crear buffers (VBO, IBO, VAO)
+        # Crear buffers: un VBO intercalado por layout e IBO con índices u2/u4 (ver model.py)
         self.__vbo = self.create_buffers()
-        self.__ibo = ctx.buffer(model.indices.tobytes())
-        self.__vao = ctx.vertex_array(material.shader_program.prog, [*self.__vbo], self.__ibo)
+        self.__ibo = self.create_index_buffer(model.indices)
+        self.__vao = self.__create_vertex_array(model.vertex_layout, self.__vbo, self.__ibo)
+        # Buffers y VAOs de los niveles de detalle adicionales del modelo (LOD 1, 2, ...)
+        self.__lod_ibos = [self.create_index_buffer(lod.indices) for lod in model.lods]
+        self.__lod_vbos, self.__lod_vaos = self.__create_lod_vertex_arrays()
+        # Versión del programa con la que se creó el VAO (cambia con la recarga en caliente)
+        self.__program_version = material.shader_program.version
+        # VAOs de la misma geometría con otros programas (id del programa, nivel) -> (versión, VAO)
+        self.__extra_vaos = {}
         
-        # Cargar texturas en GPU usando diccionario (nombre -> textura_ctx)
-        self.__textures = self.load_textures(material.textures_data)
+        # Texturas en GPU (nombre -> (Texture, textura_ctx)); se crean en el primer uso
+        # (ver __gl_textures), así que una textura reemplazada antes de dibujar no se sube
+        self.__textures = None
     
-    def create_buffers(self):
-        # Crear buffers según el vertex layout del modelo
-        buffers = []
-        shader_attributes = self.__material.shader_program.attributes
-        
-        for attribute in self.__model.vertex_layout.get_attributes():
-            if attribute.name in shader_attributes:
-                vbo = self.__ctx.buffer(attribute.array.tobytes())
-                buffers.append((vbo, attribute.format, attribute.name))
-        
-        return buffers
+    @property
+    def model(self):
+        return self.__model
+
+    @property
+    def material(self):
+        return self.__material
+
+    def has_uniform_block(self, name):
+        """Indica si el shader del material declara el uniform block indicado."""
+        return name in self.__material.shader_program.uniform_blocks
+
+    def create_buffers(self, vertex_layout=None):
+        # Un solo VBO con todos los atributos del vertex layout del modelo (o el indicado)
+        # intercalados; no depende del shader, así que sobrevive a la recarga en caliente
+        vertex_layout = vertex_layout or self.__model.vertex_layout
+        return self.__ctx.buffer(vertex_layout.interleaved())
+
+    def create_index_buffer(self, indices):
+        # IBO con el tipo de índice más chico posible: (buffer, bytes por índice)
+        packed, element_size = pack_indices(indices)
+        return self.__ctx.buffer(packed), element_size
+
+    def __create_vertex_array(self, vertex_layout, vbo, ibo, shader_program=None):
+        # Formato del VBO intercalado salteando los atributos que el shader no usa
+        shader_program = shader_program or self.__material.shader_program
+        vertex_format, names = vertex_layout.vertex_format(shader_program.attributes)
+        content = [(vbo, vertex_format, *names)] if names else []
+        index_buffer, element_size = ibo
+        return self.__ctx.vertex_array(shader_program.prog, content, index_buffer,
+                                       index_element_size=element_size)
     
+    def __create_lod_vertex_arrays(self):
+        # VBO de cada nivel (los que comparten vértices con el modelo base reutilizan el suyo)
+        lod_vbos = [self.__vbo if lod.vertex_layout is self.__model.vertex_layout
+                    else self.create_buffers(lod.vertex_layout) for lod in self.__model.lods]
+        return lod_vbos, self.__create_lod_vaos(lod_vbos)
+
+    def __create_lod_vaos(self, lod_vbos):
+        return [self.__create_vertex_array(lod.vertex_layout, vbo, ibo)
+                for lod, vbo, ibo in zip(self.__model.lods, lod_vbos, self.__lod_ibos)]
+
+    def __rebuild_vertex_array(self):
+        # Los VBOs intercalados se conservan: solo cambia el formato según los atributos del shader
+        shader_program = self.__material.shader_program
+        for vao in [self.__vao, *self.__lod_vaos]:
+            vao.release()
+        self.__vao = self.__create_vertex_array(self.__model.vertex_layout, self.__vbo, self.__ibo)
+        self.__lod_vaos = self.__create_lod_vaos(self.__lod_vbos)
+        self.__program_version = shader_program.version
+
     def load_textures(self, textures_data):
         """
         Carga texturas en GPU. Detecta si image_data es float32 (RGBA32F) y crea
@@ -41,81 +90,164 @@ class Graphics:
         for texture in textures_data:
             if not texture.image_data:
                 continue
+            textures[texture.name] = (texture, self.__upload(texture))
+        
+        return textures
 
-            np_data = texture.image_data.data
-            size = texture.size
-            channels = texture.channels_amount
-
-            # Determinar tipo de dato
-            if np_data.dtype == np.float32:
-                texture_ctx = self.__ctx.texture(size, channels, np_data.tobytes(), dtype='f4')
-            else:
-                texture_ctx = self.__ctx.texture(size, channels, np_data.tobytes())
+    @staticmethod
+    def __texture_format(texture):
+        # (tamaño, canales, dtype de moderngl) de la textura GL para los datos de texture
+        dtype = 'f4' if texture.image_data.data.dtype == np.float32 else 'f1'
+        return tuple(texture.size), texture.channels_amount, dtype
 
-            # Configurar repetición y mipmaps
-            if texture.build_mipmaps:
-                texture_ctx.build_mipmaps()
-            texture_ctx.repeat_x = texture.repeat_x
-            texture_ctx.repeat_y = texture.repeat_y
+    def __upload(self, texture, texture_ctx=None):
+        # Escribe los datos en texture_ctx si tiene el mismo formato; si no, en una textura
+        # del pool (ver texture_pool.py). Devuelve la textura GL usada.
+        size, channels, dtype = self.__texture_format(texture)
+        if texture_ctx is None or (tuple(texture_ctx.size), texture_ctx.components, texture_ctx.dtype) != \
+                (size, channels, dtype):
+            texture_ctx = texture_pool.acquire_texture(self.__ctx, size, channels, dtype, clear=False)
+        texture_ctx.write(np.ascontiguousarray(texture.image_data.data))
 
-            textures[texture.name] = (texture, texture_ctx)
-        
-        return textures
+        # Configurar repetición y mipmaps
+        if texture.build_mipmaps:
+            texture_ctx.build_mipmaps()
+        texture_ctx.repeat_x = texture.repeat_x
+        texture_ctx.repeat_y = texture.repeat_y
+        return texture_ctx
     
+    @property
+    def __gl_textures(self):
+        # Carga diferida: las texturas del material se suben a la GPU la primera vez que se usan
+        if self.__textures is None:
+            self.__textures = self.load_textures(self.__material.textures_data)
+        return self.__textures
+
     def update_texture(self, texture_name, new_data):
         """Actualiza textura existente con nuevos datos (para raytracing en CPU/GPU)."""
+        if self.__textures is None:
+            # Todavía no se subió: alcanza con reemplazar los datos, se suben al usarla
+            texture_obj = next((texture for texture in self.__material.textures_data
+                                if texture.name == texture_name), None)
+            if texture_obj is None:
+                raise ValueError(f"No existe la textura {texture_name}")
+            texture_obj.update_data(new_data)
+            return
+
         if texture_name not in self.__textures:
             raise ValueError(f"No existe la textura {texture_name}")
         
         texture_obj, texture_ctx = self.__textures[texture_name]
         texture_obj.update_data(new_data)
         
-        # CRITICO: Recrear la textura si los tipos de datos son diferentes
-        np_data = texture_obj.image_data.data
-        size = texture_obj.size
-        channels = texture_obj.channels_amount
-        
-        # Determinar tipo de dato y recrear textura
-        if np_data.dtype == np.float32:
-            new_texture_ctx = self.__ctx.texture(size, channels, np_data.tobytes(), dtype='f4')
-        else:
-            new_texture_ctx = self.__ctx.texture(size, channels, np_data.tobytes())
-        
-        # Configurar repetición y mipmaps
-        if texture_obj.build_mipmaps:
-            new_texture_ctx.build_mipmaps()
-        new_texture_ctx.repeat_x = texture_obj.repeat_x
-        new_texture_ctx.repeat_y = texture_obj.repeat_y
-        
-        # Liberar la textura antigua
-        texture_ctx.release()
-        
-        # Actualizar la referencia
-        self.__textures[texture_name] = (texture_obj, new_texture_ctx)
+        # Con el mismo tamaño, canales y tipo de dato se escribe en el lugar; si cambian
+        # (por ejemplo uint8 -> float32) la textura antigua vuelve al pool
+        new_texture_ctx = self.__upload(texture_obj, texture_ctx)
+        if new_texture_ctx is not texture_ctx:
+            texture_pool.release_texture(texture_ctx)
+            self.__textures[texture_name] = (texture_obj, new_texture_ctx)
+
+    def write_texture(self, texture_name, data, viewport=None):
+        """
+        Escribe datos en la textura GL existente sin recrearla; viewport (x, y, ancho, alto)
+        limita la escritura a una región (data debe tener ese tamaño).
+        """
+        if texture_name not in self.__gl_textures:
+            raise ValueError(f"No existe la textura {texture_name}")
+        texture_ctx = self.__gl_textures[texture_name][1]
+        texture_ctx.write(np.ascontiguousarray(data), viewport=viewport)
+
+    def read_texture(self, texture_name):
+        """Lee la textura GL completa como array (alto, ancho, canales) de su tipo de dato."""
+        if texture_name not in self.__gl_textures:
+            raise ValueError(f"No existe la textura {texture_name}")
+        texture_ctx = self.__gl_textures[texture_name][1]
+        width, height = texture_ctx.size
+        # 'f1' es el tipo de moderngl para texturas de 8 bits normalizadas
+        dtype = 'u1' if texture_ctx.dtype == 'f1' else texture_ctx.dtype
+        data = np.frombuffer(texture_ctx.read(), dtype=dtype)
+        return data.reshape(height, width, texture_ctx.components)
+
+    def set_texture(self, name, texture_ctx, texture=None):
+        """Asigna una textura GL ya creada (por ejemplo, el color de un framebuffer)."""
+        self.__gl_textures[name] = (texture, texture_ctx)
+
+    def replace_texture(self, name, texture_ctx, texture=None):
+        """
+        Como set_texture(), pero la textura GL anterior con ese nombre (cargada por este
+        Graphics o tomada del pool) vuelve al pool de texturas.
+        """
+        previous = self.__gl_textures.get(name)
+        self.__gl_textures[name] = (texture, texture_ctx)
+        if previous is not None and previous[1] is not texture_ctx:
+            texture_pool.release_texture(previous[1])
 
     def bind_to_image(self, name="u_texture", unit=0, read=False, write=True):
         """
         Vincula la textura a una unidad de imagen accesible desde compute shaders.
         """
-        if name not in self.__textures:
+        if name not in self.__gl_textures:
             raise ValueError(f"No existe la textura {name} para bind_to_image()")
-        texture_ctx = self.__textures[name][1]
+        texture_ctx = self.__gl_textures[name][1]
         texture_ctx.bind_to_image(unit, read, write)
 
-    def render(self, uniforms):
-        """Renderiza el modelo aplicando uniforms y texturas."""
-        # Actualizar uniforms dinámicos (MVP, etc.)
+    @property
+    def texture_key(self):
+        """Identifica el conjunto de texturas GL vinculadas (para agrupar draws)."""
+        return tuple(tex_ctx.glo for _, tex_ctx in self.__gl_textures.values())
+
+    def set_uniforms(self, uniforms):
+        """Actualiza uniforms dinámicos (MVP, etc.); los que no existen en el shader se ignoran."""
+        shader_program = self.__material.shader_program
         for name, value in uniforms.items():
-            if name in self.__material.shader_program.prog:
-                self.__material.set_uniform(name, value)
-        
-        # Vincular texturas activas
-        for i, (name, (tex, tex_ctx)) in enumerate(self.__textures.items()):
+            shader_program.set_uniform(name, value)
+
+    def bind_textures(self):
+        """Vincula las texturas del material a sus unidades y asigna los samplers."""
+        shader_program = self.__material.shader_program
+        for i, (name, (tex, tex_ctx)) in enumerate(self.__gl_textures.items()):
             tex_ctx.use(i)
-            self.__material.shader_program.set_uniform(name, i)
-        
-        # Dibujar el VAO
-        self.__vao.render()
+            shader_program.set_uniform(name, i)
+
+    @property
+    def lod_count(self):
+        return 1 + len(self.__lod_vaos)
+
+    def draw(self, level=0):
+        """Dibuja el VAO del nivel de detalle indicado con el estado ya vinculado."""
+        # Si el shader se recargó, regenerar buffers y VAO con el nuevo programa
+        if self.__program_version != self.__material.shader_program.version:
+            self.__rebuild_vertex_array()
+        if level <= 0 or not self.__lod_vaos:
+            self.__vao.render()
+        else:
+            self.__lod_vaos[min(level, len(self.__lod_vaos)) - 1].render()
+
+    def draw_with(self, shader_program, level=0):
+        """
+        Dibuja la geometría del nivel indicado con otro programa (por ejemplo, el de ids de
+        picking), reutilizando los mismos VBO e IBO. Los uniforms deben estar ya asignados.
+        """
+        level = min(max(level, 0), len(self.__lod_vaos))
+        key = (id(shader_program), level)
+        version, vao = self.__extra_vaos.get(key, (None, None))
+        if vao is None or version != shader_program.version:
+            if vao is not None:
+                vao.release()
+            if level == 0:
+                buffers = (self.__model.vertex_layout, self.__vbo, self.__ibo)
+            else:
+                buffers = (self.__model.lods[level - 1].vertex_layout, self.__lod_vbos[level - 1],
+                           self.__lod_ibos[level - 1])
+            vao = self.__create_vertex_array(*buffers, shader_program)
+            self.__extra_vaos[key] = (shader_program.version, vao)
+        vao.render()
+
+    def render(self, uniforms):
+        """Renderiza el modelo aplicando uniforms y texturas."""
+        self.set_uniforms(uniforms)
+        self.bind_textures()
+        self.draw()
 
 
 class ComputeGraphics(Graphics):
@@ -142,15 +274,3 @@ class ComputeGraphics(Graphics):
         m = self.__model.get_model_matrix()
         inverse = glm.inverse(m)
         inverse_transformations_matrix[index, :] = np.array(inverse.to_list(), dtype="f4").reshape(16)
-    
-    def create_material_matrix(self, materials_matrix, index):
-        """Guarda color RGB y reflectividad del material."""
-        reflectivity = self.__material.reflectivity
-        r, g, b = self.__material.color_RGB
-        
-        # Normalizar valores a [0,1]
-        r = r / 255.0 if r > 1.0 else r
-        g = g / 255.0 if g > 1.0 else g
-        b = b / 255.0 if b > 1.0 else b
-        
-        materials_matrix[index, :] = np.array([r, g, b, reflectivity], dtype="f4")
\ No newline at end of file
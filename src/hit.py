@@ -4,6 +4,7 @@
 # Incluye cajas alineadas (AABB) y cajas orientadas (OBB).
 
 import glm
+import numpy as np
 
 class Hit:
     def __init__(self, get_model_matrix, hittable=True):
@@ -81,6 +82,12 @@ class HitBoxOBB(Hit):
         # Si el objeto no es "golpeable", retornamos False inmediatamente
         if not self.hittable:
             return False
+        return self.hit_distance(origin, direction) is not None
+
+    def hit_distance(self, origin, direction):
+        # Devuelve la distancia (en espacio del mundo) al punto de entrada, o None si no hay hit
+        if not self.hittable:
+            return None
 
         # Convertimos origen y dirección a vectores glm
         origin = glm.vec3(origin)
@@ -111,5 +118,64 @@ class HitBoxOBB(Hit):
         t_near = max(t1.x, t1.y, t1.z)
         t_far = min(t2.x, t2.y, t2.z)
 
-        # True si hay colisión (entrada antes que salida y no detrás del origen)
-        return t_near <= t_far and t_far >= 0
+        # Hay colisión si la entrada es antes que la salida y no está detrás del origen
+        if t_near > t_far or t_far < 0:
+            return None
+
+        # Punto de impacto (o el origen si está dentro de la caja) llevado al mundo
+        t_local = max(t_near, 0.0)
+        hit_world = glm.vec3(self.model_matrix * glm.vec4(local_origin + local_dir * t_local, 1.0))
+        return glm.length(hit_world - origin)
+
+    def hit_distances(self, origins, directions):
+        """
+        Versión vectorizada de hit_distance para muchos rayos a la vez (arrays (n, 3)):
+        devuelve un array (n,) float32 con la distancia de cada rayo, o inf si no toca.
+        """
+        origins = np.asarray(origins, dtype='f4').reshape(-1, 3)
+        distances = np.full(len(origins), np.inf, dtype='f4')
+        if not self.hittable:
+            return distances
+        directions = np.asarray(directions, dtype='f4').reshape(-1, 3)
+        directions = directions / np.linalg.norm(directions, axis=1, keepdims=True)
+
+        # Matrices por columnas (como glm): p' = p @ M[:3, :3] + M[3, :3]
+        model = np.array(self.model_matrix.to_list(), dtype='f4')
+        inv_model = np.array(glm.inverse(self.model_matrix).to_list(), dtype='f4')
+        local_origins = origins @ inv_model[:3, :3] + inv_model[3, :3]
+        local_dirs = directions @ inv_model[:3, :3]
+        local_dirs = local_dirs / np.linalg.norm(local_dirs, axis=1, keepdims=True)
+
+        # Intersección con el cubo unitario de -1 a 1 en espacio local
+        with np.errstate(divide='ignore', invalid='ignore'):
+            tmin = (-1.0 - local_origins) / local_dirs
+            tmax = (1.0 - local_origins) / local_dirs
+        t_near = np.minimum(tmin, tmax).max(axis=1)
+        t_far = np.maximum(tmin, tmax).min(axis=1)
+        hit = (t_near <= t_far) & (t_far >= 0)
+        if not np.any(hit):
+            return distances
+
+        # Punto de impacto (o el origen si está dentro de la caja) llevado al mundo
+        t_local = np.maximum(t_near[hit], 0.0)[:, None]
+        local_hits = local_origins[hit] + local_dirs[hit] * t_local
+        world_hits = local_hits @ model[:3, :3] + model[3, :3]
+        distances[hit] = np.linalg.norm(world_hits - origins[hit], axis=1)
+        return distances
+
+    def hit_normal(self, origin, direction):
+        # Devuelve la normal (en espacio del mundo) de la cara de entrada, o None si no hay hit
+        distance = self.hit_distance(origin, direction)
+        if distance is None:
+            return None
+
+        # Punto de impacto en espacio local: la cara es el eje con la coordenada más cercana a ±1
+        hit_world = glm.vec3(origin) + glm.normalize(glm.vec3(direction)) * distance
+        inv_model = glm.inverse(self.model_matrix)
+        local_hit = glm.vec3(inv_model * glm.vec4(hit_world, 1.0))
+        axis = max(range(3), key=lambda i: abs(local_hit[i]))
+        local_normal = glm.vec3(0.0)
+        local_normal[axis] = 1.0 if local_hit[axis] >= 0.0 else -1.0
+
+        # Las normales se transforman con la inversa transpuesta de la matriz de modelo
+        return glm.normalize(glm.vec3(glm.transpose(inv_model) * glm.vec4(local_normal, 0.0)))
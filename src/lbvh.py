@@ -0,0 +1,228 @@
+# lbvh.py
+# Construcción lineal del BVH (LBVH) con códigos de Morton, totalmente vectorizada.
+#   1. Códigos de Morton de 30 bits (10 por eje) o 63 bits (21 por eje) de los centroides.
+#   2. Radix sort de los códigos (pasadas estables de 16 bits).
+#   3. Jerarquía a partir de los códigos ordenados (Karras 2012): cada nodo interior se
+#      resuelve en paralelo con búsquedas exponencial y binaria sobre los prefijos comunes.
+#   4. Límites de cada nodo como reducción min/max sobre su rango de hojas (sparse table).
+# Genera el mismo formato empaquetado (m, 8) que BVH.to_array(), con la raíz en el índice 0.
+
+import numpy as np
+from bvh import closest_hit
+
+
+# ------------------------------------------------------
+# Códigos de Morton
+# ------------------------------------------------------
+def _spread_bits_10(x):
+    # 10 bits -> cada bit separado por dos ceros (30 bits)
+    x = x.astype(np.uint64) & np.uint64(0x3FF)
+    x = (x | (x << np.uint64(16))) & np.uint64(0x030000FF)
+    x = (x | (x << np.uint64(8))) & np.uint64(0x0300F00F)
+    x = (x | (x << np.uint64(4))) & np.uint64(0x030C30C3)
+    x = (x | (x << np.uint64(2))) & np.uint64(0x09249249)
+    return x
+
+
+def _spread_bits_21(x):
+    # 21 bits -> cada bit separado por dos ceros (63 bits)
+    x = x.astype(np.uint64) & np.uint64(0x1FFFFF)
+    x = (x | (x << np.uint64(32))) & np.uint64(0x1F00000000FFFF)
+    x = (x | (x << np.uint64(16))) & np.uint64(0x1F0000FF0000FF)
+    x = (x | (x << np.uint64(8))) & np.uint64(0x100F00F00F00F00F)
+    x = (x | (x << np.uint64(4))) & np.uint64(0x10C30C30C30C30C3)
+    x = (x | (x << np.uint64(2))) & np.uint64(0x1249249249249249)
+    return x
+
+
+def morton_codes(points, bits=30):
+    """
+    Códigos de Morton (uint64) de puntos (n, 3), normalizados a la caja que los contiene.
+    bits: 30 (10 por eje) o 63 (21 por eje).
+    """
+    if bits not in (30, 63):
+        raise ValueError("bits debe ser 30 o 63")
+    points = np.asarray(points, dtype='f8').reshape(-1, 3)
+    if len(points) == 0:
+        return np.zeros(0, dtype=np.uint64)
+
+    per_axis = bits // 3
+    scale = float((1 << per_axis) - 1)
+    low = points.min(axis=0)
+    extent = np.maximum(points.max(axis=0) - low, 1e-12)
+    cells = np.clip((points - low) / extent * scale, 0.0, scale).astype(np.uint64)
+
+    spread = _spread_bits_10 if bits == 30 else _spread_bits_21
+    return (spread(cells[:, 0]) << np.uint64(2)) | (spread(cells[:, 1]) << np.uint64(1)) | spread(cells[:, 2])
+
+
+def radix_sort(codes, bits=30):
+    """Permutación que ordena los códigos (radix sort LSD en pasadas estables de 16 bits)."""
+    order = np.arange(len(codes))
+    for shift in range(0, bits, 16):
+        digits = ((codes[order] >> np.uint64(shift)) & np.uint64(0xFFFF)).astype(np.uint16)
+        order = order[np.argsort(digits, kind='stable')]
+    return order
+
+
+# ------------------------------------------------------
+# Jerarquía (Karras 2012)
+# ------------------------------------------------------
+def _bit_length(x):
+    # Largo en bits de enteros uint64, exacto (frexp es exacto para mitades de 32 bits)
+    high = (x >> np.uint64(32)).astype('f8')
+    low = (x & np.uint64(0xFFFFFFFF)).astype('f8')
+    high_length = np.frexp(high)[1]
+    low_length = np.frexp(low)[1]
+    return np.where(high > 0, high_length + 32, low_length)
+
+
+def _common_prefix(codes, i, j):
+    """
+    Prefijo común (delta) entre las hojas ordenadas i y j; -1 si j está fuera de rango.
+    Los códigos repetidos se desempatan con el índice (64 + prefijo común de i y j).
+    """
+    count = len(codes)
+    valid = (j >= 0) & (j < count)
+    j_safe = np.clip(j, 0, count - 1)
+    xor = codes[i] ^ codes[j_safe]
+    index_xor = (i ^ j_safe).astype(np.uint64)
+    delta = np.where(xor != 0, 64 - _bit_length(xor), 128 - _bit_length(index_xor))
+    return np.where(valid, delta, -1)
+
+
+def _build_hierarchy(codes):
+    """
+    Para n hojas ordenadas devuelve, por nodo interior (n - 1), los hijos (left, right)
+    con hojas codificadas como n - 1 + hoja, y el rango [first, last] de hojas cubierto.
+    """
+    count = len(codes)
+    i = np.arange(count - 1)
+
+    # Dirección del rango: hacia el vecino con mayor prefijo común
+    direction = np.where(_common_prefix(codes, i, i + 1) - _common_prefix(codes, i, i - 1) >= 0, 1, -1)
+    delta_min = _common_prefix(codes, i, i - direction)
+
+    # Búsqueda exponencial del largo máximo y binaria del otro extremo
+    length_max = np.full(count - 1, 2)
+    grow = _common_prefix(codes, i, i + length_max * direction) > delta_min
+    while np.any(grow):
+        length_max = np.where(grow, length_max * 2, length_max)
+        grow = grow & (_common_prefix(codes, i, i + length_max * direction) > delta_min)
+
+    length = np.zeros(count - 1, dtype=np.int64)
+    step = length_max // 2
+    while np.any(step > 0):
+        advance = (step > 0) & (_common_prefix(codes, i, i + (length + step) * direction) > delta_min)
+        length = np.where(advance, length + step, length)
+        step = step // 2
+    other = i + length * direction
+    delta_node = _common_prefix(codes, i, other)
+
+    # Búsqueda binaria del punto de corte dentro del rango
+    split = np.zeros(count - 1, dtype=np.int64)
+    step = length.copy()
+    while True:
+        step = (step + 1) // 2
+        advance = _common_prefix(codes, i, i + (split + step) * direction) > delta_node
+        split = np.where(advance, split + step, split)
+        if np.all(step <= 1):
+            break
+    gamma = i + split * direction + np.minimum(direction, 0)
+
+    first = np.minimum(i, other)
+    last = np.maximum(i, other)
+    left = np.where(first == gamma, count - 1 + gamma, gamma)
+    right = np.where(last == gamma + 1, count - 1 + gamma + 1, gamma + 1)
+    return left, right, first, last
+
+
+# ------------------------------------------------------
+# Límites por reducción sobre rangos (sparse table)
+# ------------------------------------------------------
+def _range_bounds(mins, maxs, first, last):
+    """Min y max de mins/maxs (n, 3) en cada rango [first, last], con O(1) por consulta."""
+    table_min = [mins]
+    table_max = [maxs]
+    width = 1
+    while width * 2 <= len(mins):
+        previous_min, previous_max = table_min[-1], table_max[-1]
+        table_min.append(np.minimum(previous_min[:-width], previous_min[width:]))
+        table_max.append(np.maximum(previous_max[:-width], previous_max[width:]))
+        width *= 2
+
+    size = last - first + 1
+    level = np.frexp(size.astype('f8'))[1] - 1  # floor(log2(size))
+    range_min = np.empty((len(first), 3), dtype=mins.dtype)
+    range_max = np.empty((len(first), 3), dtype=maxs.dtype)
+    for k in np.unique(level):
+        rows = level == k
+        span = 1 << int(k)
+        lo, hi = first[rows], last[rows] - span + 1
+        range_min[rows] = np.minimum(table_min[k][lo], table_min[k][hi])
+        range_max[rows] = np.maximum(table_max[k][lo], table_max[k][hi])
+    return range_min, range_max
+
+
+def build_lbvh(bounds, bits=30):
+    """
+    Construye el BVH de n AABBs (bounds (n, 6) con min y max) y lo devuelve empaquetado
+    como BVH.to_array(): (2n - 1, 8) float32, nodos interiores primero y la raíz en 0.
+    """
+    bounds = np.asarray(bounds, dtype='f4').reshape(-1, 6)
+    count = len(bounds)
+    if count == 0:
+        return np.zeros((0, 8), dtype='f4')
+
+    nodes = np.zeros((2 * count - 1, 8), dtype='f4')
+    if count == 1:
+        nodes[0, 0:3], nodes[0, 4:7] = bounds[0, :3], bounds[0, 3:]
+        nodes[0, 3], nodes[0, 7] = -1, 0
+        return nodes
+
+    centroids = (bounds[:, :3] + bounds[:, 3:]) * 0.5
+    codes = morton_codes(centroids, bits)
+    order = radix_sort(codes, bits)
+    codes = codes[order]
+    sorted_bounds = bounds[order]
+
+    left, right, first, last = _build_hierarchy(codes)
+
+    # Nodos interiores: límites de su rango de hojas ordenadas
+    interior_min, interior_max = _range_bounds(sorted_bounds[:, :3], sorted_bounds[:, 3:], first, last)
+    nodes[:count - 1, 0:3] = interior_min
+    nodes[:count - 1, 4:7] = interior_max
+    nodes[:count - 1, 3] = left
+    nodes[:count - 1, 7] = -right - 2
+
+    # Hojas: una primitiva cada una (índice original)
+    nodes[count - 1:, 0:3] = sorted_bounds[:, :3]
+    nodes[count - 1:, 4:7] = sorted_bounds[:, 3:]
+    nodes[count - 1:, 3] = -1
+    nodes[count - 1:, 7] = order
+    return nodes
+
+
+def primitives_to_bounds(prims):
+    """Lista de primitivas ({'aabb_min', 'aabb_max'}) como array (n, 6)."""
+    return np.array([(*prim['aabb_min'], *prim['aabb_max']) for prim in prims], dtype='f4').reshape(-1, 6)
+
+
+class LBVH:
+    """Misma interfaz que BVH (to_array, pack_to_bytes, closest_hit) con construcción lineal."""
+    def __init__(self, prims, bits=30):
+        self.prims = prims
+        self.bits = bits
+        self.nodes = build_lbvh(primitives_to_bounds(prims), bits)
+        self.__rows = None
+
+    def to_array(self):
+        return self.nodes
+
+    def pack_to_bytes(self):
+        return self.nodes.tobytes()
+
+    def closest_hit(self, origin, direction, hit_fn):
+        if self.__rows is None:
+            self.__rows = self.nodes.tolist()
+        return closest_hit(self.__rows, origin, direction, hit_fn)
@@ -0,0 +1,135 @@
+# lod.py
+# Selección de nivel de detalle (LOD) e impostores para objetos lejanos.
+# LODSelector elige, para todos los objetos a la vez, el nivel a dibujar según el tamaño
+# proyectado en pantalla de su AABB cacheado, con histéresis para evitar saltos (popping).
+# Impostor reemplaza al objeto por un Quad (billboard) con una captura del objeto,
+# dibujado con el shader de sprite.
+
+import numpy as np
+import glm
+from graphics import Graphics
+from material import Material
+from quad import Quad
+from uniform_buffer import FrameUniforms, ObjectUniforms
+
+
+class LODSelector:
+    """
+    thresholds: tamaños proyectados (fracción de la mitad de la altura de pantalla), de
+    mayor a menor, por debajo de los cuales se pasa al siguiente nivel más simple. El
+    impostor (si el objeto lo tiene) usa siempre el último umbral, aunque el modelo tenga
+    menos niveles que umbrales.
+    hysteresis: margen relativo alrededor de cada umbral dentro del cual el nivel no cambia.
+    """
+    def __init__(self, thresholds=(0.25, 0.1, 0.04), hysteresis=0.15):
+        self.thresholds = np.sort(np.asarray(thresholds, dtype='f4'))[::-1]
+        self.hysteresis = hysteresis
+
+    @staticmethod
+    def projected_sizes(bounds, view, fov):
+        """Tamaño proyectado de cada AABB (bounds (n, 6) con min y max) según la vista."""
+        centers = (bounds[:, :3] + bounds[:, 3:]) * 0.5
+        radii = np.linalg.norm(bounds[:, 3:] - bounds[:, :3], axis=1) * 0.5
+
+        # Distancia en espacio de cámara (glm guarda por columnas)
+        view = np.frombuffer(view.to_bytes(), dtype='f4').reshape(4, 4)
+        depth = -(centers @ view[:3, 2] + view[3, 2])
+        distance = np.maximum(depth, 1e-4)
+
+        return radii / (distance * np.tan(np.radians(fov) * 0.5))
+
+    def select(self, sizes, current, max_levels, impostor=None):
+        """
+        Devuelve el nivel de cada objeto (vectorizado). El nivel solo se vuelve más
+        simple cuando el tamaño cae por debajo de umbral * (1 - histéresis) y solo
+        se vuelve más detallado cuando supera umbral * (1 + histéresis).
+        impostor: máscara de los objetos cuyo último nivel (max_levels) es el impostor.
+        """
+        thresholds = self.__thresholds(len(sizes), max_levels, impostor)
+        sizes = sizes[:, None]
+        finest = np.sum(sizes < thresholds * (1.0 - self.hysteresis), axis=1)
+        coarsest = np.sum(sizes < thresholds * (1.0 + self.hysteresis), axis=1)
+        levels = np.clip(current, finest, coarsest)
+        return np.minimum(levels, max_levels)
+
+    def __thresholds(self, count, max_levels, impostor):
+        # Umbrales (n, k) de cada objeto: los niveles de malla usan los primeros y, desde la
+        # transición al impostor, todos pasan a ser el último (un modelo sin LODs va directo
+        # del nivel 0 al impostor recién en el último umbral)
+        thresholds = np.broadcast_to(self.thresholds, (count, len(self.thresholds)))
+        if impostor is None or len(self.thresholds) == 0:
+            return thresholds
+        to_impostor = np.minimum(np.asarray(max_levels) - 1, len(self.thresholds) - 1)
+        tail = np.arange(len(self.thresholds))[None, :] >= to_impostor[:, None]
+        return np.where(np.asarray(impostor, dtype=bool)[:, None] & tail, self.thresholds[-1], thresholds)
+
+
+class Impostor:
+    """
+    Billboard que reemplaza a un objeto lejano. La captura del objeto se renderiza en un
+    framebuffer y se vuelve a capturar solo si la dirección de la cámara cambió más que
+    max_angle grados o cambió el tamaño del objeto.
+    """
+    def __init__(self, ctx, graphics, shader_program, resolution=128, max_angle=15.0):
+        self.__ctx = ctx
+        self.__source = graphics
+        self.__resolution = resolution
+        self.__max_cos = np.cos(np.radians(max_angle))
+        self.__direction = None
+        self.__radius = None
+
+        # Framebuffer con transparencia donde se captura el objeto
+        self.__color = ctx.texture((resolution, resolution), 4)
+        self.__depth = ctx.depth_renderbuffer((resolution, resolution))
+        self.__fbo = ctx.framebuffer(color_attachments=[self.__color], depth_attachment=self.__depth)
+        self.__frame_uniforms = FrameUniforms(ctx)
+        self.__object_uniforms = ObjectUniforms(ctx, capacity=1)
+
+        # Quad con el shader de sprite que muestra la captura
+        self.__quad = Quad(name=f"{graphics.model.name}_impostor", animated=False, hittable=False)
+        self.graphics = Graphics(ctx, self.__quad, Material(shader_program, textures_data=[]))
+        self.graphics.set_texture("u_texture", self.__color)
+
+    def needs_capture(self, direction, radius):
+        if self.__direction is None:
+            return True
+        if abs(radius - self.__radius) > 0.1 * self.__radius:
+            return True
+        return float(np.dot(direction, self.__direction)) < self.__max_cos
+
+    def update(self, camera_position, center, radius, model_matrix, up):
+        """Vuelve a capturar el objeto si hace falta. Devuelve True si capturó."""
+        direction = np.asarray(camera_position - center, dtype='f4')
+        direction /= max(np.linalg.norm(direction), 1e-6)
+        if not self.needs_capture(direction, radius):
+            return False
+
+        # Vista ortográfica centrada en el objeto, mirando desde la cámara
+        eye = center + glm.vec3(*direction) * radius * 2.0
+        view = glm.lookAt(eye, center, up)
+        projection = glm.ortho(-radius, radius, -radius, radius, radius * 0.5, radius * 4.0)
+
+        self.__frame_uniforms.update(view, projection, eye, 0.0)
+        self.__object_uniforms.update(np.frombuffer(model_matrix.to_bytes(), dtype='f4')[None, :])
+        self.__object_uniforms.bind(0)
+        # Shaders sin uniform blocks: MVP de la cámara de captura (el de la escena se asigna
+        # de nuevo en cada draw de la cola)
+        self.__source.set_uniforms({'Mvp': projection * view * model_matrix})
+
+        previous = self.__ctx.fbo
+        self.__fbo.use()
+        self.__fbo.clear(0.0, 0.0, 0.0, 0.0)
+        self.__source.bind_textures()
+        self.__source.draw(0)
+        previous.use()
+
+        self.__direction = direction
+        self.__radius = radius
+        return True
+
+    def billboard_mvp(self, view, projection, center, radius):
+        """MVP del Quad: centrado en el objeto, orientado hacia la cámara y escalado al radio."""
+        model = glm.inverse(view)
+        model[3] = glm.vec4(center, 1.0)
+        model = model * glm.scale(glm.mat4(1), glm.vec3(radius))
+        return projection * view * model
@@ -2,7 +2,8 @@
 from window import Window
 from texture import Texture
 from material import Material, StandardMaterial
-from shader_program import ShaderProgram
+from shader_program import ShaderProgram, program_cache
+from texture_pool import texture_pool
 from cube import Cube
 from quad import Quad
 from camera import Camera
@@ -15,6 +16,61 @@ WIDTH, HEIGHT = 800, 600
 # Opciones de tipo de escena: "normal", "cpu", "gpu"
 SCENE_TYPE = "gpu"
 
+# Estructura de aceleración del raytracer en CPU: None, "bvh" o "grid"
+CPU_ACCELERATION = None
+
+# Recompilar shaders automáticamente al editar sus archivos
+HOT_RELOAD = False
+
+# Picking con un target de ids por píxel (escenas "normal" y "gpu"); en CPU se usa el BVH
+OBJECT_PICKING = True
+
+# Redibujar solo cuando cambia la cámara, algún objeto o material (escenas estáticas en reposo)
+ON_DEMAND_RENDERING = True
+
+# Caché binario de la escena GPU (transformaciones, materiales, BVH y mallas)
+SCENE_CACHE_PATH = "scene.cache"
+
+# Preparar el frame siguiente de la escena GPU en un hilo de trabajo (doble buffer). Agrega
+# un frame de latencia y, con el GIL, el BVH en Python se solapa poco: apagado por defecto
+GPU_PIPELINED = False
+
+# Tamaño de grupo local del compute shader medido por dispositivo (None = 16x16 fijo). Es
+# opcional: "python src/benchmark.py workgroup" mide y guarda workgroup_tuning.json, y con
+# esa ruta acá se usa el resultado (si falta el dispositivo, se mide al arrancar)
+WORKGROUP_TUNING_PATH = None
+
+# Modo del raytracer en GPU: "megakernel" o "wavefront" (mejor con muchos materiales reflectivos)
+GPU_TRACE_MODE = "megakernel"
+
+# BVH de la GPU: None = nodos float32 (32 bytes), 8 o 16 = límites cuantizados (12/16 bytes)
+GPU_BVH_COMPACT_BITS = 16
+GPU_BVH_WIDTH = 2
+# Orden de los nodos del BVH en memoria: None, "dfs" o "veb"
+GPU_BVH_LAYOUT = "dfs"
+# Construcción del BVH: "recursive" o "lbvh" (códigos de Morton, para muchos objetos)
+GPU_BVH_BUILDER = "recursive"
+
+# Resolución dinámica: tiempo de frame objetivo en ms (None = siempre resolución completa)
+GPU_TARGET_FRAME_MS = 16.7
+# En CPU, con un objetivo se vuelve a trazar cada frame a la escala que lo sostiene
+CPU_TARGET_FRAME_MS = None
+
+# Denoiser guiado por las AOVs del rayo primario (normal, profundidad y albedo); en la
+# escena GPU el filtro corre en un compute shader
+GPU_DENOISE = False
+CPU_DENOISE = False
+
+# Exportar los frames presentados: None, "png", "ppm", "raw" o "pipe" (encoder externo)
+CAPTURE_FORMAT = None
+CAPTURE_DIRECTORY = "capture"
+# Comando del encoder para "pipe" (recibe frames RGB crudos por stdin)
+CAPTURE_COMMAND = ["ffmpeg", "-y", "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", "{width}x{height}",
+                   "-r", "60", "-i", "-", "-pix_fmt", "yuv420p", "capture.mp4"]
+
+# Memoria máxima (MB) del pool de imágenes y texturas reutilizables (ver texture_pool.py)
+TEXTURE_POOL_BUDGET_MB = 256
+
 # Configuración por tipo de escena
 scene_configs = {
     "normal": {
@@ -37,29 +93,45 @@ scene_configs = {
 config = scene_configs[SCENE_TYPE]
 
 # --- Inicialización ---
-window = Window(WIDTH, HEIGHT, f"Basic Graphic Engine - {SCENE_TYPE.upper()}")
+# Solo se importa y se crea lo que usa la configuración elegida (arranque más rápido)
+texture_pool.budget_bytes = TEXTURE_POOL_BUDGET_MB * 1024 * 1024
+capture = None
+if CAPTURE_FORMAT is not None:
+    from capture import FrameCapture
+    capture = FrameCapture(CAPTURE_DIRECTORY, CAPTURE_FORMAT, CAPTURE_COMMAND)
+denoiser = None
+if (SCENE_TYPE == "gpu" and GPU_DENOISE) or (SCENE_TYPE == "cpu" and CPU_DENOISE):
+    from denoise import Denoiser
+    denoiser = Denoiser()
+
+window = Window(WIDTH, HEIGHT, f"Basic Graphic Engine - {SCENE_TYPE.upper()}",
+                on_demand=ON_DEMAND_RENDERING, capture=capture)
 
 # Shaders
 shader = ShaderProgram(window.ctx, 'shaders/basic.vert', 'shaders/basic.frag')
-shader_sprite = ShaderProgram(window.ctx, 'shaders/sprite.vert', 'shaders/sprite.frag')
 
-# Texturas y materiales
-albedo_red = Texture("u_texture", WIDTH, HEIGHT, 3, None, (200, 10, 190))
-albedo_blue = Texture("u_texture", WIDTH, HEIGHT, 3, None, (0, 0, 255))
-albedo_pearl = Texture("u_texture", WIDTH, HEIGHT, 3, None, (120, 90, 90))
-sprite_texture = Texture(width=WIDTH, height=HEIGHT, channels_amount=config["sprite_channels_amount"], 
-                        color=config["sprite_default_color"])
+# Texturas y materiales (los colores sólidos alcanzan con una textura de 1x1)
+albedo_red = Texture("u_texture", 1, 1, 3, None, (200, 10, 190))
+albedo_blue = Texture("u_texture", 1, 1, 3, None, (0, 0, 255))
+albedo_pearl = Texture("u_texture", 1, 1, 3, None, (120, 90, 90))
 
 material_plastic = StandardMaterial(shader, albedo_red, reflectivity=0.0)
 material_glass = StandardMaterial(shader, albedo_blue, reflectivity=0.2)
 material_ceramic = StandardMaterial(shader, albedo_pearl, reflectivity=0.1)
-material_sprite = Material(shader_sprite, textures_data=[sprite_texture])
+
+# Sprite de salida de los raytracers: su textura es un marcador de 1x1 que el raytracer
+# reemplaza por su imagen antes del primer frame
+if config["needs_sprite"]:
+    shader_sprite = ShaderProgram(window.ctx, 'shaders/sprite.vert', 'shaders/sprite.frag')
+    sprite_texture = Texture(width=1, height=1, channels_amount=config["sprite_channels_amount"],
+                             color=config["sprite_default_color"])
+    material_sprite = Material(shader_sprite, textures_data=[sprite_texture])
+    sprite = Quad((0, 0, 0), (0, 0, 0), (10, 15, 1), name="Sprite", animated=False, hittable=False)
 
 # Objetos
 cube1 = Cube((2, 0, 5), (0, 0, 0), (1, 1, 1), name="Cube1")
 cube2 = Cube((-2, 0, 5), (0, 0, 0), (1, 1, 1), name="Cube2")
 quad = Quad((0, -5, 0), (-90, 0, 0), (10, 15, 1), name="Floor", animated=False, hittable=False)
-sprite = Quad((0, 0, 0), (0, 0, 0), (10, 15, 1), name="Sprite", animated=False, hittable=False)
 
 # Cámara
 camera = Camera((0, 0, 15), (0, 0, 0), (0, 1, 0), 45, WIDTH / HEIGHT, 0.01, 100.0)
@@ -67,22 +139,33 @@ camera.set_sky_colors(top=(16, 150, 222), bottom=(181, 224, 247))
 
 # Crear escena según el tipo
 if SCENE_TYPE == "normal":
-    scene = Scene(window.ctx, camera)
+    scene = Scene(window.ctx, camera, picking=OBJECT_PICKING)
     scene.add_object(cube1, material_plastic)
     scene.add_object(cube2, material_glass)
 
 elif SCENE_TYPE == "cpu":
-    scene = RayScene(window.ctx, camera, WIDTH, HEIGHT)
+    scene = RayScene(window.ctx, camera, WIDTH, HEIGHT, acceleration=CPU_ACCELERATION,
+                     target_frame_ms=CPU_TARGET_FRAME_MS,
+                     denoiser=denoiser)
     scene.add_object(sprite, material_sprite)
     scene.add_object(cube1, material_plastic)
     scene.add_object(cube2, material_glass)
     scene.add_object(quad, material_ceramic)
 
 elif SCENE_TYPE == "gpu":
-    scene = RaySceneGPU(window.ctx, camera, WIDTH, HEIGHT, sprite, material_sprite)
+    scene = RaySceneGPU(window.ctx, camera, WIDTH, HEIGHT, sprite, material_sprite,
+                        cache_path=SCENE_CACHE_PATH, pipelined=GPU_PIPELINED,
+                        tuning_path=WORKGROUP_TUNING_PATH, mode=GPU_TRACE_MODE,
+                        compact_bits=GPU_BVH_COMPACT_BITS, bvh_width=GPU_BVH_WIDTH,
+                        bvh_layout=GPU_BVH_LAYOUT, bvh_builder=GPU_BVH_BUILDER,
+                        target_frame_ms=GPU_TARGET_FRAME_MS, picking=OBJECT_PICKING,
+                        denoiser=denoiser)
     scene.add_object(cube1, material_plastic)
     scene.add_object(cube2, material_glass)
     scene.add_object(quad, material_ceramic)
 
+if HOT_RELOAD:
+    window.enable_hot_reload(program_cache)
+
 window.set_scene(scene)
 window.run()
\ No newline at end of file
@@ -31,5 +31,14 @@ class StandardMaterial(Material):
         self.reflectivity = reflectivity
         # Color RGB: tomamos el primer píxel de la textura albedo como color base
         self.color_RGB = albedo.image_data.data[0, 0]  # primer pixel de la textura albedo (color)
+        # Un albedo de un solo color es una constante para el raytracer; solo las texturas
+        # con contenido real van al atlas de la tabla de materiales (ver material_table.py)
+        data = albedo.image_data.data
+        self.__albedo_texture = albedo if (data != data[0, 0]).any() else None
         # Llamar al constructor base con el shader y la textura albedo
-        super().__init__(shader_program, textures_data=[albedo])
\ No newline at end of file
+        super().__init__(shader_program, textures_data=[albedo])
+
+    @property
+    def albedo_texture(self):
+        # Textura del albedo, o None si es de color sólido
+        return self.__albedo_texture
\ No newline at end of file
@@ -0,0 +1,112 @@
+# material_table.py
+# Tabla de materiales deduplicada para el raytracer en GPU.
+# Cada material distinto (color, reflectividad y textura) ocupa una fila de la tabla y cada
+# objeto guarda solo el índice de su fila, así que muchos objetos con el mismo material
+# comparten los datos. La tabla se empaqueta con NumPy y lleva una versión que cambia solo
+# cuando cambia su contenido, para subirla a la GPU únicamente en ese caso.
+# Los materiales de color sólido son constantes en la tabla; los que tienen una textura
+# real la guardan en una capa de un atlas (texture array) que el compute shader muestrea.
+
+import numpy as np
+
+# Fila de la tabla: color RGB, reflectividad | capa del atlas (-1 = sin textura), escala UV
+ROW_FLOATS = 8
+NO_LAYER = -1.0
+
+
+def normalized_colors(colors):
+    """Colores (n, 3) a float en [0, 1]: los enteros (0-255) se dividen por 255."""
+    colors = np.asarray(colors)
+    if np.issubdtype(colors.dtype, np.integer):
+        return colors / 255.0
+    colors = colors.astype('f8')
+    # Colores float dados en 0-255 (como hacía create_material_matrix por canal)
+    return np.where(colors > 1.0, colors / 255.0, colors)
+
+
+class MaterialTable:
+    """
+    rows: array (m, ROW_FLOATS) float32 con los materiales distintos.
+    indices: array (n,) uint32 con la fila de cada objeto.
+    textures: texturas del atlas, en orden de capa.
+    version: cambia cada vez que update() detecta un cambio en rows o textures.
+    """
+    def __init__(self):
+        self.rows = np.zeros((0, ROW_FLOATS), dtype='f4')
+        self.indices = np.zeros(0, dtype='u4')
+        self.textures = []
+        self.version = 0
+        self.texture_version = 0
+
+    def update(self, materials):
+        """Reconstruye la tabla con los materiales de cada objeto. Devuelve si cambió."""
+        count = len(materials)
+        colors = normalized_colors([getattr(material, "color_RGB", (0, 0, 0)) for material in materials]
+                                   if count else np.zeros((0, 3)))
+        values = np.zeros((count, ROW_FLOATS), dtype='f4')
+        values[:, :3] = colors
+        values[:, 3] = [getattr(material, "reflectivity", 0.0) for material in materials]
+        values[:, 4] = NO_LAYER
+
+        # Texturas reales: una capa del atlas por textura distinta
+        textures = []
+        for i, material in enumerate(materials):
+            texture = getattr(material, "albedo_texture", None)
+            if texture is None:
+                continue
+            layer = next((index for index, known in enumerate(textures) if known is texture), None)
+            if layer is None:
+                layer = len(textures)
+                textures.append(texture)
+            values[i, 4] = layer
+
+        rows, indices = np.unique(values, axis=0, return_inverse=True)
+        rows = rows.astype('f4')
+        indices = indices.reshape(-1).astype('u4')
+        if textures:
+            # Escala de UV de cada capa (las texturas más chicas ocupan una esquina de su capa)
+            width = max(texture.width for texture in textures)
+            height = max(texture.height for texture in textures)
+            layers = rows[:, 4].astype(int)
+            textured = layers >= 0
+            rows[textured, 5] = [textures[layer].width / width for layer in layers[textured]]
+            rows[textured, 6] = [textures[layer].height / height for layer in layers[textured]]
+
+        textures_changed = len(textures) != len(self.textures) or any(
+            texture is not known for texture, known in zip(textures, self.textures))
+        changed = (textures_changed or not np.array_equal(rows, self.rows)
+                   or not np.array_equal(indices, self.indices))
+        if changed:
+            self.rows, self.indices, self.textures = rows, indices, textures
+            self.version += 1
+        if textures_changed:
+            self.texture_version += 1
+        return changed
+
+    def object_materials(self):
+        """Color y reflectividad (n, 4) de cada objeto (por ejemplo, para el caché de escena)."""
+        return self.rows[self.indices, :4]
+
+
+def build_atlas(ctx, textures):
+    """
+    Texture array RGBA8 con una capa por textura, del tamaño de la más grande (las demás
+    quedan en la esquina de su capa; ver la escala UV de la tabla). Sin texturas se crea
+    una capa de 1x1 para que el sampler del shader siempre tenga algo vinculado.
+    """
+    if not textures:
+        return ctx.texture_array((1, 1, 1), 4, np.full(4, 255, dtype=np.uint8).tobytes())
+    width = max(texture.width for texture in textures)
+    height = max(texture.height for texture in textures)
+    layers = np.zeros((len(textures), height, width, 4), dtype=np.uint8)
+    layers[..., 3] = 255
+    for layer, texture in zip(layers, textures):
+        data = texture.image_data.data
+        if data.dtype != np.uint8:
+            data = (np.clip(data, 0.0, 1.0) * 255.0 + 0.5).astype(np.uint8)
+        channels = min(data.shape[2], 4)
+        layer[:texture.height, :texture.width, :channels] = data[..., :channels]
+    atlas = ctx.texture_array((width, height, len(textures)), 4, layers.tobytes())
+    atlas.repeat_x = False
+    atlas.repeat_y = False
+    return atlas
@@ -1,5 +1,10 @@
 # model.py
 
+import numpy as np
+
+# Tipos de los formatos de atributo de ModernGL ('3f' = 3 floats de 4 bytes, etc.)
+ATTRIBUTE_TYPES = {"f": "f4", "i": "i4", "u": "u4"}
+
 # ----------------------------
 # Clase Vertex
 # ----------------------------
@@ -34,14 +39,82 @@ class Vertex:
 class VertexLayout:
     def __init__(self):
         self.__attributes = []  # Lista que guarda los atributos del vértice
+        self.__interleaved = None  # Array estructurado intercalado (se arma una sola vez)
 
     def add_attribute(self, name: str, format: str, array):
         # Crea un objeto Vertex y lo agrega al layout
         self.__attributes.append(Vertex(name, format, array))
+        self.__interleaved = None
 
     def get_attributes(self):
         return self.__attributes
 
+    def interleaved(self):
+        """
+        Todos los atributos intercalados en un array estructurado de NumPy (un registro
+        alineado por vértice: pos, color, normal, uv...), listo para un único VBO.
+        """
+        if self.__interleaved is None:
+            fields = []
+            for attribute in self.__attributes:
+                count, kind = int(attribute.format[:-1] or 1), ATTRIBUTE_TYPES[attribute.format[-1]]
+                fields.append((attribute.name, kind, (count,)))
+            dtype = np.dtype(fields, align=True)
+            vertex_count = min((np.size(attribute.array) // dtype[attribute.name].shape[0]
+                                for attribute in self.__attributes), default=0)
+
+            data = np.zeros(vertex_count, dtype=dtype)
+            for attribute in self.__attributes:
+                values = np.asarray(attribute.array).reshape(-1, dtype[attribute.name].shape[0])
+                data[attribute.name] = values[:vertex_count]
+            self.__interleaved = data
+        return self.__interleaved
+
+    def vertex_format(self, used_names=None):
+        """
+        Formato de ModernGL del buffer intercalado y los atributos que describe. Los
+        atributos que no están en used_names (no los usa el shader) se saltean como relleno.
+        Devuelve (formato, nombres), por ejemplo ("3f 12x 2f", ["in_pos", "in_uv"]).
+        """
+        dtype = self.interleaved().dtype
+        parts, names, offset = [], [], 0
+        for attribute in self.__attributes:
+            field_offset = dtype.fields[attribute.name][1]
+            padding = field_offset - offset
+            if used_names is None or attribute.name in used_names:
+                if padding:
+                    parts.append(f"{padding}x")
+                parts.append(attribute.format)
+                names.append(attribute.name)
+                offset = field_offset + dtype[attribute.name].itemsize
+        # El resto del registro (atributos no usados al final y alineación) también se saltea
+        if dtype.itemsize > offset:
+            parts.append(f"{dtype.itemsize - offset}x")
+        return " ".join(parts), names
+
+
+def pack_indices(indices):
+    """
+    Índices como u2 si todos entran (el 0xFFFF queda libre para primitive restart),
+    o como u4 si no. Devuelve (array, tamaño del elemento en bytes).
+    """
+    indices = np.asarray(indices).reshape(-1)
+    if len(indices) == 0 or int(indices.max()) < 0xFFFF:
+        return indices.astype('u2'), 2
+    return indices.astype('u4'), 4
+
+
+# ----------------------------
+# Clase LevelOfDetail
+# ----------------------------
+# Un nivel de detalle alternativo del modelo: sus propios índices y, opcionalmente,
+# su propio VertexLayout (si no se indica, comparte los vértices del modelo base).
+
+class LevelOfDetail:
+    def __init__(self, indices, vertex_layout):
+        self.indices = indices
+        self.vertex_layout = vertex_layout
+
 
 # ----------------------------
 # Clase Model
@@ -51,19 +124,39 @@ class VertexLayout:
 #   - Guardar los índices del modelo (definen cómo se conectan los vértices)
 #   - Construir el VertexLayout con los atributos disponibles
 #   - Organizar posiciones, colores, normales y coordenadas de textura
+#   - Guardar niveles de detalle (LOD) más simples: el nivel 0 es el modelo base
 
 class Model:
     def __init__(self, vertices=None, indices=None, colors=None, normals=None, texcoords=None):
         self.indices = indices  # Guarda los índices del modelo
-        self.vertex_layout = VertexLayout()  # Crea la estructura del vértice
+        self.vertex_layout = self.build_layout(vertices, colors, normals, texcoords)
+        self.lods = []  # Niveles de detalle adicionales (nivel 1, 2, ...)
+
+    @staticmethod
+    def build_layout(vertices=None, colors=None, normals=None, texcoords=None):
+        layout = VertexLayout()  # Crea la estructura del vértice
 
         # Agrega los atributos disponibles al layout
         # Formato ModernGL: '3f' = 3 floats, '2f' = 2 floats
         if vertices is not None:
-            self.vertex_layout.add_attribute("in_pos", "3f", vertices)
+            layout.add_attribute("in_pos", "3f", vertices)
         if colors is not None:
-            self.vertex_layout.add_attribute("in_color", "3f", colors)
+            layout.add_attribute("in_color", "3f", colors)
         if normals is not None:
-            self.vertex_layout.add_attribute("in_norm", "3f", normals)
+            layout.add_attribute("in_norm", "3f", normals)
         if texcoords is not None:
-            self.vertex_layout.add_attribute("in_uv", "2f", texcoords)
\ No newline at end of file
+            layout.add_attribute("in_uv", "2f", texcoords)
+        return layout
+
+    @property
+    def lod_count(self):
+        # Cantidad total de niveles, incluyendo el modelo base
+        return 1 + len(self.lods)
+
+    def add_lod(self, indices, vertices=None, colors=None, normals=None, texcoords=None):
+        # Agrega un nivel de detalle más simple; sin vértices propios reutiliza los del modelo
+        if vertices is None:
+            layout = self.vertex_layout
+        else:
+            layout = self.build_layout(vertices, colors, normals, texcoords)
+        self.lods.append(LevelOfDetail(indices, layout))
\ No newline at end of file
@@ -0,0 +1,58 @@
+# multiview.py
+# Render de varias cámaras de la misma escena por frame (previews, reflejos, estéreo).
+# En GPU todas las vistas salen de un solo dispatch del compute shader (variante MULTI_VIEW):
+# la dimensión z del dispatch es la vista, cada vista escribe una capa de un texture array
+# (image2DArray) y lee su cámara de un SSBO. El BVH, las matrices y la tabla de materiales
+# son los mismos SSBOs del frame, así que cada vista extra solo agrega el trabajo por píxel.
+
+import numpy as np
+
+# Cámara de una vista en el SSBO: matriz inversa de vista (mat4) | posición xyz, fov
+VIEW_FLOATS = 20
+VIEWS_BINDING = 11
+VIEW_IMAGE_UNIT = 5
+
+
+def pack_views(cameras):
+    """Array (n, VIEW_FLOATS) float32 con las cámaras en el formato del shader (std430)."""
+    views = np.zeros((len(cameras), VIEW_FLOATS), dtype='f4')
+    for row, camera in zip(views, cameras):
+        # glm guarda por columnas, igual que un mat4 de GLSL
+        row[:16] = np.array(camera.get_inverse_view_matrix().to_list(), dtype='f4').reshape(16)
+        row[16:19] = tuple(camera.position)
+        row[19] = camera.fov
+    return views
+
+
+class ViewTargets:
+    """
+    Texture array rgba32f con una capa por vista. Se reserva al mayor tamaño y cantidad
+    de vistas pedidos y solo se reasigna para agrandarlo; cada render usa la esquina size.
+    """
+    def __init__(self, ctx):
+        self.ctx = ctx
+        self.texture = None
+        self.capacity = (0, 0, 0)
+        self.size = (0, 0)
+        self.count = 0
+
+    def resize(self, width, height, count):
+        self.size, self.count = (width, height), count
+        if width <= self.capacity[0] and height <= self.capacity[1] and count <= self.capacity[2]:
+            return
+        if self.texture is not None:
+            self.texture.release()
+        self.capacity = (max(width, self.capacity[0]), max(height, self.capacity[1]),
+                         max(count, self.capacity[2]))
+        self.texture = self.ctx.texture_array(self.capacity, 4, dtype='f4')
+
+    def bind_to_image(self, unit=VIEW_IMAGE_UNIT):
+        self.texture.bind_to_image(unit, read=False, write=True)
+
+    def read(self):
+        """Imágenes (vistas, alto, ancho, 4) float32 del último render (lee la GPU)."""
+        # Las escrituras con imageStore deben ser visibles antes de leer la textura
+        self.ctx.memory_barrier()
+        width, height, count = self.capacity
+        layers = np.frombuffer(self.texture.read(), dtype='f4').reshape(count, height, width, 4)
+        return layers[:self.count, :self.size[1], :self.size[0]]
@@ -0,0 +1,111 @@
+# picking.py
+# Selección de objetos con el mouse en O(1): junto al color, el render escribe un target
+# auxiliar con el id del objeto visible en cada píxel y su distancia a la cámara, y elegir
+# un objeto es leer un solo píxel (el costo no crece con la cantidad de objetos).
+#   - RayTracerGPU: el compute shader escribe el target con PICKING_TARGET (image2D).
+#   - RayTracer (CPU): arrays de NumPy que se llenan al trazar cada píxel.
+#   - Rasterización: PickingTarget.render_ids() dibuja los objetos con picking.vert/.frag
+#     cuando se pide un pick (Scene guarda los objetos de cada frame y dibuja los ids a demanda).
+# Los ids se guardan como índice + 1 para que el valor de limpieza (0) signifique "nada".
+# closest_object() es el respaldo en CPU: hit más cercano recorriendo un BVH empaquetado.
+
+import numpy as np
+from bvh import closest_hit
+from shader_program import ShaderProgram
+from texture_pool import texture_pool
+from uniform_buffer import FRAME_BLOCK, OBJECT_BLOCK
+
+NO_OBJECT = -1
+
+
+class PickingTarget:
+    """
+    Texturas de ids (r32i) y distancias (r32f) del tamaño de la salida, con un framebuffer
+    para escribirlas por rasterización y leer píxeles sueltos. También sirven como image2D
+    para el compute shader (unidades 1 y 2).
+    """
+    VERTEX_SHADER = "shaders/picking.vert"
+    FRAGMENT_SHADER = "shaders/picking.frag"
+
+    def __init__(self, ctx, width, height):
+        self.ctx = ctx
+        self.size = None
+        self.fbo = None
+        self.__shader_program = None
+        self.resize(width, height)
+
+    def resize(self, width, height):
+        """Reasigna las texturas si cambia el tamaño."""
+        if (width, height) == self.size:
+            return
+        if self.fbo is not None:
+            for resource in (self.fbo, self.depth_buffer):
+                resource.release()
+            texture_pool.release_texture(self.ids)
+            texture_pool.release_texture(self.distances)
+        self.size = (width, height)
+        self.ids = texture_pool.acquire_texture(self.ctx, self.size, 1, 'i4')
+        self.distances = texture_pool.acquire_texture(self.ctx, self.size, 1, 'f4')
+        self.depth_buffer = self.ctx.depth_renderbuffer(self.size)
+        self.fbo = self.ctx.framebuffer(color_attachments=[self.ids, self.distances],
+                                        depth_attachment=self.depth_buffer)
+
+    def bind_to_images(self, ids_unit=1, distances_unit=2):
+        # Para que el compute shader escriba el target con imageStore
+        self.ids.bind_to_image(ids_unit, read=False, write=True)
+        self.distances.bind_to_image(distances_unit, read=False, write=True)
+
+    @property
+    def shader_program(self):
+        # El programa de ids solo se compila si se rasteriza el target
+        if self.__shader_program is None:
+            self.__shader_program = ShaderProgram(self.ctx, self.VERTEX_SHADER, self.FRAGMENT_SHADER)
+            self.__shader_program.bind_uniform_block(*FRAME_BLOCK)
+            self.__shader_program.bind_uniform_block(*OBJECT_BLOCK)
+        return self.__shader_program
+
+    def render_ids(self, items, object_uniforms):
+        """
+        Rasteriza los ids de los objetos: items es una lista de (graphics, índice en el UBO
+        de objetos, nivel de detalle). Requiere el UBO del frame ya vinculado.
+        """
+        previous_fbo, previous_viewport = self.ctx.fbo, self.ctx.viewport
+        shader_program = self.shader_program
+        self.fbo.use()
+        self.fbo.clear(depth=1.0)
+        for graphics, index, level in items:
+            object_uniforms.bind(index)
+            shader_program.set_uniform("u_object_id", index + 1)
+            graphics.draw_with(shader_program, level)
+
+        (previous_fbo or self.ctx.screen).use()
+        self.ctx.viewport = previous_viewport
+
+    def read(self, x, y):
+        """(índice, distancia) del píxel (x, y), o (NO_OBJECT, inf) si no hay objeto."""
+        x = min(max(int(x), 0), self.size[0] - 1)
+        y = min(max(int(y), 0), self.size[1] - 1)
+        # Las escrituras con imageStore deben ser visibles antes de leer por el framebuffer
+        self.ctx.memory_barrier()
+        viewport = (x, y, 1, 1)
+        object_id = int(np.frombuffer(self.fbo.read(viewport, components=1, attachment=0, dtype='i4'),
+                                      dtype='i4')[0])
+        if object_id <= 0:
+            return NO_OBJECT, float('inf')
+        distance = float(np.frombuffer(self.fbo.read(viewport, components=1, attachment=1, dtype='f4'),
+                                       dtype='f4')[0])
+        return object_id - 1, distance
+
+
+def closest_object(nodes, objects, origin, direction):
+    """
+    Respaldo en CPU: (índice, distancia) del objeto más cercano que toca el rayo, recorriendo
+    un BVH empaquetado de los AABBs de objects (filas como BVH.to_array()) y probando cada
+    hoja con hit_distance; (NO_OBJECT, inf) si no toca ninguno.
+    """
+    hit = closest_hit(nodes, origin, direction,
+                      lambda index: objects[index].hit_distance(origin, direction))
+    if hit is None:
+        return NO_OBJECT, float('inf')
+    distance, index = hit
+    return index, distance
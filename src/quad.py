@@ -30,6 +30,8 @@ class Quad(Model):
 
         # Guardar vértices originales para calcular AABB
         self.__vertices = vertices
+        self.__aabb_key = None
+        self.__aabb = None
 
         colors = np.array([
             0,1,1,
@@ -58,21 +60,38 @@ class Quad(Model):
 
     @property
     def aabb(self):
-        # Calcula el AABB actualizado del Quad
-        verts3 = self.__vertices.reshape(-1, 3)
-        
-        pts = [self.get_model_matrix() * glm.vec4(v[0], v[1], v[2], 1.0) for v in verts3]
-        
-        xs = [p.x for p in pts]
-        ys = [p.y for p in pts]
-        zs = [p.z for p in pts]
-        
-        return (glm.vec3(min(xs), min(ys), min(zs)),
-                glm.vec3(max(xs), max(ys), max(zs)))
+        # Calcula el AABB (Axis-Aligned Bounding Box) actualizado del Quad.
+        # Se cachea y solo se recalcula cuando cambia la transformación.
+        key = (*self.position, *self.rotation, *self.scale)
+        if key != self.__aabb_key:
+            # Transforma todos los vértices por la matriz de modelo en una sola operación
+            # (glm guarda por columnas: p_mundo = v @ M[:3, :3] + M[3, :3])
+            verts3 = self.__vertices.reshape(-1, 3)
+            matrix = np.frombuffer(self.get_model_matrix().to_bytes(), dtype='f4').reshape(4, 4)
+            pts = verts3 @ matrix[:3, :3] + matrix[3, :3]
+
+            # Guarda (min, max) para cada eje
+            self.__aabb_key = key
+            self.__aabb = (glm.vec3(*pts.min(axis=0)), glm.vec3(*pts.max(axis=0)))
+        return self.__aabb
+
+    @property
+    def hittable(self):
+        # Si el objeto puede ser golpeado/seleccionado
+        return self.__colision.hittable
 
     def check_hit(self, origin, direction):
         return self.__colision.check_hit(origin, direction)
 
+    def hit_distance(self, origin, direction):
+        return self.__colision.hit_distance(origin, direction)
+
+    def hit_distances(self, origins, directions):
+        return self.__colision.hit_distances(origins, directions)
+
+    def hit_normal(self, origin, direction):
+        return self.__colision.hit_normal(origin, direction)
+
     def get_model_matrix(self):
         model = glm.mat4(1)
         model = glm.translate(model, self.position)
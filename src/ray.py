@@ -10,6 +10,14 @@ class Ray:
         # Vector dirección normalizado
         self.__direction = glm.normalize(glm.vec3(*direction))
 
+    @classmethod
+    def from_unit(cls, origin, direction):
+        # Rayo con una dirección ya normalizada (evita volver a normalizarla)
+        ray = cls.__new__(cls)
+        ray.__origin = origin
+        ray.__direction = direction
+        return ray
+
     @property
     def origin(self) -> glm.vec3:
         # Retorna punto de origen
@@ -2,51 +2,268 @@
 # RayTracer en CPU y GPU: versión completa con compute shader configurado.
 
 from texture import Texture, ImageData
+from texture_pool import texture_pool
 from shader_program import ComputeShaderProgram
-from bvh import BVH
+from bvh import BVH, stack_depth, reorder_bvh
+from bvh_compact import CompactBVH
+from denoise import AOVImages, DenoisePass
+from lbvh import build_lbvh, primitives_to_bounds
+from material_table import build_atlas
+from multiview import ViewTargets, pack_views, VIEWS_BINDING
+from picking import PickingTarget, NO_OBJECT
+from ray import Ray
+from spatial_grid import UniformGrid
+from wavefront import (WavefrontQueues, run_wavefront, PASS_GENERATE, PASS_INTERSECT,
+                       PASS_SHADE, PASS_ADVANCE, PASS_FINALIZE)
 import numpy as np
+import glm
 
 
 # ============================================================
 # Versión CPU del RayTracer
 # ============================================================
 class RayTracer:
-    def __init__(self, camera, width, height):
+    def __init__(self, camera, width, height, acceleration=None, picking=False, aovs=False):
         self.camera = camera
         self.width = width
         self.height = height
-        self.framebuffer = Texture(width=width, height=height, channels_amount=3)
+        self.framebuffer = self.__create_framebuffer(width, height)
+        # Tamaño reservado del framebuffer (puede ser mayor que width x height, ver resize())
+        self.texture_size = (width, height)
+        # Target de picking: objeto más cercano (índice + 1, 0 = nada) y distancia por píxel
+        self.picking = picking
+        self.object_ids = None
+        self.distances = None
+        self.__allocate_picking()
+        # AOVs del rayo primario para el denoiser: profundidad lineal, normal y albedo
+        self.aovs = aovs
+        self.aov_images = None
+        self.__allocate_aovs()
+        # Color base de cada objeto (array (n, 3) en [0, 1]) para la AOV de albedo; lo
+        # asigna la escena con los colores de los materiales (None = color del píxel)
+        self.albedos = None
+        # Tamaño de la región trazada en el último render (la que cubre el target de picking)
+        self.rendered_size = (width, height)
+        
+        # Estructura de aceleración: None (probar todos los objetos), "bvh" o "grid"
+        self.acceleration = acceleration
+        self.accelerator = None
         
         # Asignar degradado de cielo por defecto
         self.camera.set_sky_colors(top=(16, 190, 222), bottom=(181, 224, 247))
     
+    def resize(self, width, height):
+        """
+        Cambia el tamaño de salida. El framebuffer solo se reasigna para agrandarlo (al mayor
+        tamaño visto); si no, se traza en su esquina width x height.
+        """
+        self.width, self.height = width, height
+        if width > self.texture_size[0] or height > self.texture_size[1]:
+            self.texture_size = (max(width, self.texture_size[0]), max(height, self.texture_size[1]))
+            texture_pool.release_array(self.framebuffer.image_data.data)
+            self.framebuffer = self.__create_framebuffer(*self.texture_size)
+            self.__allocate_picking()
+            self.__allocate_aovs()
+            return True
+        return False
+
+    @staticmethod
+    def __create_framebuffer(width, height):
+        # Imagen RGB de 8 bits del pool de buffers (ver texture_pool.py)
+        data = texture_pool.acquire_array((height, width, 3), np.uint8, fill=0)
+        return Texture(width=width, height=height, channels_amount=3, image_data=ImageData.from_array(data))
+
+    def __allocate_picking(self):
+        if self.picking:
+            self.object_ids = np.zeros(self.texture_size[::-1], dtype='i4')
+            self.distances = np.zeros(self.texture_size[::-1], dtype='f4')
+
+    def __allocate_aovs(self):
+        if self.aovs:
+            self.aov_images = AOVImages.empty(*self.texture_size)
+
+    def build_acceleration(self, objects):
+        """Construye (o actualiza) la estructura de aceleración con los AABBs de los objetos."""
+        if self.acceleration is None:
+            self.accelerator = None
+            return
+        
+        bounds = np.array([(*obj.aabb[0], *obj.aabb[1]) for obj in objects], dtype='f4')
+        if self.acceleration == "grid":
+            # La grilla se actualiza solo para los objetos que se movieron
+            if isinstance(self.accelerator, UniformGrid):
+                self.accelerator.update_all(bounds)
+            else:
+                self.accelerator = UniformGrid(bounds)
+        elif self.acceleration == "bvh":
+            self.accelerator = BVH([{"aabb_min": row[:3], "aabb_max": row[3:]} for row in bounds])
+        else:
+            raise ValueError(f"Estructura de aceleración desconocida: {self.acceleration}")
+    
     def trace_ray(self, ray, objects):
         """Lanza un rayo y devuelve el color del píxel según intersección o cielo."""
-        for obj in objects:
-            if obj.check_hit(ray.origin, ray.direction):
-                return (255, 0, 0)  # Rojo si intersecta algún objeto
+        color, _ = self.hit_color(ray, objects)
+        if color is not None:
+            return color
         
         # Si no hay intersección, usar el degradado del cielo
         height = ray.direction.y
         return self.camera.get_sky_gradient(height)
+
+    def hit_color(self, ray, objects, closest=False):
+        """
+        (color, hit) del rayo: color del objeto que toca (None si no toca ninguno: cielo) y
+        hit = (distancia, índice) del más cercano, o None. Con estructura de aceleración el
+        hit sale del mismo recorrido; sin ella se busca el más cercano solo con closest=True
+        (si no, alcanza con el primer objeto que toque y hit queda en None).
+        """
+        if self.accelerator is not None or closest:
+            hit = self.closest_object(ray, objects)
+            if hit is not None:
+                return (255, 0, 0), hit  # Rojo si intersecta algún objeto
+        else:
+            for obj in objects:
+                if obj.check_hit(ray.origin, ray.direction):
+                    return (255, 0, 0), None  # Rojo si intersecta algún objeto
+        return None, None
     
-    def render_frame(self, objects):
-        """Recorre todos los píxeles, genera rayos y calcula el color resultante."""
-        for y in range(self.height):
-            for x in range(self.width):
-                # Normalizar coordenadas de píxel a rango [0, 1]
-                u = x / (self.width - 1)
-                v = y / (self.height - 1)
+    def closest_object(self, ray, objects):
+        """(distancia, índice) del objeto más cercano que toca el rayo, o None."""
+        distance_to = lambda index: objects[index].hit_distance(ray.origin, ray.direction)
+        if self.accelerator is not None:
+            return self.accelerator.closest_hit(ray.origin, ray.direction, distance_to)
+        closest = None
+        for index in range(len(objects)):
+            distance = distance_to(index)
+            if distance is not None and (closest is None or distance < closest[0]):
+                closest = (distance, index)
+        return closest
+
+    def pick(self, u, v):
+        """(índice, distancia) del objeto visible en (u, v) según el último render."""
+        width, height = self.rendered_size
+        x = min(max(int(round(u * (width - 1))), 0), width - 1)
+        y = min(max(int(round(v * (height - 1))), 0), height - 1)
+        object_id = int(self.object_ids[y, x])
+        if object_id <= 0:
+            return NO_OBJECT, float('inf')
+        return object_id - 1, float(self.distances[y, x])
+
+    def read_aovs(self):
+        """AOVImages de la región trazada en el último render."""
+        return self.aov_images.region(*self.rendered_size)
 
-                # Generar rayo desde la cámara
-                ray = self.camera.raycast(u, v)
+    def apply_denoiser(self, denoiser):
+        """Filtra en el lugar la región trazada del framebuffer con denoiser (ver denoise.py)."""
+        width, height = self.rendered_size
+        data = self.framebuffer.image_data.data
+        data[:height, :width] = denoiser.denoise(data[:height, :width], self.read_aovs())
 
-                # Calcular color mediante ray tracing
-                color = self.trace_ray(ray, objects)
+    def render_frame(self, objects, render_size=None):
+        """
+        Recorre todos los píxeles, genera rayos y calcula el color resultante.
+        render_size: (ancho, alto) para trazar solo esa esquina del framebuffer
+        (resolución dinámica); None = framebuffer completo.
+        """
+        for _ in self.render_rows(objects, render_size):
+            pass
+
+    def render_rows(self, objects, render_size=None):
+        """
+        Igual que render_frame() pero como generador: entrega la cantidad de filas ya
+        trazadas después de cada fila. Dejar de iterarlo cancela el render.
+        """
+        self.build_acceleration(objects)
+        width, height = render_size or (self.width, self.height)
+        self.rendered_size = (width, height)
+        # Eje de la cámara para la profundidad lineal de las AOVs
+        forward = glm.normalize(self.camera.target - self.camera.position)
+        # Direcciones de todos los rayos primarios (grilla cacheada por la cámara, rotada
+        # una vez por frame) y el cielo de toda la región con una consulta a la tabla
+        origin = glm.vec3(self.camera.position)
+        directions = self.camera.ray_directions(width, height)
+        sky = self.camera.sky_gradients(directions[..., 1])
+        data = self.framebuffer.image_data.data
+        for y in range(height):
+            # La fila empieza con el cielo; los hits se pintan encima
+            data[y, :width] = sky[y]
+            for x in range(width):
+                # Rayo desde la cámara con la dirección ya normalizada
+                ray = Ray.from_unit(origin, glm.vec3(*directions[y, x]))
+
+                # Calcular color mediante ray tracing (y el objeto visible, para el
+                # picking y las AOVs, con el mismo recorrido)
+                color, hit = self.hit_color(ray, objects, closest=self.picking or self.aovs)
 
                 # Escribir píxel en el framebuffer
-                self.framebuffer.set_pixel(x, y, color)
+                if color is not None:
+                    self.framebuffer.set_pixel(x, y, color)
+                else:
+                    color = sky[y, x]
+
+                if self.picking:
+                    self.object_ids[y, x] = 0 if hit is None else hit[1] + 1
+                    self.distances[y, x] = 0.0 if hit is None else hit[0]
+                if self.aovs:
+                    self.__write_aovs(x, y, ray, hit, color, objects, forward)
+            yield y + 1
     
+    def closest_hits(self, origins, directions, objects):
+        """
+        Hit más cercano de muchos rayos a la vez (origins y directions (n, 3)): devuelve
+        (distancias (n,) con inf si no hay hit, índices (n,) con -1). Los objetos con
+        hit_distances() se prueban vectorizados contra todos los rayos; el resto, rayo por rayo.
+        """
+        origins = np.asarray(origins, dtype='f4').reshape(-1, 3)
+        directions = np.asarray(directions, dtype='f4').reshape(-1, 3)
+        closest = np.full(len(origins), np.inf, dtype='f4')
+        indices = np.full(len(origins), -1, dtype=np.int64)
+        for index, obj in enumerate(objects):
+            if hasattr(obj, "hit_distances"):
+                distances = obj.hit_distances(origins, directions)
+            else:
+                distances = np.array([np.inf if distance is None else distance for distance in
+                                      (obj.hit_distance(glm.vec3(*origin), glm.vec3(*direction))
+                                       for origin, direction in zip(origins, directions))], dtype='f4')
+            nearer = distances < closest
+            closest[nearer] = distances[nearer]
+            indices[nearer] = index
+        return closest, indices
+
+    def render_views(self, objects, cameras, render_size=None):
+        """
+        Traza varias cámaras de la escena como un solo conjunto de rayos (vistas x alto x
+        ancho): una consulta al cielo y una prueba de hits vectorizada por objeto para todos
+        los rayos de todas las vistas (ver closest_hits()). Devuelve un array (vistas, alto,
+        ancho, 3) uint8; no toca el framebuffer, el picking ni las AOVs de la cámara principal.
+        """
+        width, height = render_size or (self.width, self.height)
+        directions = np.stack([camera.ray_directions(width, height) for camera in cameras])
+        origins = np.broadcast_to(np.array([tuple(camera.position) for camera in cameras],
+                                           dtype='f4')[:, None, None, :], directions.shape)
+        # El cielo es de la escena: se usa el degradado de la cámara principal en todas
+        images = self.camera.sky_gradients(directions[..., 1]).astype(np.uint8)
+        _, indices = self.closest_hits(origins.reshape(-1, 3), directions.reshape(-1, 3), objects)
+        images.reshape(-1, 3)[indices >= 0] = (255, 0, 0)  # Rojo si intersecta algún objeto
+        return images
+
+    def __write_aovs(self, x, y, ray, hit, color, objects, forward):
+        # Cielo: profundidad y normal en 0 y el color del cielo como albedo; en un hit, el
+        # color base del material (como en la GPU), no el color sombreado del píxel
+        if hit is None:
+            self.aov_images.albedo[y, x] = np.asarray(tuple(color), dtype='f4') / 255.0
+            self.aov_images.depth[y, x] = 0.0
+            self.aov_images.normal[y, x] = 0.0
+            return
+        distance, index = hit
+        if self.albedos is not None:
+            self.aov_images.albedo[y, x] = self.albedos[index]
+        else:
+            self.aov_images.albedo[y, x] = np.asarray(tuple(color), dtype='f4') / 255.0
+        direction = glm.normalize(glm.vec3(ray.direction))
+        self.aov_images.depth[y, x] = distance * glm.dot(direction, forward)
+        self.aov_images.normal[y, x] = tuple(objects[index].hit_normal(ray.origin, ray.direction))
+
     def get_texture(self):
         """Devuelve la textura resultante renderizada."""
         return self.framebuffer.image_data
@@ -56,59 +273,264 @@ class RayTracer:
 # Versión GPU del RayTracer
 # ============================================================
 class RayTracerGPU:
-    def __init__(self, ctx, camera, width, height, output_graphics):
+    SHADER_PATH = "shaders/raytracing.comp"
+    DEFAULT_STACK_SIZE = 32
+    # La textura de salida crece en múltiplos de este tamaño (menos reasignaciones al arrastrar)
+    TEXTURE_GRANULARITY = 64
+    # Unidad de textura del atlas de materiales (sampler2DArray materialAtlas)
+    ATLAS_TEXTURE_UNIT = 7
+    WAVEFRONT_PASSES = (PASS_GENERATE, PASS_INTERSECT, PASS_SHADE, PASS_ADVANCE, PASS_FINALIZE)
+
+    def __init__(self, ctx, camera, width, height, output_graphics, local_size=(16, 16), max_bounces=3,
+                 mode="megakernel", compact_bits=None, bvh_width=2, bvh_layout=None, bvh_builder="recursive",
+                 picking=False, aovs=False):
+        """
+        mode: "megakernel" (un hilo por pixel recorre todos los rebotes) o "wavefront"
+        (pasadas separadas por rebote con colas de rayos, ver wavefront.py).
+        compact_bits: None (nodos float32) u 8/16 para el BVH cuantizado de bvh_compact.py,
+        con bvh_width hijos por nodo (2 o 4).
+        bvh_layout: None (orden de construcción), "dfs" o "veb" (ver bvh.reorder_bvh).
+        bvh_builder: "recursive" (BVH) o "lbvh" (construcción lineal con códigos de Morton).
+        picking: escribir también el target de ids y distancias para pick() (ver picking.py).
+        aovs: escribir también normal, profundidad y albedo del rayo primario para el
+        denoiser (ver read_aovs() y denoise.py).
+        """
         self.ctx = ctx
         self.width, self.height = width, height
+        # Región de la textura que se renderiza (resolución dinámica, ver resolution.py)
+        self.render_size = (width, height)
         self.camera = camera
         self.output_graphics = output_graphics
+        # SSBOs persistentes por binding (se reutilizan entre frames)
+        self.__ssbos = {}
+        # Atlas de texturas de la tabla de materiales y versiones ya subidas de la tabla
+        self.material_atlas = None
+        self.__material_version = None
+        self.__atlas_version = None
+
+        # Configuración de compilación del compute shader (ver configure())
+        self.local_size = tuple(local_size)
+        self.stack_size = self.DEFAULT_STACK_SIZE
+        self.max_bounces = max_bounces
+        self.mode = mode
+        self.compact_bits = compact_bits
+        self.bvh_width = bvh_width
+        self.bvh_layout = bvh_layout
+        self.bvh_builder = bvh_builder
+        # prim_order[i] = objeto de la escena que ocupa la posición i de los SSBOs (None = identidad)
+        self.prim_order = None
+        self.__variants = {}
+        # Variante seleccionada (y pasadas del wavefront); se compila en el primer uso
+        self.__compute_shader = None
+        self.__passes = {}
+        self.queues = WavefrontQueues(ctx) if mode == "wavefront" else None
+        # Target auxiliar de picking (primitiva visible y distancia por píxel)
+        self.picking = PickingTarget(ctx, width, height) if picking else None
+        # AOVs del rayo primario (texturas rgba32f en las unidades de imagen 3 y 4)
+        self.aovs = aovs
+        self.aov_textures = None
+        # Filtro del denoiser en GPU (se crea en el primer apply_denoiser())
+        self.denoise_pass = None
+        # Capas de salida de render_views() (se crean en la primera llamada)
+        self.view_targets = None
         
-        # Crear compute shader para raytracing
-        self.compute_shader = ComputeShaderProgram(self.ctx, "shaders/raytracing.comp")
+        # Configuración del compute shader para raytracing (se compila al primer run())
+        self.configure()
+
+        # Contador de desbordes de la pila del BVH (binding 4 del shader)
+        self.diagnostics = self.ctx.buffer(np.zeros(1, dtype='u4'))
+        self.diagnostics.bind_to_storage_buffer(binding=4)
         
         # -------------------------------
         # Crear y vincular textura de salida EN FLOAT32
         # -------------------------------
         self.texture_unit = 0
-        
-        # CRITICO: Crear textura con datos float32 para rgba32f
-        float_data = np.zeros((self.height, self.width, 4), dtype=np.float32)
-        image_data_float = ImageData.__new__(ImageData)
-        image_data_float.data = float_data
-        
-        self.output_texture = Texture("u_texture", self.width, self.height, 4, image_data_float, (0, 0, 0, 0))
-        
-        # Pasar la textura al quad para renderizado
-        self.output_graphics.update_texture("u_texture", self.output_texture.image_data)
-        
-        # Vincular como image2D para escritura del compute shader
-        self.output_graphics.bind_to_image("u_texture", self.texture_unit, read=False, write=True)
+        self.__allocate_output(self.width, self.height)
 
-        # -------------------------------
-        # Inicializar uniforms del compute shader
-        # -------------------------------
-        self.compute_shader.set_uniform("cameraPosition", self.camera.position)
-        self.compute_shader.set_uniform("inverseViewMatrix", self.camera.get_inverse_view_matrix())
-        self.compute_shader.set_uniform("fieldOfView", self.camera.fov)
     
     def resize(self, width, height):
-        """Recalcula el tamaño de la textura al redimensionar la ventana."""
+        """
+        Ajusta el tamaño de salida al redimensionar la ventana. La textura se reserva al mayor
+        tamaño visto y solo se reasigna para agrandarla; si no, se renderiza en su esquina
+        width x height (ver render_size y texture_size).
+        """
         self.width, self.height = width, height
+        self.render_size = (width, height)
+        if width > self.texture_size[0] or height > self.texture_size[1]:
+            step = self.TEXTURE_GRANULARITY
+            self.__allocate_output(max(-(-width // step) * step, self.texture_size[0]),
+                                   max(-(-height // step) * step, self.texture_size[1]))
+
+    def __allocate_output(self, width, height):
+        # CRITICO: textura rgba32f; se toma del pool sin armar datos en CPU (el compute
+        # shader escribe la región renderizada antes de mostrarla)
+        self.texture_size = (width, height)
+        if self.picking is not None:
+            self.picking.resize(width, height)
+        if self.aovs:
+            self.__allocate_aovs(width, height)
+        self.output_texture = Texture("u_texture", width, height, 4, color=(0, 0, 0, 0))
+        texture_ctx = texture_pool.acquire_texture(self.ctx, (width, height), 4, 'f4')
+        self.output_texture_ctx = texture_ctx
         
-        # Recrear textura float32
-        float_data = np.zeros((self.height, self.width, 4), dtype=np.float32)
-        image_data_float = ImageData.__new__(ImageData)
-        image_data_float.data = float_data
+        # Pasar la textura al quad para renderizado (la anterior vuelve al pool)
+        self.output_graphics.replace_texture("u_texture", texture_ctx, self.output_texture)
         
-        self.output_texture = Texture("u_texture", width, height, 4, image_data_float, (0, 0, 0, 0))
-        self.output_graphics.update_texture("u_texture", self.output_texture.image_data)
+        # Vincular como image2D para escritura del compute shader
         self.output_graphics.bind_to_image("u_texture", self.texture_unit, read=False, write=True)
 
+    def __allocate_aovs(self, width, height):
+        # (normal xyz + profundidad lineal, albedo) del tamaño de la textura de salida
+        if self.aov_textures is not None:
+            for texture in self.aov_textures:
+                texture_pool.release_texture(texture)
+        self.aov_textures = tuple(texture_pool.acquire_texture(self.ctx, (width, height), 4, 'f4')
+                                  for _ in range(2))
+
+    def set_render_size(self, width, height):
+        """
+        Renderiza solo la esquina width x height de la textura de salida (sin reasignarla).
+        Devuelve el tamaño efectivo, limitado al de la textura.
+        """
+        self.render_size = (max(1, min(width, self.width)), max(1, min(height, self.height)))
+        return self.render_size
+
+    # -------------------------------
+    # Variantes del compute shader
+    # -------------------------------
+    def configure(self, local_size=None, stack_size=None, max_bounces=None):
+        """
+        Selecciona la variante del compute shader con ese tamaño de grupo local, tamaño
+        de pila del BVH y cantidad de rebotes. Cada variante se compila una sola vez y
+        recién cuando se usa, así que reconfigurar antes del primer frame (ajuste del grupo
+        local, pila del BVH) no compila variantes que no se van a ejecutar.
+        """
+        if local_size is not None:
+            self.local_size = tuple(local_size)
+        if stack_size is not None:
+            self.stack_size = stack_size
+        if max_bounces is not None:
+            self.max_bounces = max_bounces
+
+        self.__compute_shader = None
+        self.__passes = {}
+
+    @property
+    def compute_shader(self):
+        """Variante seleccionada por configure() (la pasada de intersección en wavefront)."""
+        if self.__compute_shader is None:
+            if self.mode == "wavefront":
+                self.__passes = {number: self.__variant(number) for number in self.WAVEFRONT_PASSES}
+                self.__compute_shader = self.__passes[PASS_INTERSECT]
+            else:
+                self.__compute_shader = self.__variant()
+        return self.__compute_shader
+
+    @property
+    def passes(self):
+        """Pasadas del modo wavefront (número de pasada -> variante)."""
+        self.compute_shader
+        return self.__passes
+
+    def __variant(self, wavefront_pass=None, multi_view=False):
+        # Las vistas extra no escriben picking ni AOVs (son del rayo primario de la cámara)
+        picking = self.picking is not None and not multi_view
+        aovs = self.aovs and not multi_view
+        key = (self.local_size, self.stack_size, self.max_bounces, self.compact_bits, wavefront_pass,
+               picking, aovs, multi_view)
+        variant = self.__variants.get(key)
+        if variant is None:
+            defines = {
+                "LOCAL_SIZE_X": self.local_size[0],
+                "LOCAL_SIZE_Y": self.local_size[1],
+                "BVH_STACK_SIZE": self.stack_size,
+                "MAX_RAY_BOUNCES": self.max_bounces,
+            }
+            if self.compact_bits is not None:
+                defines["BVH_COMPACT_BITS"] = self.compact_bits
+            if picking:
+                defines["PICKING_TARGET"] = 1
+            if aovs:
+                defines["AOV_OUTPUTS"] = 1
+            if multi_view:
+                defines["MULTI_VIEW"] = 1
+            if wavefront_pass is not None:
+                defines["WAVEFRONT_PASS"] = wavefront_pass
+                defines["WAVEFRONT_LOCAL_SIZE"] = self.local_size[0] * self.local_size[1]
+            variant = ComputeShaderProgram(self.ctx, self.SHADER_PATH, defines=defines)
+            self.__variants[key] = variant
+        return variant
+
+    def __fit_stack(self, nodes):
+        # Si el árbol es más profundo que la pila del shader, pasar a una variante con
+        # pila más grande (potencia de 2) en vez de descartar nodos
+        required = nodes.stack_depth if isinstance(nodes, CompactBVH) else stack_depth(nodes)
+        if required > self.stack_size:
+            stack_size = self.DEFAULT_STACK_SIZE
+            while stack_size < required:
+                stack_size *= 2
+            self.configure(stack_size=stack_size)
+
+    def pick(self, u, v):
+        """
+        (índice del objeto, distancia) visible en (u, v) según el último frame, leyendo un
+        solo píxel del target de picking; (NO_OBJECT, inf) si no hay ninguno.
+        """
+        width, height = self.render_size
+        index, distance = self.picking.read(min(int(u * width), width - 1),
+                                            min(int(v * height), height - 1))
+        # El shader escribe la posición en los SSBOs: volver al orden de los objetos
+        if index != NO_OBJECT and self.prim_order is not None:
+            index = int(self.prim_order[index])
+        return index, distance
+
+    def read_aovs(self):
+        """AOVImages de la región renderizada en el último frame (lee la GPU)."""
+        # Las escrituras con imageStore deben ser visibles antes de leer las texturas
+        self.ctx.memory_barrier()
+        width, height = self.texture_size
+        normal_depth, albedo = (np.frombuffer(texture.read(), dtype='f4').reshape(height, width, 4)
+                                for texture in self.aov_textures)
+        aovs = AOVImages(normal_depth[..., 3], normal_depth[..., :3], albedo[..., :3])
+        return aovs.region(*self.render_size)
+
+    def apply_denoiser(self, denoiser):
+        """
+        Filtra en el lugar la región renderizada de la textura de salida con los parámetros
+        de denoiser, en GPU con DenoisePass (ver denoise.py): la imagen no pasa por la CPU.
+        """
+        if self.denoise_pass is None:
+            self.denoise_pass = DenoisePass(self.ctx)
+        self.denoise_pass.run(denoiser, self.output_texture_ctx, *self.aov_textures, self.render_size)
+
+    def stack_overflows(self):
+        """Nodos descartados por desborde de pila desde la última llamada (lee la GPU)."""
+        count = int(np.frombuffer(self.diagnostics.read(), dtype='u4')[0])
+        if count:
+            self.diagnostics.write(np.zeros(1, dtype='u4'))
+        return count
+
     # -------------------------------
     # Enviar matrices a la GPU (SSBOs)
     # -------------------------------
     def matrix_to_ssbo(self, matrix, binding=0):
         """Envía una matriz (model, view, projection) como SSBO."""
-        buffer = self.ctx.buffer(matrix.tobytes())
+        self.__upload(binding, matrix)
+
+    def __upload(self, binding, data):
+        # Los SSBOs son persistentes por binding: si el tamaño no cambia se huérfana el
+        # almacenamiento (evita esperar a que la GPU termine de leerlo) y se reescribe
+        data = np.ascontiguousarray(data, dtype='u4' if data.dtype == np.uint32 else 'f4')
+        buffer = self.__ssbos.get(binding)
+        if buffer is None or buffer.size != max(data.nbytes, 4):
+            if buffer is not None:
+                buffer.release()
+            buffer = self.ctx.buffer(data.tobytes() if data.nbytes else None,
+                                     reserve=0 if data.nbytes else 4, dynamic=True)
+            self.__ssbos[binding] = buffer
+        elif data.nbytes:
+            buffer.orphan()
+            buffer.write(data)
         buffer.bind_to_storage_buffer(binding=binding)
 
     # -------------------------------
@@ -117,9 +539,68 @@ class RayTracerGPU:
     def primitives_to_ssbo(self, primitives, binding=3):
         """Genera la jerarquía BVH y la envía a la GPU."""
         self.bvh_nodes = BVH(primitives)
-        self.bvh_ssbo = self.bvh_nodes.pack_to_bytes()
-        buf_bvh = self.ctx.buffer(self.bvh_ssbo)
-        buf_bvh.bind_to_storage_buffer(binding=binding)
+        self.bvh_to_ssbo(self.bvh_nodes.to_array(), binding)
+
+    def build_bvh(self, primitives):
+        """Construye el BVH de las primitivas con el builder elegido; devuelve nodos empaquetados."""
+        if self.bvh_builder == "lbvh":
+            return build_lbvh(primitives_to_bounds(primitives))
+        return BVH(primitives).to_array()
+
+    def prepare_bvh(self, packed_nodes):
+        """
+        Reordena (bvh_layout) y codifica (compact_bits) el BVH, sin llamadas a GL.
+        Devuelve (nodos, prim_order); prim_order es None si no hubo reordenamiento.
+        """
+        prim_order = None
+        if self.bvh_layout is not None:
+            packed_nodes, prim_order = reorder_bvh(packed_nodes, self.bvh_layout)
+        return self.encode_bvh(packed_nodes), prim_order
+
+    def material_table_to_ssbo(self, table, binding=10):
+        """
+        Sube la tabla de materiales (ver material_table.py) y reconstruye el atlas, solo si
+        cambiaron desde la última subida.
+        """
+        if table.version != self.__material_version:
+            self.__upload(binding, table.rows)
+            self.__material_version = table.version
+        if table.texture_version != self.__atlas_version:
+            if self.material_atlas is not None:
+                self.material_atlas.release()
+            self.material_atlas = build_atlas(self.ctx, table.textures)
+            self.__atlas_version = table.texture_version
+
+    def scene_to_ssbo(self, models, inverse, materials, prepared_bvh):
+        """
+        Sube matrices, el índice de material de cada objeto en la tabla (materials) y el
+        BVH de prepare_bvh(); los arrays por objeto se permutan para seguir el orden de las
+        hojas del BVH.
+        """
+        nodes, prim_order = prepared_bvh
+        self.prim_order = prim_order
+        if prim_order is not None:
+            models, inverse, materials = models[prim_order], inverse[prim_order], materials[prim_order]
+        self.matrix_to_ssbo(models, 0)
+        self.matrix_to_ssbo(inverse, 1)
+        self.matrix_to_ssbo(materials, 2)
+        self.bvh_to_ssbo(nodes, 3)
+
+    def encode_bvh(self, packed_nodes):
+        """Nodos en el formato que lee el shader: los mismos o un CompactBVH (sin llamadas a GL)."""
+        if self.compact_bits is None or isinstance(packed_nodes, CompactBVH):
+            return packed_nodes
+        return CompactBVH(packed_nodes, self.compact_bits, self.bvh_width)
+
+    def bvh_to_ssbo(self, packed_nodes, binding=3):
+        """
+        Envía nodos BVH ya empaquetados (por ejemplo, mapeados desde el caché de escena)
+        o ya codificados con encode_bvh().
+        """
+        self.bvh_ssbo = packed_nodes
+        nodes = self.encode_bvh(packed_nodes)
+        self.__fit_stack(nodes)
+        self.__upload(binding, nodes.to_array() if isinstance(nodes, CompactBVH) else nodes)
 
     # -------------------------------
     # Ejecutar el compute shader
@@ -127,12 +608,58 @@ class RayTracerGPU:
     def run(self):
         """Ejecuta el compute shader para renderizar en GPU."""
         # Actualizar uniforms de la cámara en cada frame
-        self.compute_shader.set_uniform("cameraPosition", self.camera.position)
-        self.compute_shader.set_uniform("inverseViewMatrix", self.camera.get_inverse_view_matrix())
-        self.compute_shader.set_uniform("fieldOfView", self.camera.fov)
+        inverse_view = self.camera.get_inverse_view_matrix()
+        for shader in (self.passes.values() if self.mode == "wavefront" else (self.compute_shader,)):
+            shader.set_uniform("cameraPosition", self.camera.position)
+            shader.set_uniform("inverseViewMatrix", inverse_view)
+            shader.set_uniform("fieldOfView", self.camera.fov)
+            shader.set_uniform("renderSize", self.render_size)
+            shader.set_uniform("materialAtlas", self.ATLAS_TEXTURE_UNIT)
+
+        if self.material_atlas is None:
+            self.material_atlas = build_atlas(self.ctx, [])
+        self.material_atlas.use(self.ATLAS_TEXTURE_UNIT)
+
+        if self.picking is not None:
+            self.picking.bind_to_images()
+        if self.aovs:
+            for unit, texture in enumerate(self.aov_textures, start=3):
+                texture.bind_to_image(unit, read=False, write=True)
+
+        width, height = self.render_size
+        if self.mode == "wavefront":
+            run_wavefront(self.ctx, self.passes, self.queues, width, height,
+                          self.local_size, self.max_bounces)
+            return
         
-        groups_x = (self.width + 15) // 16
-        groups_y = (self.height + 15) // 16
+        local_x, local_y = self.local_size
+        groups_x = (width + local_x - 1) // local_x
+        groups_y = (height + local_y - 1) // local_y
 
         # Ejecutar shader
-        self.compute_shader.run(groups_x=groups_x, groups_y=groups_y, groups_z=1)
\ No newline at end of file
+        self.compute_shader.run(groups_x=groups_x, groups_y=groups_y, groups_z=1)
+
+    def render_views(self, cameras, width=None, height=None):
+        """
+        Renderiza varias cámaras de la escena ya subida (BVH, matrices y materiales del
+        último frame) en un solo dispatch: la vista i queda en la capa i de
+        view_targets.texture (ver multiview.py). width x height: tamaño de cada vista
+        (por defecto el de render). Usa siempre el megakernel, también en modo wavefront.
+        """
+        width, height = width or self.render_size[0], height or self.render_size[1]
+        if self.view_targets is None:
+            self.view_targets = ViewTargets(self.ctx)
+        self.view_targets.resize(width, height, len(cameras))
+        self.__upload(VIEWS_BINDING, pack_views(cameras))
+
+        shader = self.__variant(multi_view=True)
+        shader.set_uniform("renderSize", (width, height))
+        shader.set_uniform("materialAtlas", self.ATLAS_TEXTURE_UNIT)
+        if self.material_atlas is None:
+            self.material_atlas = build_atlas(self.ctx, [])
+        self.material_atlas.use(self.ATLAS_TEXTURE_UNIT)
+        self.view_targets.bind_to_image()
+
+        local_x, local_y = self.local_size
+        shader.run((width + local_x - 1) // local_x, (height + local_y - 1) // local_y, len(cameras))
+        return self.view_targets
@@ -0,0 +1,91 @@
+# render_queue.py
+# Cola de render para el pipeline tradicional (rasterización).
+# Ordena los draws por programa de shader, luego por conjunto de texturas y por último
+# de adelante hacia atrás (profundidad), y al vaciarla evita re-vincular programa,
+# texturas y uniforms cuando no cambian respecto del draw anterior.
+
+from uniform_buffer import OBJECT_BLOCK
+
+
+class DrawItem:
+    """Un draw pendiente: el Graphics a dibujar, su índice en el UBO de objetos y su profundidad."""
+    __slots__ = ("graphics", "index", "depth", "uniforms", "level", "sort_key")
+
+    def __init__(self, graphics, index, depth, uniforms=None, level=0):
+        self.graphics = graphics
+        self.index = index
+        self.depth = depth
+        self.uniforms = uniforms
+        self.level = level
+        self.sort_key = (id(graphics.material.shader_program.prog), graphics.texture_key, depth)
+
+
+class RenderStats:
+    """Contadores del último flush de la cola."""
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.draws = 0
+        self.program_changes = 0
+        self.texture_changes = 0
+        self.uniform_updates = 0
+
+    @property
+    def state_changes(self):
+        return self.program_changes + self.texture_changes + self.uniform_updates
+
+    def __repr__(self):
+        return (f"RenderStats(draws={self.draws}, programs={self.program_changes}, "
+                f"textures={self.texture_changes}, uniforms={self.uniform_updates})")
+
+
+class RenderQueue:
+    def __init__(self):
+        self.items = []
+        self.stats = RenderStats()
+
+    def clear(self):
+        self.items.clear()
+
+    def add(self, graphics, index, depth, uniforms=None, level=0):
+        """
+        Encola un draw. Si el shader usa el bloque de objeto, index es el offset en el
+        UBO de objetos; si no, uniforms contiene los valores a enviar (por ejemplo Mvp).
+        level es el nivel de detalle (LOD) a dibujar.
+        """
+        self.items.append(DrawItem(graphics, index, depth, uniforms, level))
+
+    def flush(self, object_uniforms):
+        """Dibuja los items ordenados, saltando cambios de estado redundantes."""
+        self.items.sort(key=lambda item: item.sort_key)
+        self.stats.reset()
+
+        last_program = None
+        last_textures = None
+        for item in self.items:
+            graphics = item.graphics
+            shader_program = graphics.material.shader_program
+
+            program_changed = shader_program.prog is not last_program
+            if program_changed:
+                last_program = shader_program.prog
+                self.stats.program_changes += 1
+
+            # Las texturas (y sus samplers) solo se vinculan si cambió el programa o el set
+            textures = item.sort_key[1]
+            if program_changed or textures != last_textures:
+                graphics.bind_textures()
+                last_textures = textures
+                self.stats.texture_changes += 1
+
+            if item.uniforms:
+                graphics.set_uniforms(item.uniforms)
+                self.stats.uniform_updates += 1
+            elif graphics.has_uniform_block(OBJECT_BLOCK[0]):
+                object_uniforms.bind(item.index)
+
+            graphics.draw(item.level)
+            self.stats.draws += 1
+
+        self.clear()
@@ -0,0 +1,84 @@
+# resolution.py
+# Resolución dinámica: ajusta la resolución interna del raytracing para sostener un tiempo
+# de frame objetivo. El raytracer escribe solo en la esquina (render_size) de su textura de
+# salida, que se reserva una vez al tamaño completo; el Sprite la muestrea escalando sus UV
+# (u_uv_scale en sprite.frag) con filtrado bilineal, así que ajustar no reasigna la textura.
+
+import math
+import time
+
+
+class DynamicResolution:
+    """
+    target_ms: tiempo de frame buscado.
+    min_scale / max_scale: límites de la escala por eje (1.0 = resolución de la ventana).
+    step: máximo cambio de escala por ajuste.
+    tolerance: banda relativa alrededor del objetivo en la que no se ajusta (evita oscilar).
+    smoothing: peso de cada medición en el promedio exponencial del tiempo de frame.
+    granularity: los tamaños se redondean a múltiplos de este valor (grupos del compute shader).
+    """
+    def __init__(self, target_ms, min_scale=0.5, max_scale=1.0, step=0.1, tolerance=0.1,
+                 smoothing=0.2, granularity=8):
+        if not 0.0 < min_scale <= max_scale:
+            raise ValueError("Se requiere 0 < min_scale <= max_scale")
+        self.target_ms = target_ms
+        self.min_scale = min_scale
+        self.max_scale = max_scale
+        self.step = step
+        self.tolerance = tolerance
+        self.smoothing = smoothing
+        self.granularity = granularity
+
+        self.scale = max_scale
+        self.average_ms = None
+        self.__last_time = None
+
+    def reset(self):
+        """Descarta las mediciones (por ejemplo, después de redimensionar la ventana)."""
+        self.average_ms = None
+        self.__last_time = None
+
+    def frame(self):
+        """Mide el tiempo desde la llamada anterior y ajusta la escala. Devuelve si cambió."""
+        now = time.perf_counter()
+        last, self.__last_time = self.__last_time, now
+        if last is None:
+            return False
+        return self.update((now - last) * 1000.0)
+
+    def update(self, frame_ms):
+        """Agrega una medición del tiempo de frame y ajusta la escala. Devuelve si cambió."""
+        if self.average_ms is None:
+            self.average_ms = frame_ms
+        else:
+            self.average_ms += (frame_ms - self.average_ms) * self.smoothing
+
+        ratio = self.average_ms / self.target_ms
+        if abs(ratio - 1.0) <= self.tolerance:
+            return False
+
+        # El costo crece con la cantidad de píxeles (escala al cuadrado)
+        wanted = self.scale / math.sqrt(ratio)
+        wanted = min(max(wanted, self.scale - self.step), self.scale + self.step)
+        wanted = min(max(wanted, self.min_scale), self.max_scale)
+        if abs(wanted - self.scale) < 1e-3:
+            return False
+
+        # Se corrige el promedio con el costo esperado a la nueva escala para no seguir
+        # ajustando con mediciones de la escala anterior
+        self.average_ms *= (wanted / self.scale) ** 2
+        self.scale = wanted
+        return True
+
+    def render_size(self, width, height):
+        """Tamaño interno (ancho, alto) para una salida de width x height."""
+        return (self.__fit(width), self.__fit(height)) if self.scale < 1.0 else (width, height)
+
+    def __fit(self, size):
+        scaled = int(round(size * self.scale / self.granularity)) * self.granularity
+        return min(max(scaled, self.granularity, 1), size)
+
+
+def uv_scale(render_size, texture_size):
+    """Escala de UV con la que el Sprite muestrea solo la región renderizada de la textura."""
+    return (render_size[0] / texture_size[0], render_size[1] / texture_size[1])
@@ -1,58 +1,284 @@
 # scene.py
 # Escena con soporte para renderizado tradicional y raytracing (CPU/GPU).
+# Los módulos que solo usan algunas escenas u opciones (raytracers, caché de escena,
+# pipeline, ajuste del grupo local, impostores) se importan al usarlos, para que importar
+# la escena (por ejemplo desde herramientas o sin GPU) sea rápido.
 
 from graphics import Graphics, ComputeGraphics
 import glm
 import math
+import time
 import numpy as np
-from raytracer import RayTracer, RayTracerGPU
+from uniform_buffer import FrameUniforms, ObjectUniforms, FRAME_BLOCK, OBJECT_BLOCK
+from render_queue import RenderQueue
+from frustum import extract_frustum_planes, aabbs_in_frustum, cull_bvh
+from bvh import BVH
+from resolution import DynamicResolution, uv_scale
+from change_tracker import ChangeTracker
+from picking import PickingTarget, NO_OBJECT, closest_object
+from material_table import MaterialTable, normalized_colors
 
 class Scene:
-    def __init__(self, ctx, camera):
+    def __init__(self, ctx, camera, frustum_culling=True, hierarchical_culling=False,
+                 lod_selector=None, impostor_shader=None, picking=False):
         self.ctx = ctx
         self.objects = []
         self.graphics = {}
         self.camera = camera
+        # Uniforms extra por objeto (nombre -> dict) que se asignan en cada draw junto con
+        # Mvp: el programa puede estar compartido (ProgramCache) con otros objetos
+        self.draw_uniforms = {}
+
+        # Niveles de detalle: selector (None = siempre nivel 0) y shader de impostores
+        self.lod_selector = lod_selector
+        self.impostor_shader = impostor_shader
+        self.__lod_levels = np.zeros(0, dtype=np.int64)
+        self.__impostors = {}
+
+        # Culling por frustum (opcionalmente jerárquico sobre un BVH de los objetos)
+        self.frustum_culling = frustum_culling
+        self.hierarchical_culling = hierarchical_culling
+        self.__culling_bvh = None
+        self.__culling_bounds = None
 
         # Inicializamos tiempo y matrices de cámara
         self.time = 0.0
         self.view = self.camera.get_view_matrix()
         self.projection = self.camera.get_perspective_matrix()
 
+        # UBOs: datos del frame (una escritura por frame) y matrices de todos los objetos
+        self.frame_uniforms = FrameUniforms(ctx)
+        self.object_uniforms = ObjectUniforms(ctx)
+        # Cola de render: ordena los draws y evita cambios de estado redundantes
+        self.render_queue = RenderQueue()
+        # Cambios de cámara, transformaciones y materiales desde el último frame (on-demand)
+        self.change_tracker = ChangeTracker()
+        # Target de ids de objetos para picking: se rasteriza recién cuando se pide un pick,
+        # con los objetos del último frame (render() solo guarda qué dibujar)
+        self.picking_enabled = picking
+        self.picking = None
+        self.__picking_items = None
+        self.__picking_size = None
+        self.__picking_stale = False
+
     def add_object(self, model, material):
         # Agregar objeto y crear su Graphics con el material
         self.objects.append(model)
+        material.shader_program.bind_uniform_block(*FRAME_BLOCK)
+        material.shader_program.bind_uniform_block(*OBJECT_BLOCK)
         self.graphics[model.name] = Graphics(self.ctx, model, material)
     
     def start(self):
         # Método que se ejecuta una vez cuando la escena está cargada
         print("Start!")
 
+    def stop(self):
+        # Método que se ejecuta una vez al cerrar la ventana
+        pass
+
+    def frame_signature(self):
+        """Firma del estado visible de la escena (ver change_tracker.py)."""
+        materials = [self.graphics[obj.name].material for obj in self.objects]
+        return self.change_tracker.signature(self.camera, self.objects, materials)
+
+    def needs_redraw(self):
+        """Indica si el próximo frame puede diferir del último (objetos animados o cambios)."""
+        if any(obj.animated for obj in self.objects):
+            return True
+        return self.change_tracker.changed(self.frame_signature())
+
+    def invalidate(self):
+        """Fuerza a renderizar completo el próximo frame (por ejemplo, tras recargar shaders)."""
+        self.change_tracker.invalidate()
+
     def on_mouse_click(self, u, v):
+        obj = self.pick(u, v)
+        if obj is not None:
+            print(f"¡Golpeaste al objeto!: {obj.name}")
+
+    def pick(self, u, v):
+        """Objeto más cercano bajo (u, v) en [0, 1], o None (los no golpeables no cuentan)."""
+        index, _ = self.pick_index(u, v)
+        if index == NO_OBJECT:
+            return None
+        obj = self.objects[index]
+        return obj if getattr(obj, "hittable", True) else None
+
+    def pick_index(self, u, v):
+        """
+        (índice, distancia) del objeto visible en (u, v): un píxel del target de picking si
+        se rasterizó, o si no el hit más cercano en CPU recorriendo el BVH de los objetos.
+        """
+        if self.__picking_items is not None:
+            self.__render_ids()
+            width, height = self.picking.size
+            return self.picking.read(u * width, v * height)
+        return self.closest_object(u, v)
+
+    def __render_ids(self):
+        # Rasteriza los ids del último frame si todavía no se hizo (un pass por frame como
+        # máximo, y ninguno si no hay picks); los UBOs de objetos conservan sus matrices
+        if not self.__picking_stale:
+            return
+        if self.picking is None:
+            self.picking = PickingTarget(self.ctx, *self.__picking_size)
+        self.picking.resize(*self.__picking_size)
+        self.frame_uniforms.bind()
+        self.picking.render_ids(self.__picking_items, self.object_uniforms)
+        self.__picking_stale = False
+
+    def closest_object(self, u, v):
+        """Respaldo en CPU del picking: closest-hit sobre el BVH de los AABBs de los objetos."""
+        if not self.objects:
+            return NO_OBJECT, float('inf')
         ray = self.camera.raycast(u, v)
-        for obj in self.objects:
-            if obj.check_hit(ray.origin, ray.direction):
-                print(f"¡Golpeaste al objeto!: {obj.name}")
+        bounds = np.array([(*obj.aabb[0], *obj.aabb[1]) for obj in self.objects], dtype='f4')
+        nodes = self.__get_culling_bvh(bounds).tolist()
+        return closest_object(nodes, self.objects, ray.origin, ray.direction)
 
     def render(self):
         # Avanzamos el tiempo en cada frame
         self.time += 0.01  
 
-        # Renderizar cada objeto
-        for obj in self.objects:
+        # Datos del frame: se escriben una sola vez en el UBO compartido
+        self.view = self.camera.get_view_matrix()
+        self.frame_uniforms.update(self.view, self.projection, self.camera.position, self.time)
+
+        # Animar objetos y obtener sus matrices de modelo
+        models = []
+        model_matrices = np.empty((len(self.objects), 16), dtype='f4')
+        for i, obj in enumerate(self.objects):
             # Solo animar objetos con animated=True
             if(obj.animated):
                 obj.rotation += glm.vec3(0.8, 0.6, 0.4)
                 obj.position.x += math.sin(self.time) * 0.01
 
-            # Obtener matriz modelo del objeto
             model = obj.get_model_matrix()
-            
-            # MVP = Projection × View × Model
-            mvp = self.projection * self.view * model
+            models.append(model)
+            model_matrices[i] = np.frombuffer(model.to_bytes(), dtype='f4')
+
+        # Una sola subida con las matrices de todos los objetos
+        self.object_uniforms.update(model_matrices)
+
+        # Profundidad en espacio de cámara de cada objeto (para ordenar de adelante hacia atrás)
+        view = np.frombuffer(self.view.to_bytes(), dtype='f4').reshape(4, 4)
+        depths = -(model_matrices[:, 12:15] @ view[:3, 2] + view[3, 2])
+
+        # AABBs cacheados de cada objeto (se recalculan solo si el objeto se movió)
+        bounds = None
+        if self.objects and (self.frustum_culling or self.lod_selector is not None):
+            bounds = np.array([(*obj.aabb[0], *obj.aabb[1]) for obj in self.objects], dtype='f4')
+
+        # Solo se encolan los objetos dentro del frustum de la cámara, con su nivel de detalle
+        visible = self.__cull_objects(bounds)
+        levels = self.__select_lods(bounds)
+
+        # Encolar cada objeto y dibujarlos ordenados por programa, texturas y profundidad
+        captured = False
+        picking_items = []
+        for i, obj in enumerate(self.objects):
+            if not visible[i]:
+                continue
+            graphics = self.graphics[obj.name]
+            if self.picking_enabled and self.__uses_world_transform(graphics):
+                picking_items.append((graphics, i, min(levels[i], graphics.lod_count - 1)))
+            if levels[i] >= graphics.lod_count:
+                # Último nivel: billboard con la captura del objeto
+                captured |= self.__queue_impostor(obj, graphics, bounds[i], depths[i], models[i])
+            elif graphics.has_uniform_block(OBJECT_BLOCK[0]):
+                # Por objeto solo se vincula su offset dentro del UBO
+                self.render_queue.add(graphics, i, depths[i], level=levels[i])
+            else:
+                # Shaders sin uniform blocks: MVP = Projection × View × Model
+                self.render_queue.add(graphics, i, depths[i],
+                                      {'Mvp': self.projection * self.view * models[i],
+                                       **self.draw_uniforms.get(obj.name, {})},
+                                      level=levels[i])
+
+        # Las capturas de impostores usan su propio UBO de frame: restaurar el de la escena
+        if captured:
+            self.frame_uniforms.bind()
+        self.render_queue.flush(self.object_uniforms)
 
-            # Renderizar pasando uniforms
-            self.graphics[obj.name].render({'Mvp': mvp})
+        # Objetos del frame para el target de picking (mismo tamaño que la salida); el pass
+        # de ids se dibuja solo si llega un pick antes del próximo frame
+        if self.picking_enabled:
+            self.__picking_items = picking_items
+            self.__picking_size = tuple(self.ctx.viewport[2:4])
+            self.__picking_stale = True
+        self.change_tracker.commit(self.frame_signature())
+
+    def __cull_objects(self, bounds):
+        # Devuelve la máscara de objetos visibles según el frustum de la cámara
+        visible = np.ones(len(self.objects), dtype=bool)
+        if not self.frustum_culling or not self.objects:
+            return visible
+
+        # Solo se descartan objetos dibujados en espacio de mundo (no sprites en pantalla)
+        cullable = np.array([self.__uses_world_transform(self.graphics[obj.name])
+                             for obj in self.objects])
+        if not np.any(cullable):
+            return visible
+
+        planes = extract_frustum_planes(self.projection * self.view)
+
+        if self.hierarchical_culling:
+            in_frustum = np.zeros(len(self.objects), dtype=bool)
+            in_frustum[cull_bvh(planes, self.__get_culling_bvh(bounds))] = True
+        else:
+            in_frustum = aabbs_in_frustum(planes, bounds[:, :3], bounds[:, 3:])
+
+        visible[cullable] = in_frustum[cullable]
+        return visible
+
+    def __select_lods(self, bounds):
+        # Nivel de detalle de cada objeto según su tamaño proyectado (con histéresis)
+        count = len(self.objects)
+        if self.lod_selector is None or count == 0:
+            return np.zeros(count, dtype=np.int64)
+
+        if len(self.__lod_levels) != count:
+            missing = count - len(self.__lod_levels)
+            self.__lod_levels = np.concatenate([self.__lod_levels, np.zeros(missing, dtype=np.int64)])
+
+        # El nivel extra (lod_count) es el impostor, si hay shader para dibujarlo
+        impostor = np.array([self.impostor_shader is not None
+                             and self.__uses_world_transform(self.graphics[obj.name])
+                             for obj in self.objects], dtype=bool)
+        max_levels = np.array([self.graphics[obj.name].lod_count - 1 for obj in self.objects]) + impostor
+        sizes = self.lod_selector.projected_sizes(bounds, self.view, self.camera.fov)
+        self.__lod_levels = self.lod_selector.select(sizes, self.__lod_levels, max_levels, impostor)
+        return self.__lod_levels
+
+    def __queue_impostor(self, obj, graphics, bounds, depth, model):
+        # Encola el billboard del objeto; devuelve True si hubo que recapturarlo
+        impostor = self.__impostors.get(obj.name)
+        if impostor is None:
+            from lod import Impostor
+            impostor = Impostor(self.ctx, graphics, self.impostor_shader)
+            self.__impostors[obj.name] = impostor
+
+        center = glm.vec3(*((bounds[:3] + bounds[3:]) * 0.5))
+        radius = float(np.linalg.norm(bounds[3:] - bounds[:3]) * 0.5)
+        captured = impostor.update(self.camera.position, center, radius, model, self.camera.up)
+
+        mvp = impostor.billboard_mvp(self.view, self.projection, center, radius)
+        # sprite.frag puede compartir programa con el Sprite del raytracer: escala UV propia
+        self.render_queue.add(impostor.graphics, -1, depth, {'Mvp': mvp, 'u_uv_scale': (1.0, 1.0)})
+        return captured
+
+    @staticmethod
+    def __uses_world_transform(graphics):
+        shader_program = graphics.material.shader_program
+        return graphics.has_uniform_block(OBJECT_BLOCK[0]) or "Mvp" in shader_program.uniforms
+
+    def __get_culling_bvh(self, bounds):
+        # El BVH de culling solo se reconstruye si cambió algún AABB
+        if self.__culling_bounds is None or not np.array_equal(bounds, self.__culling_bounds):
+            primitives = [{"aabb_min": row[:3], "aabb_max": row[3:]} for row in bounds]
+            self.__culling_bvh = BVH(primitives).to_array()
+            self.__culling_bounds = bounds
+        return self.__culling_bvh
 
     def on_resize(self, width, height):
         self.ctx.viewport = (0, 0, width, height)
@@ -62,42 +288,162 @@ class Scene:
 
 # --- Clase RayScene (raytracing en CPU) ---
 class RayScene(Scene):
-    def __init__(self, ctx, camera, width, height):
+    def __init__(self, ctx, camera, width, height, acceleration=None, target_frame_ms=None,
+                 resize_budget_ms=8.0, picking=False, denoiser=None):
         super().__init__(ctx, camera)
-        # Instanciamos el RayTracer con el tamaño de pantalla
-        self.raytracer = RayTracer(camera, width, height)
+        # Estructura de aceleración del raytracer: None, "bvh" o "grid"
+        self.acceleration = acceleration
+        # Denoiser en CPU que se aplica a cada imagen antes de subirla (ver denoise.py);
+        # requiere que el raytracer guarde las AOVs del rayo primario
+        self.denoiser = denoiser
+        # Instanciamos el RayTracer con el tamaño de pantalla (picking: ids por píxel al trazar)
+        from raytracer import RayTracer
+        self.raytracer = RayTracer(camera, width, height, acceleration, picking,
+                                   aovs=denoiser is not None)
+        # Resolución dinámica (None = una sola imagen a resolución completa en start()):
+        # se vuelve a trazar cada frame a la escala que sostiene target_frame_ms
+        self.resolution = None
+        if target_frame_ms is not None:
+            self.resolution = DynamicResolution(target_frame_ms, min_scale=0.1)
+        # Render después de un resize: se avanza por filas dentro de resize_budget_ms por
+        # frame y se cancela si llega otro resize antes de terminar
+        self.resize_budget_ms = resize_budget_ms
+        self.__job = None
+        self.__job_rows = 0
 
     def start(self):
         # Renderizamos con el raytracer y actualizamos la textura del Sprite
+        self.__job = None
+        self.__update_albedos()
         self.raytracer.render_frame(self.objects)
+        if self.denoiser is not None:
+            self.raytracer.apply_denoiser(self.denoiser)
         if "Sprite" in self.graphics:
             self.graphics["Sprite"].update_texture(
                 "u_texture", self.raytracer.get_texture()
             )
+            self.__set_uv_scale((self.raytracer.width, self.raytracer.height))
 
     def render(self):
+        if self.resolution is not None:
+            self.__trace_dynamic()
+        elif self.__job is not None:
+            self.__continue_job()
         # Reutilizamos el render de la clase base (Scene)
         super().render()
 
+    def render_views(self, cameras, render_size=None):
+        """Imágenes (vistas, alto, ancho, 3) de otras cámaras de la escena (ver RayTracer.render_views)."""
+        return self.raytracer.render_views(self.objects, cameras, render_size)
+
+    def pick_index(self, u, v):
+        # Con picking, el raytracer guardó el objeto visible de cada píxel al trazar
+        if self.raytracer.picking:
+            return self.raytracer.pick(u, v)
+        return self.closest_object(u, v)
+
+    def needs_redraw(self):
+        # Un render por filas pendiente o la resolución dinámica siguen actualizando la imagen
+        return self.resolution is not None or self.__job is not None or super().needs_redraw()
+
+    def __trace_dynamic(self):
+        # Trazar solo la región de la escala actual y subir esa región a la textura existente
+        self.resolution.frame()
+        width, height = self.resolution.render_size(self.raytracer.width, self.raytracer.height)
+        self.__update_albedos()
+        self.raytracer.render_frame(self.objects, (width, height))
+        if self.denoiser is not None:
+            self.raytracer.apply_denoiser(self.denoiser)
+        self.__upload_rows(0, height, width)
+        self.__set_uv_scale((width, height))
+
+    def __continue_job(self):
+        # Trazar filas del render pendiente hasta agotar el presupuesto de este frame
+        deadline = time.perf_counter() + self.resize_budget_ms / 1000.0
+        first = self.__job_rows
+        try:
+            while time.perf_counter() < deadline:
+                self.__job_rows = next(self.__job)
+        except StopIteration:
+            self.__job = None
+            # El denoiser necesita la imagen completa: se filtra al terminar y se sube entera
+            if self.denoiser is not None:
+                self.raytracer.apply_denoiser(self.denoiser)
+                first = 0
+        self.__upload_rows(first, self.__job_rows, self.raytracer.width)
+
+    def __upload_rows(self, first, last, width):
+        # Subir solo las filas [first, last) de la esquina trazada a la textura existente
+        if "Sprite" in self.graphics and last > first:
+            region = self.raytracer.get_texture().data[first:last, :width]
+            self.graphics["Sprite"].write_texture("u_texture", region,
+                                                  viewport=(0, first, width, last - first))
+
+    def __update_albedos(self):
+        # AOV de albedo del denoiser: color base del material de cada objeto
+        if self.denoiser is not None:
+            colors = [getattr(self.graphics[obj.name].material, "color_RGB", (0, 0, 0))
+                      for obj in self.objects]
+            self.raytracer.albedos = normalized_colors(colors).astype('f4').reshape(-1, 3)
+
+    def __set_uv_scale(self, render_size):
+        # Se asigna en cada draw del Sprite (ver draw_uniforms), no una vez en el programa
+        self.draw_uniforms["Sprite"] = {'u_uv_scale': uv_scale(render_size, self.raytracer.texture_size)}
+
     def on_resize(self, width, height):
-        # Ajustamos viewport, cámara y regeneramos el framebuffer
+        # Ajustamos viewport y cámara; el framebuffer solo se reasigna si hay que agrandarlo
         super().on_resize(width, height)
-        self.raytracer = RayTracer(self.camera, width, height)
-        self.start()
+        if self.raytracer.resize(width, height) and "Sprite" in self.graphics:
+            self.graphics["Sprite"].update_texture("u_texture", self.raytracer.get_texture())
+        if self.resolution is not None:
+            self.resolution.reset()
+            return
+
+        # El render en curso (del tamaño anterior) se descarta y empieza uno nuevo
+        self.__update_albedos()
+        self.__job = self.raytracer.render_rows(self.objects)
+        self.__job_rows = 0
+        self.__set_uv_scale((width, height))
 
 
 # --- Clase RaySceneGPU (raytracing en GPU con compute shaders) ---
 class RaySceneGPU(Scene):
-    def __init__(self, ctx, camera, width, height, output_model, output_material):
+    def __init__(self, ctx, camera, width, height, output_model, output_material, cache_path=None,
+                 pipelined=False, tuning_path=None, mode="megakernel", compact_bits=None, bvh_width=2,
+                 bvh_layout=None, bvh_builder="recursive", target_frame_ms=None, picking=False,
+                 denoiser=None):
         self.ctx = ctx
         self.camera = camera
         self.width = width
         self.height = height
         self.raytracer = None
+        # Archivo de caché binario de la escena (None = sin caché)
+        self.cache_path = cache_path
+        # Preparar el frame siguiente en un hilo de trabajo mientras la GPU procesa el actual
+        self.pipelined = pipelined
+        self.pipeline = None
+        # Archivo con el tamaño de grupo local óptimo por dispositivo (None = sin ajuste)
+        self.tuning_path = tuning_path
+        # Resolución dinámica para sostener target_frame_ms (None = siempre resolución completa)
+        self.resolution = DynamicResolution(target_frame_ms) if target_frame_ms is not None else None
+        # Denoiser entre el compute shader y la presentación (en GPU, ver denoise.py)
+        self.denoiser = denoiser
+        # Materiales distintos de la escena y el índice de cada objeto (ver material_table.py)
+        self.material_table = MaterialTable()
         
         # Crear Graphics del Quad de salida (se renderiza con pipeline tradicional)
         self.output_graphics = Graphics(ctx, output_model, output_material)
-        self.raytracer = RayTracerGPU(self.ctx, self.camera, self.width, self.height, self.output_graphics)
+        # mode: "megakernel" o "wavefront" (pasadas separadas con colas de rayos)
+        # compact_bits: None (BVH en float32) u 8/16 (BVH cuantizado con bvh_width hijos por nodo)
+        # bvh_layout: None, "dfs" o "veb" (hermanos contiguos para aprovechar la caché)
+        # bvh_builder: "recursive" o "lbvh" (construcción lineal, para escenas grandes)
+        # picking: el compute shader escribe también el objeto visible de cada píxel
+        # denoiser: el compute shader escribe también las AOVs que usa el filtro
+        from raytracer import RayTracerGPU
+        self.raytracer = RayTracerGPU(self.ctx, self.camera, self.width, self.height, self.output_graphics,
+                                      mode=mode, compact_bits=compact_bits, bvh_width=bvh_width,
+                                      bvh_layout=bvh_layout, bvh_builder=bvh_builder, picking=picking,
+                                      aovs=denoiser is not None)
         
         # Llamar al constructor de la clase base
         super().__init__(self.ctx, self.camera)
@@ -115,13 +461,97 @@ class RaySceneGPU(Scene):
         # Crear arrays para matrices de transformación (n x 16 valores cada una)
         self.models_f = np.zeros((n, 16), dtype='f4')
         self.inv_f = np.zeros((n, 16), dtype='f4')
-        self.mats_f = np.zeros((n, 4), dtype='f4')
+        self.__update_materials()
         
-        self.__update_matrix()
-        self.__matrix_to_ssbo()
+        if self.cache_path is not None:
+            self.__load_or_build_cache()
+        else:
+            self.__update_matrix()
+            self.__matrix_to_ssbo()
+
+        if self.tuning_path is not None:
+            from workgroup_tuning import WorkgroupTuner
+            WorkgroupTuner(self.tuning_path).apply(self.raytracer)
+
+        if self.pipelined:
+            from frame_pipeline import FramePipeline
+            self.pipeline = FramePipeline(self.__snapshot_frame, self.__prepare_frame, n)
+            self.pipeline.start()
+
+    def needs_redraw(self):
+        # Un frame a resolución reducida todavía tiene que reemplazarse por uno completo
+        return super().needs_redraw() or self.__reduced_frame()
+
+    def __reduced_frame(self):
+        return (self.raytracer is not None
+                and tuple(self.raytracer.render_size) != (self.raytracer.width, self.raytracer.height))
+
+    def pick_index(self, u, v):
+        # Un píxel del target que escribe el compute shader (o el respaldo en CPU)
+        if self.raytracer.picking is not None:
+            return self.raytracer.pick(u, v)
+        return self.closest_object(u, v)
+
+    def stop(self):
+        """Termina el hilo de trabajo del pipeline (si lo hay)."""
+        if self.pipeline is not None:
+            self.pipeline.stop()
+            self.pipeline = None
     
+    def __load_or_build_cache(self):
+        # Reutilizar transformaciones, primitivas y BVH del caché si la escena no cambió
+        from scene_cache import (SceneCache, content_hash, describe_objects, pack_primitives,
+                                 scene_source_hash, unpack_primitives)
+        cache = SceneCache(self.cache_path)
+        object_materials = self.material_table.object_materials()
+        description = describe_objects(self.objects, object_materials)
+        # Transformaciones, materiales, clase y malla de cada objeto
+        source = scene_source_hash(description, self.objects)
+
+        models = cache.get("transforms", source)
+        inverse = cache.get("inverse", source)
+        packed_prims = cache.get("primitives", source)
+        cache_hit = models is not None and inverse is not None and packed_prims is not None
+
+        if cache_hit:
+            self.models_f[:] = models
+            self.inv_f[:] = inverse
+            self.primitives = unpack_primitives(packed_prims)
+        else:
+            self.__update_matrix()
+            models, inverse = self.models_f, self.inv_f
+            packed_prims = pack_primitives(self.primitives)
+
+        # El BVH se reutiliza si la geometría (AABBs) es la misma con la que se construyó
+        bvh = cache.get_bvh(packed_prims)
+        if bvh is None:
+            cache_hit = False
+            bvh = self.raytracer.build_bvh(self.primitives)
+
+        # Las secciones mapeadas se suben directamente, sin reconstruirlas
+        self.raytracer.scene_to_ssbo(models, inverse, self.material_table.indices,
+                                     self.raytracer.prepare_bvh(bvh))
+
+        if cache_hit:
+            return
+
+        cache.store({
+            "description": description,
+            "transforms": (models, source),
+            "inverse": (inverse, source),
+            "materials": (object_materials, source),
+            "primitives": (packed_prims, source),
+            "bvh": (bvh, content_hash(packed_prims)),
+        })
+    
+    def __update_materials(self):
+        # La tabla solo se vuelve a subir si cambió algún color, reflectividad o textura
+        materials = [self.graphics[obj.name].material for obj in self.objects]
+        self.material_table.update(materials)
+        self.raytracer.material_table_to_ssbo(self.material_table)
+
     def __update_matrix(self):
-        # Actualizar matrices y materiales de cada objeto
+        # Actualizar matrices de cada objeto
         self.primitives = []
         
         for i, (name, graphics) in enumerate(self.graphics.items()):
@@ -131,17 +561,13 @@ class RaySceneGPU(Scene):
             graphics.create_transformation_matrix(self.models_f, i)
             # Crear matriz inversa de transformación
             graphics.create_inverse_transformation_matrix(self.inv_f, i)
-            # Crear matriz de material (color RGB + reflectividad)
-            graphics.create_material_matrix(self.mats_f, i)
     
     def __matrix_to_ssbo(self):
-        # Escribir matrices en SSBOs (Shader Storage Buffer Objects)
-        self.raytracer.matrix_to_ssbo(self.models_f, 0)
-        self.raytracer.matrix_to_ssbo(self.inv_f, 1)
-        self.raytracer.matrix_to_ssbo(self.mats_f, 2)
-        self.raytracer.primitives_to_ssbo(self.primitives, 3)
-    
-    def render(self):
+        # Escribir matrices y BVH en SSBOs (Shader Storage Buffer Objects)
+        bvh = self.raytracer.prepare_bvh(self.raytracer.build_bvh(self.primitives))
+        self.raytracer.scene_to_ssbo(self.models_f, self.inv_f, self.material_table.indices, bvh)
+
+    def __animate(self):
         # Avanzar el tiempo y animar objetos
         self.time += 0.01
         
@@ -149,26 +575,123 @@ class RaySceneGPU(Scene):
             if obj.animated:
                 obj.rotation += glm.vec3(0.8, 0.6, 0.4)
                 obj.position.x += math.sin(self.time) * 0.01
-        
-        # Actualizar matrices y buffers en cada frame
+
+    def __snapshot_frame(self, staging):
+        # Hilo principal: animar y copiar matrices, AABBs y tiempo a las entradas del staging
+        self.__animate()
+        staging.time = self.time
+        primitives = []
+        for i, graphics in enumerate(self.graphics.values()):
+            graphics.create_primitive(primitives)
+            graphics.create_transformation_matrix(staging.models, i)
+        for row, primitive in zip(staging.bounds, primitives):
+            row[:3], row[3:] = primitive["aabb_min"], primitive["aabb_max"]
+
+    @staticmethod
+    def __inverse_matrices(models, inverse):
+        # Las filas guardan matrices por columnas: invertir la traspuesta da la inversa traspuesta
+        if len(models):
+            inverse[:] = np.linalg.inv(models.reshape(-1, 4, 4).astype('f8')).reshape(-1, 16)
+
+    def __prepare_frame(self, staging):
+        # Hilo de trabajo: inversas y BVH a partir de la copia del staging (no lee los objetos
+        # de la escena ni llama a OpenGL)
+        self.__inverse_matrices(staging.models, staging.inverse)
+        primitives = [{"aabb_min": row[:3], "aabb_max": row[3:]} for row in staging.bounds]
+        staging.primitives = primitives
+        staging.bvh = self.raytracer.prepare_bvh(self.raytracer.build_bvh(primitives))
+
+    def __staging_to_ssbo(self, staging):
+        # Subir un frame ya preparado: solo copias a los SSBOs persistentes
+        self.primitives = staging.primitives
+        self.raytracer.scene_to_ssbo(staging.models, staging.inverse, self.material_table.indices,
+                                     staging.bvh)
+    
+    def render(self):
+        # Sin objetos animados ni cambios de cámara, transformaciones o materiales desde el
+        # último frame no se prepara ni se traza nada: se vuelve a presentar la última imagen
+        animated = any(obj.animated for obj in self.objects)
+        signature = None if animated else self.frame_signature()
+        if signature is not None and not self.change_tracker.changed(signature):
+            if self.resolution is not None:
+                self.resolution.reset()
+                if self.__reduced_frame():
+                    # La escena quedó quieta: un último frame a resolución completa (los
+                    # SSBOs son los del frame anterior) para no dejar la imagen reducida
+                    self.raytracer.set_render_size(self.raytracer.width, self.raytracer.height)
+                    self.raytracer.run()
+                    if self.denoiser is not None:
+                        self.raytracer.apply_denoiser(self.denoiser)
+            self.__present()
+            return
+
+        # Materiales primero: los índices por objeto se suben junto con las matrices
         if self.raytracer is not None:
-            self.__update_matrix()
-            self.__matrix_to_ssbo()
-            
+            self.__update_materials()
+
+        # Actualizar matrices y buffers del frame
+        if self.pipeline is not None and animated:
+            # Intercambiar buffers: se sube el frame preparado y el hilo de trabajo
+            # empieza a preparar el siguiente en el otro juego de buffers
+            self.__staging_to_ssbo(self.pipeline.next_frame())
+        else:
+            # Escena estática con un cambio puntual: se prepara en el momento (el frame del
+            # pipeline podría ser anterior al cambio)
+            self.__animate()
+            if self.raytracer is not None:
+                self.__update_matrix()
+                self.__matrix_to_ssbo()
+
+        if self.pipeline is not None and not animated:
+            # El frame en preparación es de antes del cambio: se descarta
+            self.pipeline.discard()
+        if animated:
+            self.change_tracker.invalidate()
+        else:
+            self.change_tracker.commit(signature)
+
+        if self.raytracer is not None:
+            # Resolución interna del frame según el tiempo de los anteriores
+            if self.resolution is not None:
+                self.resolution.frame()
+                self.raytracer.set_render_size(
+                    *self.resolution.render_size(self.raytracer.width, self.raytracer.height))
+
             # ✅ EJECUTAR EL COMPUTE SHADER
             self.raytracer.run()
-            
+            if self.denoiser is not None:
+                self.raytracer.apply_denoiser(self.denoiser)
+        self.__present()
+
+    def render_views(self, cameras, width=None, height=None):
+        """
+        Renderiza otras cámaras de la escena tal como quedó en el último render() (comparten
+        sus SSBOs) en un solo dispatch; devuelve los ViewTargets con una capa por cámara.
+        """
+        return self.raytracer.render_views(cameras, width, height)
+
+    def __present(self):
+        if self.raytracer is not None:
             # ✅ RENDERIZAR EL QUAD DE SALIDA
             # Obtener el modelo del quad desde output_graphics
             output_model = self.output_graphics._Graphics__model
             model_matrix = output_model.get_model_matrix()
             mvp = self.projection * self.view * model_matrix
             
-            # Renderizar el quad con la textura del raytracer
-            self.output_graphics.render({'Mvp': mvp})
+            # Renderizar el quad con la textura del raytracer (escalada a la región renderizada)
+            self.output_graphics.render({'Mvp': mvp,
+                                         'u_uv_scale': uv_scale(self.raytracer.render_size,
+                                                                self.raytracer.texture_size)})
     
     def on_resize(self, width, height):
         # Actualizar viewport y aspecto de cámara
         super().on_resize(width, height)
         self.width, self.height = width, height
-        self.camera.aspect = width/height
\ No newline at end of file
+        self.camera.aspect = width/height
+        # La textura de salida solo se reasigna si la ventana supera el mayor tamaño visto
+        if self.raytracer is not None:
+            self.raytracer.resize(width, height)
+        # El tamaño de salida no forma parte de la firma del frame: volver a trazar
+        self.invalidate()
+        if self.resolution is not None:
+            self.resolution.reset()
\ No newline at end of file
@@ -0,0 +1,232 @@
+# scene_cache.py
+# Formato binario compacto para cachear una escena ya construida.
+# Estructura: cabecera + tabla de secciones + secciones alineadas (transformaciones,
+# materiales, primitivas y nodos BVH). Las secciones se cargan con np.memmap, sin
+# parseo, y pueden pasarse directo a ctx.buffer o al raytracer en CPU.
+# Cada sección guarda el hash de su contenido (se verifica al leerla: un archivo truncado
+# o corrupto cuenta como fallo de caché) y el hash de los datos de los que se derivó
+# (source): transformaciones, materiales, clase y malla de cada objeto (scene_source_hash).
+
+import hashlib
+import os
+import struct
+import numpy as np
+
+MAGIC = b'PCGSCENE'
+VERSION = 1
+ALIGNMENT = 64  # Alineación (bytes) del inicio de cada sección
+MAX_DIMS = 4
+
+# Cabecera: magic, versión, cantidad de secciones
+_HEADER = struct.Struct('<8sII')
+# Entrada de sección: nombre, dtype, ndim, shape, offset, nbytes, hash, hash de origen
+_SECTION = struct.Struct(f'<16s8sB7x{MAX_DIMS}QQQ16s16s')
+
+NO_SOURCE = bytes(16)
+
+
+def content_hash(array):
+    """Devuelve el hash (16 bytes) del contenido de un array."""
+    data = np.ascontiguousarray(array)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str(data.dtype).encode('ascii'))
+    digest.update(str(data.shape).encode('ascii'))
+    digest.update(data.tobytes())
+    return digest.digest()
+
+
+def _align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+class CacheSection:
+    """Sección cargada del archivo: array (memmap de solo lectura) y sus hashes."""
+    def __init__(self, name, array, hash, source):
+        self.name = name
+        self.array = array
+        self.hash = hash
+        self.source = source
+
+
+def write_scene_cache(path, sections):
+    """
+    Escribe las secciones en disco.
+    sections: diccionario nombre -> array o nombre -> (array, hash_de_origen).
+    El archivo se escribe en un temporal y se reemplaza de forma atómica.
+    """
+    entries = []
+    offset = _align(_HEADER.size + _SECTION.size * len(sections))
+
+    for name, value in sections.items():
+        array, source = value if isinstance(value, tuple) else (value, NO_SOURCE)
+        array = np.ascontiguousarray(array)
+        if array.ndim > MAX_DIMS:
+            raise ValueError(f"La sección {name} tiene más de {MAX_DIMS} dimensiones")
+
+        shape = list(array.shape) + [0] * (MAX_DIMS - array.ndim)
+        entries.append((name, array, source, offset, shape))
+        offset = _align(offset + array.nbytes)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as file:
+        file.write(_HEADER.pack(MAGIC, VERSION, len(entries)))
+        for name, array, source, section_offset, shape in entries:
+            file.write(_SECTION.pack(
+                name.encode('ascii'), array.dtype.str.encode('ascii'), array.ndim,
+                *shape, section_offset, array.nbytes, content_hash(array), source
+            ))
+        for name, array, source, section_offset, shape in entries:
+            file.seek(section_offset)
+            file.write(array.tobytes())
+        file.truncate(offset)
+    os.replace(tmp_path, path)
+
+
+def read_scene_cache(path):
+    """
+    Lee la tabla de secciones y mapea cada una con np.memmap (sin copiar datos).
+    Devuelve None si el archivo no existe o no es un caché válido de esta versión.
+    """
+    if not os.path.exists(path):
+        return None
+
+    with open(path, 'rb') as file:
+        header = file.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            return None
+        magic, version, count = _HEADER.unpack(header)
+        if magic != MAGIC or version != VERSION:
+            return None
+        table = file.read(_SECTION.size * count)
+        if len(table) < _SECTION.size * count:
+            return None
+
+    file_size = os.path.getsize(path)
+    sections = {}
+    for i in range(count):
+        fields = _SECTION.unpack_from(table, i * _SECTION.size)
+        name = fields[0].rstrip(b'\0').decode('ascii')
+        dtype = np.dtype(fields[1].rstrip(b'\0').decode('ascii'))
+        ndim = fields[2]
+        shape = tuple(fields[3:3 + ndim])
+        offset, nbytes, hash, source = fields[3 + MAX_DIMS:]
+
+        if offset + nbytes > file_size:
+            return None
+        if nbytes == 0:
+            array = np.zeros(shape, dtype=dtype)
+        else:
+            array = np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=shape)
+        sections[name] = CacheSection(name, array, hash, source)
+
+    return sections
+
+
+# ------------------------------------------------------
+# Empaquetado de datos de escena
+# ------------------------------------------------------
+def pack_primitives(primitives):
+    """Convierte la lista de primitivas (aabb_min, aabb_max) en un array (n, 6) float32."""
+    packed = np.zeros((len(primitives), 6), dtype='f4')
+    for i, prim in enumerate(primitives):
+        packed[i, :3] = tuple(prim['aabb_min'])
+        packed[i, 3:] = tuple(prim['aabb_max'])
+    return packed
+
+
+def unpack_primitives(packed):
+    """Reconstruye la lista de primitivas a partir del array (n, 6)."""
+    return [{"aabb_min": tuple(row[:3]), "aabb_max": tuple(row[3:])} for row in packed]
+
+
+def describe_objects(objects, materials_matrix):
+    """
+    Descripción compacta de la escena: posición, rotación, escala y material de
+    cada objeto. Su hash identifica si las transformaciones cacheadas siguen valiendo.
+    """
+    description = np.zeros((len(objects), 13), dtype='f4')
+    for i, obj in enumerate(objects):
+        description[i, 0:3] = tuple(obj.position)
+        description[i, 3:6] = tuple(obj.rotation)
+        description[i, 6:9] = tuple(obj.scale)
+    description[:, 9:13] = materials_matrix
+    return description
+
+
+def scene_source_hash(description, objects):
+    """
+    Hash de origen de los datos cacheados de la escena: la descripción (transformaciones y
+    materiales), la clase de cada objeto y sus mallas empaquetadas (ver pack_meshes).
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(content_hash(description))
+    for obj in objects:
+        digest.update(type(obj).__qualname__.encode('utf-8') + b'\0')
+    for array in pack_meshes(objects):
+        digest.update(content_hash(array))
+    return digest.digest()
+
+
+def pack_meshes(objects):
+    """
+    Concatena las posiciones e índices de todos los modelos.
+    Devuelve (vértices (V, 3) f4, índices (I,) i4, rangos (n, 4) i4) donde cada rango
+    es (inicio de vértices, cantidad de vértices, inicio de índices, cantidad de índices).
+    """
+    vertices, indices = [], []
+    ranges = np.zeros((len(objects), 4), dtype='i4')
+    vertex_start = index_start = 0
+
+    for i, obj in enumerate(objects):
+        positions = next((attribute.array for attribute in obj.vertex_layout.get_attributes()
+                          if attribute.name == "in_pos"), np.zeros(0, dtype='f4'))
+        positions = np.asarray(positions, dtype='f4').reshape(-1, 3)
+        obj_indices = np.asarray(obj.indices, dtype='i4').reshape(-1)
+
+        vertices.append(positions)
+        indices.append(obj_indices)
+        ranges[i] = (vertex_start, len(positions), index_start, len(obj_indices))
+        vertex_start += len(positions)
+        index_start += len(obj_indices)
+
+    vertices = np.concatenate(vertices) if vertices else np.zeros((0, 3), dtype='f4')
+    indices = np.concatenate(indices) if indices else np.zeros(0, dtype='i4')
+    return vertices, indices, ranges
+
+
+class SceneCache:
+    """
+    Caché de escena respaldado por un archivo binario.
+    Las secciones se mapean en memoria al abrir; store() reescribe el archivo.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.sections = read_scene_cache(path) or {}
+
+    def get(self, name, source=None):
+        """
+        Devuelve el array de una sección, o None si no existe o su contenido no coincide
+        con el hash guardado. Si se indica source, la sección solo es válida si se derivó
+        de esos datos.
+        """
+        section = self.sections.get(name)
+        if section is None:
+            return None
+        if source is not None and section.source != source:
+            return None
+        if content_hash(section.array) != section.hash:
+            return None
+        return section.array
+
+    def get_bvh(self, packed_primitives):
+        """Devuelve los nodos BVH cacheados si se construyeron con las mismas primitivas."""
+        return self.get("bvh", source=content_hash(packed_primitives))
+
+    def store(self, sections):
+        """Escribe las secciones en disco y las vuelve a mapear."""
+        # Copiar a memoria lo que venga del archivo actual antes de reemplazarlo
+        sections = {name: (np.array(value[0]), value[1]) if isinstance(value, tuple) else np.array(value)
+                    for name, value in sections.items()}
+        self.sections = {}
+        write_scene_cache(self.path, sections)
+        self.sections = read_scene_cache(self.path) or {}
@@ -1,77 +1,266 @@
 # shader_program.py
 # Esta clase encapsula programas de shaders (vertex/fragment o compute).
 # Permite administrar atributos y uniforms, y ejecutar compute shaders en GPU.
+# Los programas compilados se guardan en un ProgramCache (indexado por el contexto, el hash
+# del código y el tipo de shader), que además permite recarga en caliente de los archivos
+# modificados; el programa reemplazado por una recarga se libera si nadie más lo usa.
 
-from moderngl import Attribute, Uniform
-import glm
+import hashlib
+import os
+import weakref
 
 
-class ShaderProgram:
-    def __init__(self, ctx, vertex_shader_path, fragment_shader_path):
-        # Leer y compilar los shaders desde archivos con UTF-8
-        with open(vertex_shader_path, encoding='utf-8') as file:
-            vertex_shader = file.read()
-        with open(fragment_shader_path, encoding='utf-8') as file:
-            fragment_shader = file.read()
-        
-        # Crear el programa de shaders
-        self.prog = ctx.program(vertex_shader=vertex_shader, fragment_shader=fragment_shader)
-        
-        # Detectar automáticamente atributos y uniforms
-        attributes = []
-        uniforms = []
-        for name in self.prog:
-            member = self.prog[name]
+def read_source(path):
+    # Leer el código de un shader desde archivo con UTF-8
+    with open(path, encoding='utf-8') as file:
+        return file.read()
+
+
+def inject_defines(source, defines):
+    """Inserta un #define por cada entrada de defines justo después de la línea #version."""
+    if not defines:
+        return source
+    lines = [f"#define {name} {value}" for name, value in sorted(defines.items())]
+    head, newline, body = source.partition("\n")
+    if not head.lstrip().startswith("#version"):
+        return "\n".join(lines) + "\n" + source
+    return head + newline + "\n".join(lines) + "\n" + body
+
+
+class UniformInfo:
+    """Datos precalculados de un uniform: ubicación, tipo y forma de escribirlo."""
+    def __init__(self, uniform):
+        self.uniform = uniform
+        self.location = uniform.location
+        self.gl_type = uniform.gl_type
+        self.dimension = uniform.dimension
+        self.array_length = uniform.array_length
+        self.is_matrix = bool(uniform.matrix)
+
+    def set(self, value):
+        if self.is_matrix and hasattr(value, "to_bytes"):
+            # Matrices glm deben enviarse en formato de bytes
+            self.uniform.write(value.to_bytes())
+        else:
+            # Otros tipos (escalares, tuplas, ints, floats)
+            self.uniform.value = value
+
+
+class CompiledProgram:
+    """Programa compilado junto con sus tablas de atributos y uniforms."""
+    def __init__(self, prog):
+        # moderngl ya está cargado si hay un programa; importarlo acá no lo agrega al
+        # import de los módulos que solo usan las clases de este archivo
+        from moderngl import Attribute, Uniform, UniformBlock
+        self.prog = prog
+        # ShaderProgram/ComputeShaderProgram que lo usan (ver ProgramCache.release())
+        self.users = weakref.WeakSet()
+        self.attributes = []
+        self.uniforms = {}
+        self.uniform_blocks = {}
+        for name in prog:
+            member = prog[name]
             if type(member) is Attribute:
-                attributes.append(name)
+                self.attributes.append(name)
             if type(member) is Uniform:
-                uniforms.append(name)
-        
-        self.attributes = list(attributes)
-        self.uniforms = uniforms
+                self.uniforms[name] = UniformInfo(member)
+            if type(member) is UniformBlock:
+                self.uniform_blocks[name] = member
+
+
+class ProgramCache:
+    """
+    Caché de programas compilados por (contexto, tipo de shader, hash del código).
+    Programas idénticos se compilan una sola vez. Con poll() se detectan archivos
+    modificados y se recompilan solo los programas que los usan.
+    """
+    def __init__(self):
+        # contexto -> {(tipo, hash): CompiledProgram}; la referencia al contexto es débil,
+        # así que sus programas no sobreviven al contexto ni se confunden con los de otro
+        self.__programs = weakref.WeakKeyDictionary()
+        # path -> (mtime, programas que usan ese archivo)
+        self.__watched = {}
+
+    @staticmethod
+    def source_hash(sources):
+        digest = hashlib.blake2b(digest_size=16)
+        for stage in sorted(sources):
+            digest.update(stage.encode('ascii'))
+            digest.update(sources[stage].encode('utf-8'))
+        return digest.hexdigest()
+
+    def get(self, ctx, kind, sources, user=None):
+        """
+        Devuelve el CompiledProgram para esos sources, compilándolo si no está en caché.
+        user: programa que lo va a usar (para liberarlo con release() cuando nadie lo use).
+        """
+        programs = self.__programs.setdefault(ctx, {})
+        key = (kind, self.source_hash(sources))
+        compiled = programs.get(key)
+        if compiled is None:
+            if kind == "compute":
+                prog = ctx.compute_shader(sources["compute_shader"])
+            else:
+                prog = ctx.program(**sources)
+            compiled = CompiledProgram(prog)
+            programs[key] = compiled
+        if user is not None:
+            compiled.users.add(user)
+        return compiled
+
+    def release(self, ctx, compiled, user):
+        """
+        user deja de usar compiled (por ejemplo, porque una recarga lo reemplazó); si no
+        queda nadie usándolo, se saca del caché y se libera el programa de la GPU.
+        """
+        compiled.users.discard(user)
+        if len(compiled.users) > 0:
+            return
+        programs = self.__programs.get(ctx, {})
+        for key, cached in list(programs.items()):
+            if cached is compiled:
+                del programs[key]
+                compiled.prog.release()
+
+    def watch(self, program, paths):
+        """Registra un programa para recargarlo cuando cambie alguno de sus archivos."""
+        for path in paths:
+            if path not in self.__watched:
+                self.__watched[path] = (os.path.getmtime(path), weakref.WeakSet())
+            self.__watched[path][1].add(program)
+
+    def poll(self):
+        """
+        Recompila los programas cuyos archivos cambiaron. Devuelve (recargados, fallidos),
+        con fallidos = {programa: error} para los que no compilaron o no se pudieron leer;
+        esos siguen usando el programa anterior.
+        """
+        import moderngl
+        changed = set()
+        for path, (mtime, programs) in list(self.__watched.items()):
+            try:
+                current = os.path.getmtime(path)
+            except OSError:
+                continue
+            if current != mtime:
+                self.__watched[path] = (current, programs)
+                changed.update(programs)
+
+        reloaded = []
+        failed = {}
+        for program in changed:
+            try:
+                program.reload()
+                reloaded.append(program)
+            except (moderngl.Error, OSError) as error:
+                # Error de compilación o archivo a medio guardar: se mantiene el anterior
+                failed[program] = error
+        return reloaded, failed
+
+    def clear(self):
+        for programs in self.__programs.values():
+            for compiled in programs.values():
+                compiled.prog.release()
+        self.__programs.clear()
+
+
+# Caché compartido por defecto
+program_cache = ProgramCache()
+
+
+class ShaderProgram:
+    def __init__(self, ctx, vertex_shader_path, fragment_shader_path, cache=None):
+        self.__ctx = ctx
+        self.__paths = {"vertex_shader": vertex_shader_path, "fragment_shader": fragment_shader_path}
+        self.__cache = cache if cache is not None else program_cache
+        # Se incrementa en cada recarga para que Graphics regenere su VAO
+        self.version = 0
+        # Puntos de vinculación de los uniform blocks (se reaplican al recargar)
+        self.__block_bindings = {}
+        self.__compiled = None
+
+        self.__load()
+        self.__cache.watch(self, self.__paths.values())
+
+    def __load(self):
+        # Leer los shaders y obtener el programa compilado (o el ya cacheado)
+        sources = {stage: read_source(path) for stage, path in self.__paths.items()}
+        compiled = self.__cache.get(self.__ctx, "render", sources, self)
+        # El programa anterior (recarga) se libera si ningún otro lo usa
+        if self.__compiled is not None and self.__compiled is not compiled:
+            self.__cache.release(self.__ctx, self.__compiled, self)
+        self.__compiled = compiled
+
+        self.prog = compiled.prog
+        self.attributes = compiled.attributes
+        self.uniforms = compiled.uniforms
+        self.uniform_blocks = compiled.uniform_blocks
+        for name, binding in self.__block_bindings.items():
+            self.bind_uniform_block(name, binding)
+        self.version += 1
+
+    def reload(self):
+        """Vuelve a leer y compilar los shaders (usado por la recarga en caliente)."""
+        self.__load()
+
+    def bind_uniform_block(self, name, binding):
+        # Asociar un uniform block del shader a un punto de vinculación de UBO
+        self.__block_bindings[name] = binding
+        if name in self.uniform_blocks:
+            self.uniform_blocks[name].binding = binding
 
     def set_uniform(self, name, value):
         # Modificar un uniform si existe en el shader
-        if name in self.uniforms:
-            uniform = self.prog[name]
-            if isinstance(value, glm.mat4):
-                # Matrices deben enviarse en formato de bytes
-                uniform.write(value.to_bytes())
-            elif hasattr(uniform, "value"):
-                # Otros tipos (escalars, tuples, ints, floats)
-                uniform.value = value
+        info = self.uniforms.get(name)
+        if info is not None:
+            info.set(value)
 
 
 class ComputeShaderProgram:
-    def __init__(self, ctx, compute_shader_path):
-        # Leer el compute shader desde archivo con UTF-8
-        with open(compute_shader_path, encoding='utf-8') as file:
-            compute_source = file.read()
-        
-        # Crear el programa de compute shader
-        self.prog = ctx.compute_shader(compute_source)
-        
-        # Detectar uniforms disponibles
-        uniforms = []
-        for name in self.prog:
-            member = self.prog[name]
-            if type(member) is Uniform:
-                uniforms.append(name)
-        
-        self.uniforms = uniforms
+    """
+    defines: constantes de compilación (por ejemplo LOCAL_SIZE_X) que se inyectan en el
+    código. Cada combinación es una variante distinta del programa en el ProgramCache.
+    """
+    def __init__(self, ctx, compute_shader_path, cache=None, defines=None):
+        self.__ctx = ctx
+        self.__path = compute_shader_path
+        self.__cache = cache if cache is not None else program_cache
+        self.defines = dict(defines or {})
+        self.version = 0
+        self.__compiled = None
+
+        self.__load()
+        self.__cache.watch(self, [self.__path])
+
+    def __load(self):
+        # Leer el compute shader y obtener el programa compilado (o el ya cacheado)
+        sources = {"compute_shader": inject_defines(read_source(self.__path), self.defines)}
+        compiled = self.__cache.get(self.__ctx, "compute", sources, self)
+        if self.__compiled is not None and self.__compiled is not compiled:
+            self.__cache.release(self.__ctx, self.__compiled, self)
+        self.__compiled = compiled
+
+        self.prog = compiled.prog
+        self.uniforms = compiled.uniforms
+        self.version += 1
+
+    def reload(self):
+        """Vuelve a leer y compilar el compute shader."""
+        self.__load()
 
     def set_uniform(self, name, value):
         # Modificar un uniform si existe
-        if name in self.uniforms:
-            uniform = self.prog[name]
-            if isinstance(value, glm.mat4):
-                uniform.write(value.to_bytes())
-            elif hasattr(uniform, "value"):
-                uniform.value = value
+        info = self.uniforms.get(name)
+        if info is not None:
+            info.set(value)
 
     def run(self, groups_x=1, groups_y=1, groups_z=1):
         """
         Ejecuta el compute shader en la GPU.
         Los grupos determinan cuántas invocaciones paralelas se lanzan.
         """
-        self.prog.run(group_x=groups_x, group_y=groups_y, group_z=groups_z)
\ No newline at end of file
+        self.prog.run(group_x=groups_x, group_y=groups_y, group_z=groups_z)
+
+    def run_indirect(self, buffer, offset=0):
+        """Ejecuta el compute shader con la cantidad de grupos leída de un buffer de la GPU."""
+        self.prog.run_indirect(buffer, offset)
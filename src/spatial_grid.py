@@ -0,0 +1,242 @@
+# spatial_grid.py
+# Grilla uniforme (con celdas dispersas tipo spatial hash) como estructura de aceleración
+# alternativa al BVH para escenas muy animadas.
+# Se construye con NumPy a partir de los AABBs y se actualiza en O(objetos movidos):
+# solo los objetos que cambiaron de celdas se sacan y se vuelven a insertar.
+# El recorrido en CPU usa un 3D-DDA (Amanatides & Woo) y pack() genera un layout
+# compacto (offsets por celda + índices de objetos) que un compute shader podría leer.
+
+import numpy as np
+from bvh import intersect_aabb, inverse_direction
+
+MAX_CELLS_PER_AXIS = 128
+
+
+class UniformGrid:
+    """
+    bounds: array (n, 6) con (min_x, min_y, min_z, max_x, max_y, max_z) por objeto.
+    cell_size: tamaño de celda; si es None se elige para tener ~density celdas por objeto.
+    margin: espacio extra alrededor de la escena para que los objetos puedan moverse sin
+    reconstruir la grilla; si es None se usa el 5% de la extensión de la escena.
+    """
+    def __init__(self, bounds, cell_size=None, density=2.0, margin=None):
+        self.requested_cell_size = cell_size
+        self.density = density
+        self.margin = margin
+        self.build(bounds)
+
+    # ------------------------------------------------------
+    # Construcción
+    # ------------------------------------------------------
+    def build(self, bounds):
+        """Construye la grilla completa (vectorizado) a partir de los AABBs."""
+        self.bounds = np.array(bounds, dtype='f8').reshape(-1, 6)
+        count = len(self.bounds)
+
+        if count == 0:
+            self.grid_min = np.zeros(3)
+            self.grid_max = np.ones(3)
+        else:
+            self.grid_min = self.bounds[:, :3].min(axis=0)
+            self.grid_max = self.bounds[:, 3:].max(axis=0)
+            margin = self.margin
+            if margin is None:
+                margin = 0.05 * float(np.max(self.grid_max - self.grid_min))
+            self.grid_min = self.grid_min - margin
+            self.grid_max = self.grid_max + margin
+        extent = np.maximum(self.grid_max - self.grid_min, 1e-6)
+
+        if self.requested_cell_size is not None:
+            cell_size = float(self.requested_cell_size)
+        else:
+            # Volumen por celda para tener ~density celdas por objeto, sin que la celda
+            # sea más chica que el tamaño medio de los objetos
+            cell_size = (np.prod(extent) / max(count * self.density, 1.0)) ** (1.0 / 3.0)
+            if count > 0:
+                cell_size = max(cell_size, float(np.mean(self.bounds[:, 3:] - self.bounds[:, :3])))
+
+        self.dims = np.clip(np.ceil(extent / max(cell_size, 1e-6)), 1, MAX_CELLS_PER_AXIS).astype(np.int64)
+        self.cell_size = extent / self.dims
+        self.inv_cell_size = 1.0 / self.cell_size
+
+        self.lo, self.hi = self.__cell_ranges(self.bounds)
+        cell_ids, object_ids = self.__expand(self.lo, self.hi)
+
+        # Agrupar objetos por celda: celdas ocupadas -> conjunto de objetos
+        order = np.argsort(cell_ids, kind='stable')
+        cell_ids, object_ids = cell_ids[order], object_ids[order]
+        occupied, starts = np.unique(cell_ids, return_index=True)
+        groups = np.split(object_ids, starts[1:]) if len(occupied) else []
+        self.cells = {int(cell): set(group.tolist()) for cell, group in zip(occupied, groups)}
+
+    def __cell_ranges(self, bounds):
+        # Rango de celdas (inclusive) que cubre cada AABB
+        lo = np.floor((bounds[:, :3] - self.grid_min) * self.inv_cell_size).astype(np.int64)
+        hi = np.floor((bounds[:, 3:] - self.grid_min) * self.inv_cell_size).astype(np.int64)
+        return np.clip(lo, 0, self.dims - 1), np.clip(hi, 0, self.dims - 1)
+
+    def __expand(self, lo, hi):
+        # Enumera (celda, objeto) para todas las celdas que toca cada objeto, sin bucles
+        sizes = hi - lo + 1
+        counts = np.prod(sizes, axis=1)
+        objects = np.repeat(np.arange(len(lo)), counts)
+        local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+
+        sx, sy = sizes[objects, 0], sizes[objects, 1]
+        x = lo[objects, 0] + local % sx
+        y = lo[objects, 1] + (local // sx) % sy
+        z = lo[objects, 2] + local // (sx * sy)
+        return self.cell_id(x, y, z), objects
+
+    def cell_id(self, x, y, z):
+        return x + self.dims[0] * (y + self.dims[1] * z)
+
+    # ------------------------------------------------------
+    # Actualización dinámica
+    # ------------------------------------------------------
+    def update(self, indices, bounds):
+        """
+        Actualiza los objetos indicados con sus nuevos AABBs (bounds (k, 6)).
+        Solo se tocan las celdas de los objetos que cambiaron de rango; si alguno sale
+        de los límites de la grilla, se reconstruye completa.
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        bounds = np.asarray(bounds, dtype='f8').reshape(-1, 6)
+        if len(indices) == 0:
+            return
+
+        outside = np.any(bounds[:, :3] < self.grid_min) or np.any(bounds[:, 3:] > self.grid_max)
+        self.bounds[indices] = bounds
+        if outside:
+            self.build(self.bounds)
+            return
+
+        new_lo, new_hi = self.__cell_ranges(bounds)
+        changed = np.any((new_lo != self.lo[indices]) | (new_hi != self.hi[indices]), axis=1)
+        for index, lo, hi in zip(indices[changed], new_lo[changed], new_hi[changed]):
+            self.__move(int(index), lo, hi)
+
+    def update_all(self, bounds):
+        """Compara con los AABBs actuales y actualiza solo los objetos que se movieron."""
+        bounds = np.asarray(bounds, dtype='f8').reshape(-1, 6)
+        if len(bounds) != len(self.bounds):
+            self.build(bounds)
+            return
+        moved = np.nonzero(np.any(bounds != self.bounds, axis=1))[0]
+        self.update(moved, bounds[moved])
+
+    def __move(self, index, lo, hi):
+        old_ids, _ = self.__expand(self.lo[index:index + 1], self.hi[index:index + 1])
+        for cell in old_ids.tolist():
+            members = self.cells.get(cell)
+            if members is not None:
+                members.discard(index)
+                if not members:
+                    del self.cells[cell]
+
+        new_ids, _ = self.__expand(lo[None, :], hi[None, :])
+        for cell in new_ids.tolist():
+            self.cells.setdefault(cell, set()).add(index)
+
+        self.lo[index], self.hi[index] = lo, hi
+
+    # ------------------------------------------------------
+    # Recorrido (3D-DDA)
+    # ------------------------------------------------------
+    def walk(self, origin, direction):
+        """
+        Recorre las celdas que atraviesa el rayo en orden.
+        Genera (celda, t_entrada, t_salida); direction debe estar normalizada.
+        """
+        origin = [float(origin[0]), float(origin[1]), float(origin[2])]
+        direction = [float(direction[0]), float(direction[1]), float(direction[2])]
+        inv_direction = inverse_direction(direction)
+
+        span = intersect_aabb(origin, inv_direction, self.grid_min.tolist(), self.grid_max.tolist())
+        if span is None:
+            return
+        t, t_end = span
+
+        dims = self.dims.tolist()
+        cell_size = self.cell_size.tolist()
+        grid_min = self.grid_min.tolist()
+
+        cell, step, t_max, t_delta = [0, 0, 0], [0, 0, 0], [0.0] * 3, [0.0] * 3
+        for axis in range(3):
+            position = origin[axis] + direction[axis] * t
+            cell[axis] = min(max(int((position - grid_min[axis]) / cell_size[axis]), 0), dims[axis] - 1)
+            if direction[axis] > 0:
+                step[axis] = 1
+                boundary = grid_min[axis] + (cell[axis] + 1) * cell_size[axis]
+                t_max[axis] = t + (boundary - position) * inv_direction[axis]
+                t_delta[axis] = cell_size[axis] * inv_direction[axis]
+            elif direction[axis] < 0:
+                step[axis] = -1
+                boundary = grid_min[axis] + cell[axis] * cell_size[axis]
+                t_max[axis] = t + (boundary - position) * inv_direction[axis]
+                t_delta[axis] = -cell_size[axis] * inv_direction[axis]
+            else:
+                t_max[axis] = t_delta[axis] = float('inf')
+
+        while t <= t_end:
+            axis = min(range(3), key=t_max.__getitem__)
+            t_exit = min(t_max[axis], t_end)
+            yield cell[0] + dims[0] * (cell[1] + dims[1] * cell[2]), t, t_exit
+
+            cell[axis] += step[axis]
+            if cell[axis] < 0 or cell[axis] >= dims[axis]:
+                return
+            t = t_max[axis]
+            t_max[axis] += t_delta[axis]
+
+    def closest_hit(self, origin, direction, hit_fn):
+        """
+        Hit más cercano: (distancia, objeto) o None. hit_fn(objeto) devuelve la distancia
+        del rayo al objeto o None. Se corta en cuanto el hit cae dentro de la celda actual.
+        """
+        tested = set()
+        closest = None
+        closest_distance = float('inf')
+
+        for cell, t_enter, t_exit in self.walk(origin, direction):
+            for index in self.cells.get(cell, ()):
+                if index in tested:
+                    continue
+                tested.add(index)
+                distance = hit_fn(index)
+                if distance is not None and distance < closest_distance:
+                    closest_distance = distance
+                    closest = index
+            if closest_distance <= t_exit:
+                break
+
+        return None if closest is None else (closest_distance, closest)
+
+    # ------------------------------------------------------
+    # Layout para GPU
+    # ------------------------------------------------------
+    def pack(self):
+        """
+        Devuelve (header, cell_offsets, object_indices):
+            header: f4 [grid_min.xyz, 0, cell_size.xyz, 0, dims.xyz, 0]
+            cell_offsets: i4 (celdas + 1); los objetos de la celda c son
+                          object_indices[cell_offsets[c]:cell_offsets[c + 1]]
+        """
+        total_cells = int(np.prod(self.dims))
+        header = np.zeros(12, dtype='f4')
+        header[0:3] = self.grid_min
+        header[4:7] = self.cell_size
+        header[8:11] = self.dims
+
+        counts = np.zeros(total_cells, dtype=np.int64)
+        cells = np.fromiter(self.cells.keys(), dtype=np.int64, count=len(self.cells))
+        counts[cells] = [len(self.cells[cell]) for cell in cells.tolist()]
+        offsets = np.zeros(total_cells + 1, dtype='i4')
+        np.cumsum(counts, out=offsets[1:])
+
+        object_indices = np.zeros(int(offsets[-1]), dtype='i4')
+        for cell in cells.tolist():
+            start = offsets[cell]
+            object_indices[start:start + len(self.cells[cell])] = sorted(self.cells[cell])
+
+        return header, offsets, object_indices
@@ -0,0 +1,41 @@
+# test_bvh.py
+# reorder_bvh conserva el árbol: los pares de hermanos quedan contiguos empezando en un
+# índice par, las primitivas se renumeran con una permutación y el hit más cercano (con
+# closest_hit y prim_order) es el mismo que por fuerza bruta.
+
+import numpy as np
+import pytest
+from bvh import BVH, closest_hit, reorder_bvh, stack_depth
+
+
+def test_bvh_closest_hit_matches_brute_force(box_scene):
+    bvh = BVH(box_scene.prims)
+    for origin, direction in box_scene.rays:
+        box_scene.assert_matches(origin, direction,
+                                 bvh.closest_hit(origin, direction, box_scene.hit_fn(origin, direction)))
+
+
+@pytest.mark.parametrize("layout", ["dfs", "veb"])
+def test_reordered_bvh_keeps_siblings_paired(box_scene, layout):
+    nodes = BVH(box_scene.prims).to_array()
+    reordered, order = reorder_bvh(nodes, layout)
+
+    assert sorted(order.tolist()) == list(range(len(box_scene.prims)))
+    right_or_prim = reordered[:, 7].astype(np.int64)
+    # Nodos interiores reales (los de relleno tienen left = -1 y nunca se visitan)
+    interior = np.nonzero((right_or_prim < 0) & (reordered[:, 3] >= 0))[0]
+    left = reordered[interior, 3].astype(np.int64)
+    right = -right_or_prim[interior] - 2
+    assert len(interior) == np.count_nonzero(nodes[:, 7] < 0)
+    assert np.all(right == left + 1)
+    assert np.all(left % 2 == 0)
+    assert stack_depth(reordered) == stack_depth(nodes)
+
+
+@pytest.mark.parametrize("layout", ["dfs", "veb"])
+def test_reordered_closest_hit_matches_brute_force(box_scene, layout):
+    reordered, order = reorder_bvh(BVH(box_scene.prims).to_array(), layout)
+    rows = reordered.tolist()
+    for origin, direction in box_scene.rays:
+        result = closest_hit(rows, origin, direction, box_scene.hit_fn(origin, direction, order))
+        box_scene.assert_matches(origin, direction, result, order)
@@ -0,0 +1,21 @@
+# test_bvh_compact.py
+# El BVH cuantizado es conservador: con 8 o 16 bits, binario o colapsado a 4 hijos, y con
+# o sin reordenar los nodos, encuentra el mismo hit más cercano que la fuerza bruta.
+
+import pytest
+from bvh import BVH, reorder_bvh
+from bvh_compact import CompactBVH
+
+
+@pytest.mark.parametrize("bits", [8, 16])
+@pytest.mark.parametrize("width", [2, 4])
+@pytest.mark.parametrize("layout", [None, "dfs"])
+def test_compact_closest_hit_matches_brute_force(box_scene, bits, width, layout):
+    nodes = BVH(box_scene.prims).to_array()
+    order = None
+    if layout is not None:
+        nodes, order = reorder_bvh(nodes, layout)
+    compact = CompactBVH(nodes, bits=bits, width=width)
+    for origin, direction in box_scene.rays:
+        result = compact.closest_hit(origin, direction, box_scene.hit_fn(origin, direction, order))
+        box_scene.assert_matches(origin, direction, result, order)
@@ -0,0 +1,40 @@
+# test_camera.py
+# La tabla del degradado de cielo aproxima la fórmula con pow dentro de la cota documentada
+# (milésimas de nivel; a lo sumo un nivel tras truncar a uint8), tanto en la consulta
+# vectorizada como en la escalar.
+
+import numpy as np
+from camera import Camera, SKY_LUT_ERROR
+
+TOP = np.array((16, 190, 222), dtype='f8')
+BOTTOM = np.array((181, 224, 247), dtype='f8')
+
+
+def sky_camera():
+    camera = Camera((0, 0, 15), (0, 0, 0), (0, 1, 0), 45, 4 / 3, 0.01, 100.0)
+    camera.set_sky_colors(top=tuple(TOP), bottom=tuple(BOTTOM))
+    return camera
+
+
+def exact_sky(heights):
+    point = (0.5 * (heights + 1.0)) ** 1.5
+    return (1.0 - point)[:, None] * BOTTOM + point[:, None] * TOP
+
+
+def test_sky_lut_is_within_the_documented_bound():
+    heights = np.linspace(-1.0, 1.0, 200001)
+    lut = sky_camera().sky_gradients(heights)
+    exact = exact_sky(heights)
+    assert np.abs(lut - exact).max() <= SKY_LUT_ERROR * np.abs(TOP - BOTTOM).max()
+    assert SKY_LUT_ERROR * 255 < 1 / 255
+    truncated = np.abs(lut.astype(np.uint8).astype(np.int64) - exact.astype(np.uint8))
+    assert truncated.max() <= 1
+
+
+def test_scalar_sky_matches_the_vectorized_lookup():
+    camera = sky_camera()
+    heights = np.random.default_rng(0).uniform(-1.0, 1.0, 500)
+    vectorized = camera.sky_gradients(heights)
+    scalar = np.array([tuple(camera.get_sky_gradient(height)) for height in heights])
+    # glm trabaja en float32
+    assert np.abs(scalar - vectorized).max() < 1e-3
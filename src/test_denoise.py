@@ -0,0 +1,44 @@
+# test_denoise.py
+# El denoiser en CPU tiene que cambiar (y mejorar) un frame ruidoso del RayTracer con las
+# AOVs que escribe el propio raytracer (albedo = color base del material).
+
+import numpy as np
+from camera import Camera
+from cube import Cube
+from denoise import Denoiser
+from raytracer import RayTracer
+
+WIDTH, HEIGHT = 48, 36
+
+
+def traced_frame():
+    camera = Camera((0, 0, 15), (0, 0, 0), (0, 1, 0), 45, WIDTH / HEIGHT, 0.01, 100.0)
+    objects = [Cube((2, 0, 5), (0, 0, 0), (1, 1, 1), name="Cube1", animated=False),
+               Cube((-2, 0, 5), (0, 0, 0), (1, 1, 1), name="Cube2", animated=False)]
+    raytracer = RayTracer(camera, WIDTH, HEIGHT, aovs=True)
+    raytracer.albedos = np.array([[0.2, 0.4, 0.9], [0.8, 0.1, 0.1]], dtype='f4')
+    raytracer.render_frame(objects)
+    return raytracer
+
+
+def test_albedo_aov_is_the_material_color():
+    raytracer = traced_frame()
+    aovs = raytracer.read_aovs()
+    hits = aovs.depth > 0
+    assert hits.any()
+    # Cada hit tiene el color base de uno de los dos materiales (no el rojo sombreado)
+    distances = np.abs(aovs.albedo[hits][:, None, :] - raytracer.albedos[None, :, :]).max(axis=-1)
+    assert np.all(distances.min(axis=1) < 1e-6)
+
+
+def test_denoiser_changes_and_improves_a_noisy_cpu_frame():
+    raytracer = traced_frame()
+    clean = raytracer.get_texture().data[:HEIGHT, :WIDTH].astype(np.int64)
+    rng = np.random.default_rng(0)
+    noisy = np.clip(clean + rng.normal(0, 20, clean.shape), 0, 255).astype(np.uint8)
+
+    denoised = Denoiser().denoise(noisy, raytracer.read_aovs())
+
+    changed = np.any(denoised != noisy, axis=-1)
+    assert changed.mean() > 0.5
+    assert np.abs(denoised.astype(np.int64) - clean).mean() < 0.5 * np.abs(noisy.astype(np.int64) - clean).mean()
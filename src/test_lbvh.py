@@ -0,0 +1,57 @@
+# test_lbvh.py
+# El LBVH es un árbol válido: cada primitiva está en exactamente una hoja, cada nodo se
+# visita una vez desde la raíz, los límites de cada hijo quedan dentro de los del padre
+# y el hit más cercano coincide con la fuerza bruta.
+
+import numpy as np
+import pytest
+from lbvh import LBVH, build_lbvh, primitives_to_bounds
+
+
+def walk(nodes):
+    """Índices de los nodos alcanzables desde la raíz y pares (padre, hijo)."""
+    visited, edges = [], []
+    stack = [0]
+    while stack:
+        node = stack.pop()
+        visited.append(node)
+        right_or_prim = int(nodes[node, 7])
+        if right_or_prim < 0:
+            for child in (int(nodes[node, 3]), -right_or_prim - 2):
+                edges.append((node, child))
+                stack.append(child)
+    return visited, edges
+
+
+def test_lbvh_covers_every_primitive_once_with_nested_bounds(box_scene):
+    bounds = primitives_to_bounds(box_scene.prims)
+    nodes = build_lbvh(bounds)
+    assert len(nodes) == 2 * len(bounds) - 1
+
+    visited, edges = walk(nodes)
+    assert sorted(visited) == list(range(len(nodes)))
+
+    leaves = nodes[nodes[:, 7] >= 0]
+    primitives = leaves[:, 7].astype(np.int64)
+    assert sorted(primitives.tolist()) == list(range(len(bounds)))
+    # Cada hoja tiene exactamente la caja de su primitiva
+    assert np.array_equal(leaves[:, [0, 1, 2, 4, 5, 6]], bounds[primitives])
+
+    parents, children = np.array(edges).T
+    assert np.all(nodes[children, 0:3] >= nodes[parents, 0:3])
+    assert np.all(nodes[children, 4:7] <= nodes[parents, 4:7])
+
+
+@pytest.mark.parametrize("count", [1, 2, 3])
+def test_lbvh_small_inputs(count):
+    bounds = np.array([[i, 0, 0, i + 1, 1, 1] for i in range(count)], dtype='f4')
+    nodes = build_lbvh(bounds)
+    assert len(nodes) == 2 * count - 1
+    assert sorted(nodes[nodes[:, 7] >= 0, 7].astype(np.int64).tolist()) == list(range(count))
+
+
+def test_lbvh_closest_hit_matches_brute_force(box_scene):
+    lbvh = LBVH(box_scene.prims)
+    for origin, direction in box_scene.rays:
+        box_scene.assert_matches(origin, direction,
+                                 lbvh.closest_hit(origin, direction, box_scene.hit_fn(origin, direction)))
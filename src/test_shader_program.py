@@ -0,0 +1,54 @@
+# test_shader_program.py
+# Recarga en caliente: un shader que deja de compilar se informa en los fallidos de poll()
+# y el programa sigue usando la versión anterior hasta que el archivo se arregle.
+
+import os
+import pytest
+from shader_program import ComputeShaderProgram, ProgramCache
+
+moderngl = pytest.importorskip("moderngl")
+
+SOURCE = """#version 430
+layout(local_size_x = 1) in;
+layout(std430, binding = 0) buffer Output { float value; };
+void main() { value = %s; }
+"""
+
+
+@pytest.fixture
+def ctx():
+    try:
+        context = moderngl.create_standalone_context(require=430)
+    except Exception:
+        try:
+            context = moderngl.create_standalone_context(require=430, backend="egl")
+        except Exception:
+            pytest.skip("sin contexto de OpenGL 4.3")
+    yield context
+    context.release()
+
+
+def write_shader(path, body, mtime):
+    with open(path, "w", encoding='utf-8') as file:
+        file.write(SOURCE % body)
+    os.utime(path, (mtime, mtime))
+
+
+def test_poll_reports_failed_reloads_and_keeps_the_previous_program(ctx, tmp_path):
+    path = str(tmp_path / "value.comp")
+    write_shader(path, "1.0", 1000)
+    cache = ProgramCache()
+    program = ComputeShaderProgram(ctx, path, cache=cache)
+    previous = program.prog
+
+    write_shader(path, "undefined_name", 2000)
+    reloaded, failed = cache.poll()
+    assert reloaded == []
+    assert list(failed) == [program]
+    assert isinstance(failed[program], moderngl.Error)
+    assert program.prog is previous
+
+    write_shader(path, "2.0", 3000)
+    reloaded, failed = cache.poll()
+    assert reloaded == [program] and failed == {}
+    assert program.prog is not previous
@@ -0,0 +1,26 @@
+# test_spatial_grid.py
+# La grilla uniforme devuelve el mismo hit más cercano que la fuerza bruta, recién
+# construida y después de mover objetos con update_all().
+
+import numpy as np
+from spatial_grid import UniformGrid
+
+
+def test_grid_closest_hit_matches_brute_force(box_scene):
+    grid = UniformGrid(box_scene.bounds)
+    for origin, direction in box_scene.rays:
+        box_scene.assert_matches(origin, direction,
+                                 grid.closest_hit(origin, direction, box_scene.hit_fn(origin, direction)))
+
+
+def test_grid_matches_brute_force_after_moving_objects(box_scene):
+    grid = UniformGrid(box_scene.bounds)
+    rng = np.random.default_rng(2)
+    moving = rng.choice(len(box_scene.bounds), len(box_scene.bounds) // 4, replace=False)
+    # Desplazamientos chicos: la mayoría queda dentro del margen y se actualiza por celdas
+    box_scene.bounds[moving] += np.tile(rng.uniform(-1.0, 1.0, (len(moving), 3)), 2)
+    box_scene.rows = box_scene.bounds.tolist()
+    grid.update_all(box_scene.bounds)
+    for origin, direction in box_scene.rays:
+        box_scene.assert_matches(origin, direction,
+                                 grid.closest_hit(origin, direction, box_scene.hit_fn(origin, direction)))
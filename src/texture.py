@@ -1,5 +1,7 @@
 # texture.py
 # Clase Texture encapsula una textura 2D con datos modificables (para CPU y GPU).
+# Sin image_data, la imagen del color indicado se crea recién la primera vez que se pide,
+# así que una textura cuyos datos se reemplazan antes de usarla no reserva memoria.
 
 import numpy as np
 
@@ -8,6 +10,13 @@ class ImageData:
     def __init__(self, height, width, channels, color=(0, 0, 0)):
         self.data = np.full((height, width, channels), color, dtype=np.uint8)
 
+    @classmethod
+    def from_array(cls, data):
+        """ImageData que usa un array (alto, ancho, canales) existente, sin copiarlo."""
+        image_data = cls.__new__(cls)
+        image_data.data = data
+        return image_data
+
     def set_pixel(self, x, y, color):
         """Establece un píxel en la posición (x, y)."""
         self.data[y, x] = color
@@ -32,27 +41,29 @@ class Texture:
         self.width = width
         self.height = height
 
-        # Si se da una imagen, usarla; si no, crear una vacía del color indicado
-        if image_data is not None:
-            self.__image_data = image_data
-        else:
-            self.__image_data = ImageData(height, width, channels_amount, color)
+        # Si se da una imagen, usarla; si no, se crea una del color indicado al pedirla
+        self.__image_data = image_data
+        self.__color = color
 
     @property
     def image_data(self):
         """Devuelve el objeto ImageData asociado a esta textura."""
+        if self.__image_data is None:
+            self.__image_data = ImageData(self.height, self.width, self.channels_amount, self.__color)
         return self.__image_data
 
     def update_data(self, new_data: ImageData):
-        """Reemplaza los datos actuales por otros nuevos."""
+        """Reemplaza los datos actuales por otros nuevos (el tamaño pasa a ser el de los datos)."""
         self.__image_data = new_data
+        self.height, self.width = new_data.data.shape[:2]
+        self.size = (self.width, self.height)
 
     def set_pixel(self, x, y, color):
         """Modifica un píxel específico."""
-        self.__image_data.set_pixel(x, y, color)
+        self.image_data.set_pixel(x, y, color)
 
     def get_bytes(self):
         """Devuelve los bytes listos para subir a GPU."""
         # CRITICO: Usar tobytes() directamente del array NumPy
         # Esto maneja correctamente tanto uint8 como float32
-        return self.__image_data.data.tobytes()
\ No newline at end of file
+        return self.image_data.data.tobytes()
\ No newline at end of file
@@ -0,0 +1,173 @@
+# texture_pool.py
+# Pool de buffers de imagen en CPU (arrays de NumPy) y de texturas GL, por (tamaño,
+# canales, tipo de dato). Lo que se libera vuelve al pool y la próxima petición con la
+# misma clave lo reutiliza, así que en régimen estable (mismo tamaño de ventana, mismas
+# texturas) el render no reserva imágenes. Los recursos libres se guardan en orden LRU y,
+# si la memoria total (en uso + libres) supera el presupuesto, se descartan los libres
+# usados hace más tiempo: el pico queda acotado por el presupuesto o por lo que esté en
+# uso a la vez. Las texturas reutilizadas se entregan en cero (salvo clear=False, para
+# quien las va a sobrescribir enteras) y los arrays, con el contenido anterior salvo fill.
+# Los recursos en uso se siguen con referencias débiles: si uno se descarta sin liberarlo
+# deja de contarse, y su id no puede confundirse con el de otro recurso creado después.
+
+from collections import OrderedDict
+import weakref
+import numpy as np
+
+DEFAULT_BUDGET_BYTES = 256 * 1024 * 1024
+
+# Bytes por componente según el dtype de moderngl ('f1' = 8 bits normalizado)
+TEXTURE_DTYPE_BYTES = {'f1': 1, 'u1': 1, 'i1': 1, 'f2': 2, 'u2': 2, 'i2': 2, 'f4': 4, 'u4': 4, 'i4': 4}
+
+
+class PoolStats:
+    """Contadores acumulados del pool."""
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.peak_bytes = 0
+
+    def __repr__(self):
+        return (f"PoolStats(hits={self.hits}, misses={self.misses}, evictions={self.evictions}, "
+                f"peak_bytes={self.peak_bytes})")
+
+
+def texture_bytes(texture):
+    width, height = texture.size
+    return width * height * texture.components * TEXTURE_DTYPE_BYTES.get(texture.dtype, 4)
+
+
+class TexturePool:
+    """
+    budget_bytes: memoria máxima entre recursos en uso y libres; al superarla se liberan
+    los libres menos usados recientemente (los que están en uso nunca se descartan).
+    """
+    def __init__(self, budget_bytes=DEFAULT_BUDGET_BYTES):
+        self.budget_bytes = budget_bytes
+        self.stats = PoolStats()
+        # (clave, id) -> (recurso, bytes) de los recursos libres, del menos al más reciente
+        self.__free = OrderedDict()
+        # id -> (referencia débil, bytes) de los recursos entregados por acquire_*() y
+        # todavía no liberados (la referencia débil borra la entrada si el recurso muere)
+        self.__in_use = {}
+        self.bytes_free = 0
+
+    @property
+    def bytes_in_use(self):
+        return sum(size for _, size in self.__in_use.values())
+
+    @property
+    def total_bytes(self):
+        return self.bytes_in_use + self.bytes_free
+
+    # -------------------------------
+    # Buffers de imagen en CPU
+    # -------------------------------
+    def acquire_array(self, shape, dtype=np.uint8, fill=None):
+        """Array de esa forma y tipo (reutilizado si hay uno libre); fill lo inicializa."""
+        shape, dtype = tuple(shape), np.dtype(dtype)
+        array = self.__take(("array", shape, dtype.str))
+        if array is None:
+            array = np.empty(shape, dtype=dtype)
+            self.__track(array, array.nbytes)
+        if fill is not None:
+            array[...] = fill
+        return array
+
+    def release_array(self, array):
+        """Devuelve un array al pool (no debe seguir usándose)."""
+        self.__give(("array", array.shape, array.dtype.str), array, array.nbytes)
+
+    # -------------------------------
+    # Texturas GL
+    # -------------------------------
+    def acquire_texture(self, ctx, size, components, dtype='f1', clear=True):
+        """
+        Textura GL 2D de ese tamaño, canales y dtype de moderngl (reutilizada si hay una
+        libre). clear=False evita borrar una reutilizada si se va a escribir entera.
+        """
+        size = tuple(size)
+        texture = self.__take(("texture", id(ctx), size, components, dtype))
+        if texture is None:
+            texture = ctx.texture(size, components, dtype=dtype)
+            self.__track(texture, texture_bytes(texture))
+        else:
+            # Estado por defecto de una textura nueva (el dueño anterior pudo cambiarlo)
+            import moderngl
+            texture.filter = (moderngl.LINEAR, moderngl.LINEAR)
+            texture.repeat_x = texture.repeat_y = True
+            if clear:
+                texture.write(bytes(texture_bytes(texture)))
+        return texture
+
+    def release_texture(self, texture):
+        """Devuelve una textura al pool (también sirve para texturas creadas fuera de él)."""
+        key = ("texture", id(texture.ctx), tuple(texture.size), texture.components, texture.dtype)
+        self.__give(key, texture, texture_bytes(texture))
+
+    # -------------------------------
+    # LRU y presupuesto
+    # -------------------------------
+    def __take(self, key):
+        for entry in reversed(self.__free):
+            if entry[0] == key:
+                resource, size = self.__free.pop(entry)
+                self.bytes_free -= size
+                self.__mark_in_use(resource, size)
+                self.stats.hits += 1
+                return resource
+        self.stats.misses += 1
+        return None
+
+    def __track(self, resource, size):
+        self.__mark_in_use(resource, size)
+        self.__evict()
+
+    def __mark_in_use(self, resource, size):
+        key = id(resource)
+        in_use = self.__in_use
+
+        def forget(reference):
+            # El recurso murió sin liberarse: deja de contarse (si la entrada sigue siendo suya)
+            if in_use.get(key, (None,))[0] is reference:
+                del in_use[key]
+
+        in_use[key] = (weakref.ref(resource, forget), size)
+
+    def __give(self, key, resource, size):
+        entry = self.__in_use.get(id(resource))
+        if entry is not None and entry[0]() is resource:
+            del self.__in_use[id(resource)]
+        self.__free[(key, id(resource))] = (resource, size)
+        self.bytes_free += size
+        self.__evict()
+
+    def __evict(self):
+        total = self.total_bytes
+        while self.__free and total > self.budget_bytes:
+            resource, size = self.__free.popitem(last=False)[1]
+            self.__discard(resource)
+            self.bytes_free -= size
+            total -= size
+            self.stats.evictions += 1
+        self.stats.peak_bytes = max(self.stats.peak_bytes, total)
+
+    @staticmethod
+    def __discard(resource):
+        if not isinstance(resource, np.ndarray):
+            resource.release()
+
+    def clear(self):
+        """Libera todos los recursos libres."""
+        for resource, _ in self.__free.values():
+            self.__discard(resource)
+        self.__free.clear()
+        self.bytes_free = 0
+
+
+# Pool compartido por defecto
+texture_pool = TexturePool()
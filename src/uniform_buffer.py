@@ -0,0 +1,78 @@
+# uniform_buffer.py
+# Uniform Buffer Objects (UBO) para enviar uniforms en bloque.
+# FrameUniforms: datos compartidos por todo el frame (vista, proyección, cámara, tiempo),
+# se escriben una sola vez por frame.
+# ObjectUniforms: matrices de modelo de todos los objetos en un único buffer; cada draw
+# solo vincula su sub-rango (offset) en lugar de enviar uniforms por separado.
+
+import numpy as np
+
+# Nombre del bloque en GLSL y punto de vinculación
+FRAME_BLOCK = ("FrameData", 0)
+OBJECT_BLOCK = ("ObjectData", 1)
+
+
+class FrameUniforms:
+    """
+    Bloque std140:
+        mat4 view; mat4 projection; vec4 cameraPosition; vec4 time;
+    """
+    SIZE = 64 + 64 + 16 + 16
+
+    def __init__(self, ctx):
+        self.__data = np.zeros(self.SIZE // 4, dtype='f4')
+        self.buffer = ctx.buffer(reserve=self.SIZE, dynamic=True)
+
+    def update(self, view, projection, camera_position, time):
+        """Escribe los datos del frame y vincula el buffer a su punto de binding."""
+        data = self.__data
+        data[0:16] = np.frombuffer(view.to_bytes(), dtype='f4')
+        data[16:32] = np.frombuffer(projection.to_bytes(), dtype='f4')
+        data[32:35] = tuple(camera_position)
+        data[36] = time
+
+        self.buffer.write(data)
+        self.bind()
+
+    def bind(self):
+        self.buffer.bind_to_uniform_block(FRAME_BLOCK[1])
+
+
+class ObjectUniforms:
+    """
+    Bloque std140 por objeto:
+        mat4 model;
+    Los bloques de todos los objetos se guardan en un único buffer, separados por un
+    stride alineado a GL_UNIFORM_BUFFER_OFFSET_ALIGNMENT.
+    """
+    BLOCK_SIZE = 64
+
+    def __init__(self, ctx, capacity=16):
+        self.__ctx = ctx
+        alignment = ctx.info.get('GL_UNIFORM_BUFFER_OFFSET_ALIGNMENT', 256)
+        self.stride = (self.BLOCK_SIZE + alignment - 1) // alignment * alignment
+        self.capacity = 0
+        self.buffer = None
+        self.__data = None
+        self.__reserve(capacity)
+
+    def __reserve(self, capacity):
+        if self.buffer is not None:
+            self.buffer.release()
+        self.capacity = capacity
+        self.__data = np.zeros((capacity, self.stride // 4), dtype='f4')
+        self.buffer = self.__ctx.buffer(reserve=capacity * self.stride, dynamic=True)
+
+    def update(self, model_matrices):
+        """Escribe las matrices (n, 16) de todos los objetos con una sola subida."""
+        count = len(model_matrices)
+        if count > self.capacity:
+            self.__reserve(max(count, self.capacity * 2))
+
+        self.__data[:count, :16] = model_matrices
+        self.buffer.write(self.__data[:count])
+
+    def bind(self, index):
+        """Vincula el bloque del objeto index (un solo bind con offset por draw)."""
+        self.buffer.bind_to_uniform_block(OBJECT_BLOCK[1], offset=index * self.stride,
+                                          size=self.BLOCK_SIZE)
@@ -0,0 +1,244 @@
+# wavefront.py
+# Modo wavefront del raytracer en GPU.
+# En lugar de un megakernel (un hilo recorre todos los rebotes de su pixel), cada rebote
+# se procesa con pasadas separadas que se comunican por colas de rayos en SSBOs:
+#   generar rayos primarios -> [intersectar -> sombrear + sombra -> avanzar cola] x rebotes -> finalizar
+# Los rebotes que siguen vivos se compactan con un contador atómico, y las pasadas 1D se
+# lanzan con dispatch indirecto, así que los hilos siempre trabajan sobre rayos activos.
+# emulate_wavefront() reproduce la misma lógica de colas con NumPy para probarla sin GPU.
+
+import numpy as np
+
+PASS_GENERATE = 0
+PASS_INTERSECT = 1
+PASS_SHADE = 2
+PASS_ADVANCE = 3
+PASS_FINALIZE = 4
+
+# Tamaños en bytes de los structs std430 QueuedRay y QueuedHit de raytracing.comp
+RAY_STRIDE = 64
+HIT_STRIDE = 32
+
+# Bindings de las colas (los 0-4 los usa el megakernel)
+RAYS_IN_BINDING = 5
+RAYS_OUT_BINDING = 6
+HITS_BINDING = 7
+COUNTERS_BINDING = 8
+ACCUMULATION_BINDING = 9
+
+
+class WavefrontQueues:
+    """Colas de rayos, hits, contadores y acumulación; se agrandan solo si hace falta."""
+    def __init__(self, ctx):
+        self.ctx = ctx
+        self.capacity = 0
+        self.rays = None
+        self.hits = None
+        self.accumulation = None
+        # dispatchX, dispatchY, dispatchZ, activeRays, nextRays
+        self.counters = ctx.buffer(reserve=5 * 4)
+
+    def reserve(self, pixel_count):
+        if pixel_count <= self.capacity:
+            return
+        if self.rays is not None:
+            for buffer in (*self.rays, self.hits, self.accumulation):
+                buffer.release()
+        self.capacity = pixel_count
+        self.rays = (self.ctx.buffer(reserve=pixel_count * RAY_STRIDE),
+                     self.ctx.buffer(reserve=pixel_count * RAY_STRIDE))
+        self.hits = self.ctx.buffer(reserve=pixel_count * HIT_STRIDE)
+        self.accumulation = self.ctx.buffer(reserve=pixel_count * 16)
+
+    def reset_counters(self, active_rays, local_size):
+        groups = (active_rays + local_size - 1) // local_size
+        self.counters.write(np.array([groups, 1, 1, active_rays, 0], dtype='u4'))
+
+    def read_counters(self):
+        """(rayos activos, rayos encolados para el próximo rebote); lee la GPU."""
+        values = np.frombuffer(self.counters.read(), dtype='u4')
+        return int(values[3]), int(values[4])
+
+    def bind(self, swap=False):
+        rays_in, rays_out = self.rays[::-1] if swap else self.rays
+        rays_in.bind_to_storage_buffer(binding=RAYS_IN_BINDING)
+        rays_out.bind_to_storage_buffer(binding=RAYS_OUT_BINDING)
+        self.hits.bind_to_storage_buffer(binding=HITS_BINDING)
+        self.counters.bind_to_storage_buffer(binding=COUNTERS_BINDING)
+        self.accumulation.bind_to_storage_buffer(binding=ACCUMULATION_BINDING)
+
+
+def run_wavefront(ctx, passes, queues, width, height, local_size, max_bounces):
+    """
+    Ejecuta un frame en modo wavefront.
+    passes: dict PASS_* -> ComputeShaderProgram (variantes de raytracing.comp).
+    """
+    local_x, local_y = local_size
+    groups_x = (width + local_x - 1) // local_x
+    groups_y = (height + local_y - 1) // local_y
+    pixel_count = width * height
+
+    queues.reserve(pixel_count)
+    queues.reset_counters(pixel_count, local_x * local_y)
+    queues.bind()
+    passes[PASS_GENERATE].run(groups_x, groups_y, 1)
+
+    for bounce in range(max_bounces):
+        ctx.memory_barrier()
+        passes[PASS_INTERSECT].run_indirect(queues.counters)
+        ctx.memory_barrier()
+        passes[PASS_SHADE].run_indirect(queues.counters)
+        ctx.memory_barrier()
+        passes[PASS_ADVANCE].run(1, 1, 1)
+        # La cola de salida de este rebote es la de entrada del siguiente
+        queues.bind(swap=(bounce % 2 == 0))
+
+    ctx.memory_barrier()
+    passes[PASS_FINALIZE].run(groups_x, groups_y, 1)
+    ctx.memory_barrier()
+
+
+# ============================================================
+# Emulación en CPU (NumPy) de la lógica de colas
+# ============================================================
+EPS = 1e-4
+LIGHT_DIRECTION = np.array([0.5, 1.0, 0.1]) / np.linalg.norm([0.5, 1.0, 0.1])
+SPECULAR_POWER = 64.0
+
+
+def _normalize(v):
+    return v / np.linalg.norm(v, axis=-1, keepdims=True)
+
+
+def intersect_boxes(origins, directions, models, inverse, bounds=None):
+    """
+    Intersección vectorizada de n rayos contra m cubos orientados [-1, 1]^3 (mismo cálculo
+    que intersectOrientedBox). models e inverse son arrays (m, 16) como en los SSBOs.
+    bounds (m, 6): AABBs de las hojas del BVH; como en el recorrido del shader, una
+    primitiva solo se prueba si el rayo toca su AABB.
+    Devuelve (distancia (n,), primitiva (n,), punto local (n, 3)); primitiva -1 sin hit.
+    """
+    count = len(origins)
+    if len(models) == 0 or count == 0:
+        return np.full(count, np.inf), np.full(count, -1), np.zeros((count, 3))
+
+    # glm guarda por columnas: p_mundo = p @ m[:3, :3] + m[3, :3]
+    model = models.reshape(-1, 4, 4).astype('f8')
+    inv = inverse.reshape(-1, 4, 4).astype('f8')
+    local_origin = np.einsum('nc,mcr->nmr', origins, inv[:, :3, :3]) + inv[None, :, 3, :3]
+    local_direction = _normalize(np.einsum('nc,mcr->nmr', directions, inv[:, :3, :3]))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t1 = (-1.0 - local_origin) / local_direction
+        t2 = (1.0 - local_origin) / local_direction
+        t_near = np.minimum(t1, t2).max(axis=2)
+        t_far = np.maximum(t1, t2).min(axis=2)
+        valid = t_far >= np.maximum(t_near, 0.0)
+
+        t = np.where(t_near > EPS, t_near, t_far)
+        local_hit = local_origin + local_direction * t[..., None]
+        world_hit = np.einsum('nmc,mcr->nmr', local_hit, model[:, :3, :3]) + model[None, :, 3, :3]
+        distance = np.einsum('nmr,nr->nm', world_hit - origins[:, None, :], directions)
+        valid &= distance > EPS
+        if bounds is not None:
+            b1 = (bounds[None, :, :3] - origins[:, None, :]) / directions[:, None, :]
+            b2 = (bounds[None, :, 3:] - origins[:, None, :]) / directions[:, None, :]
+            b_near = np.minimum(b1, b2).max(axis=2)
+            b_far = np.maximum(b1, b2).min(axis=2)
+            valid &= b_far >= np.maximum(b_near, 0.0)
+        distance = np.where(valid, distance, np.inf)
+
+    primitive = np.argmin(distance, axis=1)
+    rows = np.arange(count)
+    closest = distance[rows, primitive]
+    primitive = np.where(np.isfinite(closest), primitive, -1)
+    return closest, primitive, local_hit[rows, np.maximum(primitive, 0)]
+
+
+def surface_normals(local_hit, primitive, models):
+    """Normal en mundo de la cara más cercana al punto local (como en el shader)."""
+    face_distance = np.minimum(np.abs(local_hit - 1.0), np.abs(local_hit + 1.0))
+    axis = np.argmin(face_distance, axis=1)
+    local_normal = np.zeros_like(local_hit)
+    local_normal[np.arange(len(axis)), axis] = np.sign(local_hit[np.arange(len(axis)), axis])
+
+    # transpose(inverse(mat3(model))) con la matriz en notación matemática (filas)
+    linear = np.transpose(models.reshape(-1, 4, 4)[:, :3, :3].astype('f8'), (0, 2, 1))
+    normal_matrix = np.transpose(np.linalg.inv(linear), (0, 2, 1))
+    return _normalize(np.einsum('nrc,nc->nr', normal_matrix[primitive], local_normal))
+
+
+def camera_rays(width, height, camera_position, inverse_view, fov):
+    """Rayos primarios (origen, dirección) en el mismo orden de pixel que el shader."""
+    inv_view = np.frombuffer(inverse_view.to_bytes(), dtype='f4').reshape(4, 4).astype('f8')
+    y, x = np.mgrid[0:height, 0:width]
+    u = (x.ravel() + 0.5) / width
+    v = (y.ravel() + 0.5) / height
+    fov_adjust = np.tan(np.radians(fov) * 0.5)
+    ndc_x = (u * 2.0 - 1.0) * fov_adjust * (width / height)
+    ndc_y = (v * 2.0 - 1.0) * fov_adjust
+
+    camera_directions = _normalize(np.stack([ndc_x, ndc_y, -np.ones_like(ndc_x)], axis=1))
+    directions = _normalize(camera_directions @ inv_view[:3, :3])
+    origin = np.asarray(camera_position, dtype='f8') @ inv_view[:3, :3] + inv_view[3, :3]
+    return np.repeat(origin[None, :], len(directions), axis=0), directions
+
+
+def emulate_wavefront(models, inverse, materials, camera_position, inverse_view, fov,
+                      width, height, max_bounces=3, bounds=None):
+    """
+    Emula en NumPy las pasadas del modo wavefront (mismas colas y misma compactación).
+    bounds: AABBs (m, 6) de las primitivas del BVH (ver intersect_boxes).
+    Devuelve (imagen (height, width, 4) float32, rayos activos por rebote).
+    """
+    if bounds is not None:
+        bounds = np.asarray(bounds, dtype='f8').reshape(-1, 6)
+    origins, directions = camera_rays(width, height, camera_position, inverse_view, fov)
+    pixels = np.arange(width * height)
+    throughput = np.ones((len(pixels), 3))
+    accumulation = np.zeros((width * height, 3))
+    queue_sizes = []
+
+    for bounce in range(max_bounces):
+        if len(pixels) == 0:
+            break
+        queue_sizes.append(len(pixels))
+
+        # Intersección
+        distance, primitive, local_hit = intersect_boxes(origins, directions, models, inverse, bounds)
+        hit = primitive >= 0
+
+        # Cielo para los rayos sin hit
+        sky = np.array([0.6, 0.8, 1.0]) * (1.0 - directions[~hit, 1:2])
+        np.add.at(accumulation, pixels[~hit], throughput[~hit] * sky)
+
+        # Sombreado + rayo de sombra de los rayos con hit
+        pixels, origins, directions = pixels[hit], origins[hit], directions[hit]
+        throughput, primitive = throughput[hit], primitive[hit]
+        positions = origins + directions * distance[hit, None]
+        normals = surface_normals(local_hit[hit], primitive, models)
+        material = materials[primitive].astype('f8')
+
+        diffuse = np.maximum(normals @ LIGHT_DIRECTION, 0.0)
+        half = _normalize(LIGHT_DIRECTION - directions)
+        specular = np.maximum(np.sum(half * normals, axis=1), 0.0) ** SPECULAR_POWER
+        shadow_origins = positions + normals * EPS
+        _, blocker, _ = intersect_boxes(shadow_origins, np.broadcast_to(LIGHT_DIRECTION, normals.shape),
+                                        models, inverse, bounds)
+        shadow = np.where(blocker >= 0, 0.3, 1.0)
+        shaded = 0.08 * material[:, :3] + shadow[:, None] * (diffuse[:, None] * material[:, :3] + specular[:, None])
+
+        reflectivity = np.clip(material[:, 3:4], 0.0, 1.0)
+        accumulation[pixels] += throughput * (1.0 - reflectivity) * shaded
+        throughput = throughput * reflectivity
+
+        # Compactación: solo siguen los rayos con energía suficiente
+        alive = (throughput.max(axis=1) >= 1e-3) & (bounce + 1 < max_bounces)
+        pixels, throughput = pixels[alive], throughput[alive]
+        origins = shadow_origins[alive]
+        normals, directions = normals[alive], directions[alive]
+        directions = directions - 2.0 * np.sum(directions * normals, axis=1, keepdims=True) * normals
+
+    image = np.ones((height, width, 4), dtype='f4')
+    image[..., :3] = np.power(accumulation, 1.0 / 2.2).reshape(height, width, 3)
+    return image, queue_sizes
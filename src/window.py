@@ -1,22 +1,87 @@
+import sys
 import moderngl
 import pyglet
 
 class Window(pyglet.window.Window):
-    def __init__(self, width, height, title):
+    def __init__(self, width, height, title, on_demand=False, capture=None):
         super().__init__(width, height, title, resizable=True)
         self.ctx = moderngl.create_context()
         self.ctx.enable(moderngl.DEPTH_TEST)  # Habilitar depth test
         self.scene = None
+        # Último tamaño recibido en on_resize; se aplica una sola vez en el próximo frame
+        self.__pending_size = None
+        # Tamaño con el que se renderiza la escena (los eventos sin cambio real se ignoran)
+        self.__scene_size = None
+        # Render on-demand: si la escena no cambió no se dibuja ni se intercambian buffers
+        self.on_demand = on_demand
+        self.__invalid = True
+        # Exportación de los frames presentados (FrameCapture de capture.py, None = sin captura)
+        self.capture = capture
 
     def set_scene(self, scene):
         self.scene = scene
+        self.__scene_size = (self.width, self.height)
         scene.start()  # Llamar a start() cuando se asigna la escena
 
+    def draw(self, dt):
+        # Con on_demand, un frame sin cambios (ni resize, ni exposición) no se redibuja:
+        # la ventana conserva la última imagen presentada
+        if self.on_demand and self.scene is not None and not self.__invalid \
+                and self.__pending_size is None and not self.scene.needs_redraw():
+            return
+        self.__invalid = False
+        super().draw(dt)
+
+    def invalidate(self):
+        # Forzar el redibujado completo del próximo frame
+        self.__invalid = True
+        if self.scene:
+            self.scene.invalidate()
+
+    def on_expose(self):
+        # La ventana quedó descubierta o se mostró: hay que volver a presentar la imagen
+        self.__invalid = True
+
     def on_draw(self):  # se ejecuta por cada frame
         self.clear()
         self.ctx.clear()
         if self.scene:
+            self.__apply_resize()
             self.scene.render()
+            if self.capture is not None:
+                # Solo copia el frame a un buffer; la codificación ocurre en segundo plano
+                self.capture.submit_framebuffer(self.ctx.screen)
+
+    def on_resize(self, width, height):
+        # Durante un arrastre llegan muchos eventos: solo se guarda el último
+        if width > 0 and height > 0:
+            self.__pending_size = (width, height)
+        return super().on_resize(width, height)
+
+    def __apply_resize(self):
+        if self.__pending_size is not None:
+            size, self.__pending_size = self.__pending_size, None
+            if size != self.__scene_size:
+                self.__scene_size = size
+                self.scene.on_resize(*size)
+
+    def enable_hot_reload(self, program_cache, interval=0.5):
+        # Revisar periódicamente si cambió algún archivo de shader y recompilarlo
+        pyglet.clock.schedule_interval(lambda dt: self.__poll_shaders(program_cache), interval)
+
+    def __poll_shaders(self, program_cache):
+        reloaded, failed = program_cache.poll()
+        for error in failed.values():
+            print(f"Error al recargar shader: {error}", file=sys.stderr)
+        if reloaded:
+            self.invalidate()
+
+    def on_close(self):
+        if self.scene:
+            self.scene.stop()
+        if self.capture is not None:
+            self.capture.close()
+        super().on_close()
 
     def run(self):  # activar el loop de la ventana
         pyglet.app.run()
@@ -0,0 +1,106 @@
+# workgroup_tuning.py
+# Ajuste automático del tamaño de grupo local del compute shader de raytracing.
+# Mide cada configuración candidata en el dispositivo actual (con la escena ya cargada)
+# y guarda la más rápida en un archivo JSON indexado por GPU/driver, para no volver a
+# medir en las siguientes ejecuciones. Las variantes que no compilan en el driver se
+# descartan y quedan en WorkgroupTuner.rejected (y en el JSON) para quien llame.
+
+import json
+import os
+import time
+import moderngl
+
+CANDIDATE_LOCAL_SIZES = ((8, 8), (16, 8), (8, 16), (16, 16), (32, 8), (32, 4), (32, 16), (32, 32))
+
+
+def device_key(ctx):
+    """Identifica la GPU y la versión del driver."""
+    return f"{ctx.info['GL_RENDERER']} | {ctx.info['GL_VERSION']}"
+
+
+class WorkgroupTuner:
+    """
+    path: archivo JSON donde se guardan los resultados por dispositivo.
+    repeats: ejecuciones medidas por candidato (se usa la mediana, tras un warm-up).
+    rejected: {grupo local: error} de las variantes descartadas en el último tune().
+    """
+    def __init__(self, path="workgroup_tuning.json", candidates=CANDIDATE_LOCAL_SIZES, repeats=5):
+        self.path = path
+        self.candidates = candidates
+        self.repeats = repeats
+        self.results = self.__load()
+        self.rejected = {}
+
+    def __load(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, encoding='utf-8') as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def __save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding='utf-8') as file:
+            json.dump(self.results, file, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def valid_candidates(self, ctx):
+        """Candidatos que respetan los límites del dispositivo."""
+        max_invocations = ctx.info["GL_MAX_COMPUTE_WORK_GROUP_INVOCATIONS"]
+        max_x, max_y, _ = ctx.info["GL_MAX_COMPUTE_WORK_GROUP_SIZE"]
+        return [(x, y) for x, y in self.candidates
+                if x * y <= max_invocations and x <= max_x and y <= max_y]
+
+    def measure(self, raytracer, local_size):
+        """Tiempo medio (mediana, en segundos) de un frame con ese tamaño de grupo."""
+        ctx = raytracer.ctx
+        raytracer.configure(local_size=local_size)
+        raytracer.run()
+        ctx.finish()
+
+        timings = []
+        for _ in range(self.repeats):
+            start = time.perf_counter()
+            raytracer.run()
+            ctx.finish()
+            timings.append(time.perf_counter() - start)
+        timings.sort()
+        return timings[len(timings) // 2]
+
+    def tune(self, raytracer):
+        """Mide todos los candidatos, guarda el mejor para este dispositivo y lo aplica."""
+        ctx = raytracer.ctx
+        previous = raytracer.local_size
+        timings = {}
+        self.rejected = {}
+        for local_size in self.valid_candidates(ctx):
+            try:
+                timings[local_size] = self.measure(raytracer, local_size)
+            except moderngl.Error as error:
+                # Una variante que no compila en este driver se descarta
+                self.rejected[local_size] = str(error)
+
+        if not timings:
+            raytracer.configure(local_size=previous)
+            return previous
+
+        best = min(timings, key=timings.get)
+        self.results[device_key(ctx)] = {
+            "local_size": list(best),
+            "timings_ms": {f"{x}x{y}": round(t * 1000.0, 3) for (x, y), t in timings.items()},
+            "rejected": {f"{x}x{y}": error for (x, y), error in self.rejected.items()},
+        }
+        self.__save()
+        raytracer.configure(local_size=best)
+        return best
+
+    def apply(self, raytracer):
+        """Usa el resultado guardado para este dispositivo o mide si todavía no existe."""
+        entry = self.results.get(device_key(raytracer.ctx))
+        if entry is None:
+            return self.tune(raytracer)
+        best = tuple(entry["local_size"])
+        raytracer.configure(local_size=best)
+        return best